@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# benchmarks/bench_activation.py
+#
+# The daemon as systemd sees it in on-demand mode (`--on-demand`, Type=notify,
+# WatchdogSec). The parent plays the service manager: it listens on a
+# NOTIFY_SOCKET, starts the daemon with N fake controllers and reports
+#
+#   ready ms        start -> READY=1 (what systemd counts as startup time)
+#   ping s          mean gap between WATCHDOG=1 pings (WatchdogSec/2 expected)
+#   hung pings      pings sent while the shared event loop was blocked (0 expected)
+#   exit s          last controller gone -> process exited (exit_grace expected)
+#
+#   python3 benchmarks/bench_activation.py [--counts 0 1 8] [--engines threaded async]
+
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+EXIT_GRACE = 2
+WATCHDOG_USEC = 1_000_000  # pings every 0.5 s
+HANG = 2.0  # seconds the shared loop is blocked for
+STARTUP_TIMEOUT = 20
+
+
+def run_child(engine, sysfs, fds):
+    from fakes import FakeInputDevice
+    from monitor import macs, checkpoint, activation
+    from monitor.aioloop import get_loop
+    from monitor.monitor import scan_loop, shutdown_all_threads
+
+    macs._index = macs.DeviceIndex(sysfs)
+    nodes = {f"/dev/input/event{i}": fd for i, fd in enumerate(fds)}
+
+    def open_device(path):
+        try:
+            return FakeInputDevice(nodes.pop(path), path)
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def hang(signum, frame):
+        get_loop().call_soon_threadsafe(time.sleep, HANG)
+
+    activation.on_demand = True
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGUSR1, hang)
+    try:
+        if engine == "threaded":
+            scan_loop(open_device)
+        else:
+            from monitor.engine import run_engine
+            run_engine(open_device)
+    except (KeyboardInterrupt, SystemExit):
+        activation.stopping()
+        checkpoint.save()
+        shutdown_all_threads()
+
+
+class Manager:
+    """The service manager's end of NOTIFY_SOCKET: (time, field) per message."""
+
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.messages = []
+        self.cond = threading.Condition()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        while True:
+            try:
+                data = self.sock.recv(4096)
+            except OSError:
+                return
+            now = time.monotonic()
+            with self.cond:
+                self.messages.extend((now, field) for field in data.decode().split("\n"))
+                self.cond.notify_all()
+
+    def wait_for(self, field, timeout):
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while True:
+                for at, seen in self.messages:
+                    if seen == field:
+                        return at
+                if not self.cond.wait(deadline - time.monotonic()) and time.monotonic() >= deadline:
+                    raise TimeoutError(f"no {field} from the daemon")
+
+    def pings(self, start, end):
+        with self.cond:
+            return [at for at, field in self.messages if field == "WATCHDOG=1" and start <= at < end]
+
+    def close(self):
+        self.sock.close()
+
+
+def run_case(engine, count, env, sysfs, write_fds, read_fds, manager):
+    from fakes import stick_frame
+
+    args = [sys.executable, __file__, "--child", engine, "--sysfs", sysfs, "--fds", *map(str, read_fds)]
+    start = time.monotonic()
+    proc = subprocess.Popen(args, pass_fds=read_fds, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready = manager.wait_for("READY=1", STARTUP_TIMEOUT)
+        hung = None
+        if count:
+            for fd in write_fds:
+                os.write(fd, stick_frame(time.monotonic()))
+
+            # Healthy: pings at WatchdogSec/2. Hung loop: none until it recovers.
+            time.sleep(1.5)
+            healthy = manager.pings(ready, time.monotonic())
+            proc.send_signal(signal.SIGUSR1)
+            hang_start = time.monotonic()
+            time.sleep(HANG)
+            # A probe sent just before the hang may land right at its start
+            hung = len(manager.pings(hang_start + WATCHDOG_USEC / 1e6 / 2, hang_start + HANG))
+
+            # Every controller goes away; the daemon should follow after exit_grace
+            for fd in write_fds:
+                os.close(fd)
+            gone = time.monotonic()
+        else:
+            gone = ready  # no controller at all: the countdown runs from READY=1
+        proc.wait(timeout=EXIT_GRACE + 10)
+        exited = time.monotonic()
+        if not count:
+            healthy = manager.pings(ready, exited)
+        gaps = [b - a for a, b in zip(healthy, healthy[1:])]
+        stopping = any(field == "STOPPING=1" for _, field in manager.messages)
+        return {"ready_ms": (ready - start) * 1000, "ping_s": sum(gaps) / len(gaps) if gaps else float("nan"),
+                "hung_pings": hung, "exit_s": exited - gone, "stopping": stopping,
+                "returncode": proc.returncode}
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="On-demand start/exit, READY=1 and the watchdog")
+    parser.add_argument("--counts", type=int, nargs="+", default=[0, 1, 8])
+    parser.add_argument("--engines", nargs="+", choices=["threaded", "async"], default=["threaded", "async"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--sysfs", help=argparse.SUPPRESS)
+    parser.add_argument("--fds", type=int, nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.sysfs, args.fds)
+        return
+
+    from bench_scale import make_sysfs, fake_mac
+    from services import private_bus, MockBlueZ, MockUPower, MockNotifications
+
+    print(f"exit_grace {EXIT_GRACE}s, WatchdogSec {WATCHDOG_USEC / 1e6:.0f}s, shared loop blocked for {HANG}s\n")
+    print(f"{'engine':>9} {'pads':>5} {'ready ms':>9} {'ping s':>7} {'hung pings':>11} {'exit s':>7} "
+          f"{'STOPPING':>9} {'rc':>3}")
+    ok = True
+    for engine in args.engines:
+        for count in args.counts:
+            with tempfile.TemporaryDirectory() as tmp, private_bus() as address:
+                home = os.path.join(tmp, "home")
+                runtime = os.path.join(tmp, "run")
+                config_dir = os.path.join(home, ".config", "ps5-idle-timeout")
+                os.makedirs(config_dir)
+                os.makedirs(runtime, mode=0o700)
+                with open(os.path.join(config_dir, "config.ini"), "w") as f:
+                    f.write(f"[monitor]\nidle_timeout = 60\nengine = {engine}\nexit_grace = {EXIT_GRACE}\n"
+                            "discovery = poll\nrescan_interval = 1\n")
+                sysfs = os.path.join(tmp, "sys")
+                os.makedirs(sysfs)
+                make_sysfs(sysfs, count)
+                notify_path = os.path.join(tmp, "notify")
+                manager = Manager(notify_path)
+                env = dict(os.environ, HOME=home, XDG_RUNTIME_DIR=runtime, NOTIFY_SOCKET=notify_path,
+                           WATCHDOG_USEC=str(WATCHDOG_USEC),
+                           DBUS_SYSTEM_BUS_ADDRESS=address, DBUS_SESSION_BUS_ADDRESS=address)
+
+                loop = asyncio.new_event_loop()
+                loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+                loop_thread.start()
+
+                async def start_services():
+                    bluez = await MockBlueZ.start(address)
+                    upower = await MockUPower.start(address)
+                    notifications = await MockNotifications.start(address)
+                    for i in range(count):
+                        bluez.add_device(fake_mac(i))
+                        upower.add_device(fake_mac(i), percentage=80)
+                    return bluez, upower, notifications
+
+                async def stop_services(services):
+                    for service in services:
+                        service.bus.disconnect()
+                        await service.bus.wait_for_disconnect()
+
+                services = asyncio.run_coroutine_threadsafe(start_services(), loop).result(10)
+                pipes = [os.pipe() for _ in range(count)]
+                try:
+                    r = run_case(engine, count, env, sysfs, [w for _, w in pipes], [r for r, _ in pipes], manager)
+                finally:
+                    for read_fd, write_fd in pipes:
+                        os.close(read_fd)
+                        try:
+                            os.close(write_fd)  # already closed unless the case failed early
+                        except OSError:
+                            pass
+                    manager.close()
+                    asyncio.run_coroutine_threadsafe(stop_services(services), loop).result(10)
+                    loop.call_soon_threadsafe(loop.stop)
+                    loop_thread.join()
+
+            print(f"{engine:>9} {count:>5} {r['ready_ms']:>9.0f} {r['ping_s']:>7.2f} {'-' if r['hung_pings'] is None else r['hung_pings']:>11} "
+                  f"{r['exit_s']:>7.1f} {'yes' if r['stopping'] else 'no':>9} {r['returncode']:>3}")
+            ok &= (r["hung_pings"] in (None, 0) and r["stopping"] and r["returncode"] == 0
+                   and EXIT_GRACE - 0.5 <= r["exit_s"] <= EXIT_GRACE + 2)
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
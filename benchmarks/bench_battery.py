@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# benchmarks/bench_battery.py
+#
+# The battery model (monitor/battery_model.py) on simulated controllers,
+# on a simulated clock, against the old fixed 10 s cache.
+#
+#   charging hold   an idle controller left on the charger for hours, then
+#                   unplugged: UPower queries made on the fallback path, how
+#                   late the unplug is noticed, and how far the idle
+#                   disconnect lands from unplug + idle_timeout
+#   prediction      a play session with UPower pushing every level change:
+#                   error of the shown level vs the true one, reading vs
+#                   model estimate, and of the time-to-empty estimate
+#
+#   flapping        a reading that jumps back and forth between two steps (the
+#                   level sits right on a step edge): the model must keep
+#                   answering, with no zero or wrong-direction rate
+#
+#   python3 benchmarks/bench_battery.py [--controllers 50] [--seed 1]
+
+import argparse
+import os
+import random
+import sys
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+
+from monitor.battery_model import BatteryModel
+
+IDLE_TIMEOUT = 300
+CHARGING_RECHECK = 10  # as in monitor/monitor.py
+DECISION_MAX_AGE = 10
+OLD_TTL = 10
+
+
+class Battery:
+    """True level over time, reported the way a DualSense does (5%, 15%, ... 100%)."""
+
+    def __init__(self, rng, start, plug_at=None, unplug_at=None):
+        self.start = start
+        self.drain = 100 / rng.uniform(5 * 3600, 7 * 3600)
+        self.charge = 100 / rng.uniform(2.5 * 3600, 3.5 * 3600)
+        self.plug_at = plug_at
+        self.unplug_at = unplug_at
+
+    def charging(self, t):
+        return self.plug_at is not None and self.plug_at <= t < (self.unplug_at or float("inf"))
+
+    def level(self, t):
+        if self.plug_at is None or t < self.plug_at:
+            return max(0.0, self.start - self.drain * t)
+        at_plug = max(0.0, self.start - self.drain * self.plug_at)
+        end = min(t, self.unplug_at or t)
+        level = min(100.0, at_plug + self.charge * (end - self.plug_at))
+        return max(0.0, level - self.drain * (t - end))
+
+    def reading(self, t):
+        level = self.level(t)
+        reported = 100 if level >= 100 else min(95, int(level // 10) * 10 + 5)
+        return f"{reported}%", self.charging(t)
+
+
+def charging_hold(rng, policy):
+    """Idle on the charger, then unplugged. Walks the idle handler's checks
+    with either the old cache or the model; returns (queries, unplug noticed
+    after s, disconnect error s, simulated s)."""
+    plug_at = 0.0
+    unplug_at = rng.uniform(4 * 3600, 10 * 3600)
+    battery = Battery(rng, rng.uniform(10, 60), plug_at, unplug_at)
+    model = BatteryModel()
+    cache = {"at": None, "reading": None}
+    queries = 0
+
+    def query(t):
+        nonlocal queries
+        queries += 1
+        reading = battery.reading(t)
+        model.observe(*reading, t)
+        cache.update(at=t, reading=reading)
+        return reading
+
+    def get(t, max_age=None):
+        if policy == "old":
+            return cache["reading"] if cache["at"] is not None and t - cache["at"] < OLD_TTL else query(t)
+        return model.reading() if not model.due(t, max_age) else query(t)
+
+    t = IDLE_TIMEOUT  # first idle check
+    query(0.0)  # on connect
+    noticed = None
+    was_charging = True
+    while True:
+        if policy == "old":
+            _battery, charging = get(t)
+        else:
+            _battery, charging = get(t, DECISION_MAX_AGE)
+        if was_charging and not charging:
+            noticed = t - unplug_at
+            t += IDLE_TIMEOUT  # "no longer charging": idle timer reset
+            was_charging = False
+            continue
+        if not charging:
+            return queries, noticed, t - (unplug_at + IDLE_TIMEOUT), t
+        t += CHARGING_RECHECK
+
+def prediction(rng):
+    """Play until empty with every level change pushed; returns per-minute
+    absolute errors (reading, estimate, time-to-empty in minutes)."""
+    battery = Battery(rng, 100)
+    model = BatteryModel()
+    last = None
+    reading_err, model_err, tte_err = [], [], []
+    t = 0.0
+    while battery.level(t) > 0:
+        reading = battery.reading(t)
+        if reading != last:  # UPower pushes on change only
+            model.observe(*reading, t, exact=True)
+            last = reading
+        if t % 60 == 0:
+            true = battery.level(t)
+            reading_err.append(abs(float(reading[0].rstrip("%")) - true))
+            model_err.append(abs(model.predict(t) - true))
+            tte_err.append(abs(model.time_left(t) - true / battery.drain) / 60)
+        t += 10
+    return reading_err, model_err, tte_err
+
+def flapping(rng, charging):
+    """Readings flipping between two neighbouring steps at random for 6 h,
+    after the sequence that used to leave a rate of 0. Returns (errors,
+    worst time left in h); every call the daemon makes must answer."""
+    model = BatteryModel()
+    errors = 0
+    worst = 0.0
+    low, high = ("65%", "75%")
+    fixed = [("75%", 0.0), ("65%", 1000.0), ("75%", 1500.0)]
+    readings = fixed + [(rng.choice((low, high)), 1500.0 + 30 * i) for i in range(1, 720)]
+    for battery, t in readings:
+        model.observe(battery, charging, t, exact=rng.random() < 0.5)
+        try:
+            model.predict(t)
+            left = model.time_left(t)
+            model.next_query(t)
+            model.due(t, DECISION_MAX_AGE)
+        except ArithmeticError:
+            errors += 1
+            continue
+        if (model.rate or 0) * (1 if charging else -1) < 0 or model.rate == 0:
+            errors += 1
+        worst = max(worst, left / 3600)
+    return errors, worst
+
+def mean(values):
+    return sum(values) / len(values)
+
+def main():
+    parser = argparse.ArgumentParser(description="Battery model: UPower queries and accuracy")
+    parser.add_argument("--controllers", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"charging hold: {args.controllers} controllers idle on the charger for 4-10 h, then unplugged")
+    print(f"{'policy':>8} {'queries':>8} {'per hour':>9} {'unplug seen after s':>20} {'disconnect err s':>17}")
+    results = {}
+    ok = True
+    for policy in ("old", "model"):
+        rng = random.Random(args.seed)
+        runs = [charging_hold(rng, policy) for _ in range(args.controllers)]
+        queries = sum(run[0] for run in runs)
+        hours = sum(run[3] for run in runs) / 3600
+        results[policy] = queries
+        seen = [run[1] for run in runs]
+        err = [run[2] for run in runs]
+        ok &= max(err) <= CHARGING_RECHECK  # decided on a fresh reading at every recheck
+        print(f"{policy:>8} {queries:>8} {queries / hours:>9.1f} {mean(seen):>12.1f} (max {max(seen):>4.0f}) "
+              f"{mean(err):>8.1f} (max {max(err):>4.0f})")
+    print(f"  {results['old'] / results['model']:.1f}x fewer queries\n")
+
+    rng = random.Random(args.seed)
+    reading_err, model_err, tte_err = [], [], []
+    for _ in range(args.controllers):
+        r, m, e = prediction(rng)
+        reading_err += r
+        model_err += m
+        tte_err += e
+    print(f"prediction: {args.controllers} play sessions from full to empty, sampled every minute")
+    print(f"  shown level error: reading {mean(reading_err):.1f}% (max {max(reading_err):.1f}), "
+          f"estimate {mean(model_err):.1f}% (max {max(model_err):.1f})")
+    print(f"  time-to-empty error: {mean(tte_err):.0f} min mean, {max(tte_err):.0f} min max\n")
+
+    print(f"flapping: {args.controllers} controllers per direction, reading flipping between 65% and 75%")
+    for charging in (False, True):
+        rng = random.Random(args.seed)
+        runs = [flapping(rng, charging) for _ in range(args.controllers)]
+        errors = sum(run[0] for run in runs)
+        ok &= errors == 0
+        print(f"  {'charging' if charging else 'discharging':>11}: {errors} errors, "
+              f"longest time left {max(run[1] for run in runs):.1f} h")
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
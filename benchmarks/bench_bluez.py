@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# benchmarks/bench_bluez.py
+#
+# Drives monitor.bluez.BlueZClient against a mock org.bluez on a private
+# dbus-daemon: checks the ObjectManager cache follows InterfacesAdded/Removed
+# and Trusted changes, that Disconnect honours its timeout, and times
+# Disconnect round trips against spawning a bluetoothctl process.
+#
+#   python3 benchmarks/bench_bluez.py [--count 8] [--rounds 200]
+
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services import private_bus, MockBlueZ
+from monitor.bluez import BlueZClient
+
+
+def _mac(i):
+    return f"a0:5a:5e:00:00:{i:02x}"
+
+def check(label, ok):
+    print(f"{'PASS' if ok else 'FAIL'}  {label}")
+    return ok
+
+async def run(address, count, rounds):
+    bluez = await MockBlueZ.start(address)
+    for i in range(count):
+        bluez.add_device(_mac(i))
+    bluez.add_device("11:22:33:44:55:66", name="Keyboard")
+
+    client = BlueZClient(address)
+    await client.connect()
+    ok = check(f"GetManagedObjects cached {count} DualSense", len(client.dualsense_devices()) == count)
+
+    bluez.add_device(_mac(count))
+    await asyncio.sleep(0.1)
+    ok &= check("InterfacesAdded picked up", _mac(count) in client.paths)
+    bluez.remove_device(_mac(count))
+    await asyncio.sleep(0.1)
+    ok &= check("InterfacesRemoved picked up", _mac(count) not in client.paths)
+
+    await client.set_trusted(_mac(0))
+    await asyncio.sleep(0.1)
+    ok &= check("Trusted set and mirrored in cache", client.is_trusted(_mac(0)))
+
+    slow = bluez.devices[_mac(1)]
+    slow.disconnect_delay = 0.5
+    try:
+        await client.disconnect(_mac(1), timeout=0.2)
+        ok &= check("Disconnect timeout enforced", False)
+    except asyncio.TimeoutError:
+        ok &= check("Disconnect timeout enforced", True)
+    await asyncio.sleep(0.4)  # let the mock finish its slow call
+    slow.disconnect_delay = 0.0
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await client.disconnect(_mac(0))
+    dbus_ms = (time.perf_counter() - start) / rounds * 1000
+
+    for device in bluez.devices.values():
+        device.disconnect_delay = 0.05
+    start = time.perf_counter()
+    await asyncio.gather(*(client.disconnect(_mac(i)) for i in range(count)))
+    concurrent_ms = (time.perf_counter() - start) * 1000
+
+    print()
+    print(f"Device1.Disconnect round trip:      {dbus_ms:8.3f} ms")
+    print(f"{count} concurrent disconnects (50 ms each): {concurrent_ms:8.1f} ms total")
+    return ok
+
+def spawn_cost(rounds=20):
+    cmd = ["bluetoothctl", "--version"] if shutil.which("bluetoothctl") else ["true"]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cmd[0], (time.perf_counter() - start) / rounds * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="BlueZ D-Bus backend check and benchmark")
+    parser.add_argument("--count", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    with private_bus() as address:
+        ok = asyncio.run(run(address, args.count, args.rounds))
+
+    name, ms = spawn_cost()
+    print(f"{name} process spawn (lower bound):  {ms:8.3f} ms")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# benchmarks/bench_bulk.py
+#
+# Closing the room: disconnect every controller of a running daemon, one
+# `disconnect` request per player (what scripting --disconnect N did) vs one
+# `disconnect_all`. The daemon runs with N fake controllers against a mock
+# BlueZ whose Disconnect takes DELAY seconds, like a real Bluetooth link
+# teardown. Per case it reports the wall time, how many controllers were
+# disconnected, and the worst `status` round trip seen while it ran (the
+# daemon must keep serving while disconnects are in flight).
+#
+# The "stuck" row gives one controller a Disconnect that never answers in
+# time: the per-disconnect timeout bounds the batch, the rest still succeed.
+#
+#   python3 benchmarks/bench_bulk.py [--counts 1 4 12] [--engines threaded async]
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DELAY = 0.5  # seconds per Disconnect on the mock BlueZ
+STUCK_DELAY = 30  # longer than the daemon's disconnect timeout
+
+
+def run_child(engine, sysfs, fds):
+    from fakes import FakeInputDevice
+    from monitor import macs
+    from monitor.monitor import scan_loop
+
+    macs._index = macs.DeviceIndex(sysfs)
+    nodes = {f"/dev/input/event{i}": fd for i, fd in enumerate(fds)}
+
+    def open_device(path):
+        try:
+            return FakeInputDevice(nodes.pop(path), path)
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if engine == "threaded":
+        scan_loop(open_device)
+    else:
+        from monitor.engine import run_engine
+        run_engine(open_device)
+
+
+def wait_status(count, timeout=15):
+    from monitor.sockapi import request
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if len(request("status", timeout=1)) == count:
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"no daemon serving {count} controllers")
+
+def watch_latency(stop):
+    """Worst status round trip (ms) until `stop` is set."""
+    from monitor.sockapi import Client
+
+    worst = 0.0
+    with Client(timeout=30) as client:
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.call("status")
+            worst = max(worst, time.perf_counter() - start)
+            time.sleep(0.005)
+    return worst * 1000
+
+def run_case(engine, count, mode, env, sysfs, read_fds):
+    from monitor.sockapi import Client
+
+    args = [sys.executable, __file__, "--child", engine, "--sysfs", sysfs, "--fds", *map(str, read_fds)]
+    proc = subprocess.Popen(args, pass_fds=read_fds, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_status(count)
+        time.sleep(0.5)  # connect toasts and trust calls
+        stop = threading.Event()
+        worst = []
+        watcher = threading.Thread(target=lambda: worst.append(watch_latency(stop)))
+        watcher.start()
+
+        start = time.monotonic()
+        with Client(timeout=60) as client:
+            if mode == "one by one":
+                replies = [client.call("disconnect", player=player) for player in range(1, count + 1)]
+                done = sum(reply.startswith("Disconnected") for reply in replies)
+            else:
+                done = sum(result["ok"] for result in client.call("disconnect_all"))
+        elapsed = time.monotonic() - start
+        stop.set()
+        watcher.join()
+        return {"seconds": elapsed, "done": done, "status_ms": worst[0]}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Disconnecting many controllers: one by one vs bulk")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 4, 12])
+    parser.add_argument("--engines", nargs="+", choices=["threaded", "async"], default=["threaded", "async"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--sysfs", help=argparse.SUPPRESS)
+    parser.add_argument("--fds", type=int, nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.sysfs, args.fds)
+        return
+
+    from bench_scale import make_sysfs, fake_mac
+    from services import private_bus, MockBlueZ, MockUPower, MockNotifications
+
+    print(f"mock BlueZ Disconnect takes {DELAY}s; stuck = one pad's takes {STUCK_DELAY}s\n")
+    print(f"{'engine':>9} {'pads':>5} {'mode':>11} {'seconds':>8} {'done':>5} {'worst status ms':>16}")
+    ok = True
+    cases = [(count, mode, False) for count in args.counts for mode in ("one by one", "bulk")]
+    cases.append((max(args.counts), "bulk", True))
+    for engine in args.engines:
+        for count, mode, stuck in cases:
+            with tempfile.TemporaryDirectory() as tmp, private_bus() as address:
+                home = os.path.join(tmp, "home")
+                runtime = os.path.join(tmp, "run")
+                config_dir = os.path.join(home, ".config", "ps5-idle-timeout")
+                os.makedirs(config_dir)
+                os.makedirs(runtime, mode=0o700)
+                with open(os.path.join(config_dir, "config.ini"), "w") as f:
+                    f.write(f"[monitor]\nidle_timeout = 600\nengine = {engine}\n"
+                            "discovery = poll\nrescan_interval = 1\n")
+                sysfs = os.path.join(tmp, "sys")
+                os.makedirs(sysfs)
+                make_sysfs(sysfs, count)
+                env = dict(os.environ, HOME=home, XDG_RUNTIME_DIR=runtime,
+                           DBUS_SYSTEM_BUS_ADDRESS=address, DBUS_SESSION_BUS_ADDRESS=address)
+                os.environ["XDG_RUNTIME_DIR"] = runtime
+
+                loop = asyncio.new_event_loop()
+                loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+                loop_thread.start()
+
+                async def start_services():
+                    bluez = await MockBlueZ.start(address)
+                    upower = await MockUPower.start(address)
+                    notifications = await MockNotifications.start(address)
+                    for i in range(count):
+                        delay = STUCK_DELAY if stuck and i == 0 else DELAY
+                        bluez.add_device(fake_mac(i), disconnect_delay=delay)
+                        upower.add_device(fake_mac(i), percentage=80)
+                    return bluez, upower, notifications
+
+                async def stop_services(services):
+                    for service in services:
+                        service.bus.disconnect()
+                        await service.bus.wait_for_disconnect()
+                    for task in asyncio.all_tasks():
+                        if task is not asyncio.current_task():
+                            task.cancel()  # the stuck Disconnect
+
+                services = asyncio.run_coroutine_threadsafe(start_services(), loop).result(10)
+                pipes = [os.pipe() for _ in range(count)]
+                try:
+                    r = run_case(engine, count, mode, env, sysfs, [r for r, _ in pipes])
+                finally:
+                    for fds in pipes:
+                        for fd in fds:
+                            os.close(fd)
+                    asyncio.run_coroutine_threadsafe(stop_services(services), loop).result(10)
+                    loop.call_soon_threadsafe(loop.stop)
+                    loop_thread.join()
+
+            label = "bulk stuck" if stuck else mode
+            print(f"{engine:>9} {count:>5} {label:>11} {r['seconds']:>8.2f} {r['done']:>5} {r['status_ms']:>16.1f}")
+            expected = count - 1 if stuck else count
+            ok &= r["done"] == expected and r["status_ms"] < 250
+            if mode == "bulk" and not stuck:
+                ok &= r["seconds"] < DELAY * 3
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# benchmarks/bench_engine.py
+#
+# Threaded vs asyncio engine, event-driven vs sampling input: CPU% and
+# context switches with N simulated controllers streaming stick drift at a
+# fixed report rate.
+#
+#   python3 benchmarks/bench_engine.py --counts 1 8 32 --duration 5 --rate 250
+#   python3 benchmarks/bench_engine.py --modes sampling --sample-interval 0.5
+#
+# Each (engine, N) run happens in a fresh child process that only consumes;
+# the parent writes the fake input_event streams into pipes. The child
+# reports "ready" and its numbers on a pipe of their own, since the
+# daemon's log lines go to stdout from whichever thread is logging.
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _usage():
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime, ru.ru_nvcsw + ru.ru_nivcsw
+
+def run_child(engine, fds, duration, report_fd):
+    from fakes import FakeInputDevice
+    from monitor import monitor
+    from monitor.config import get_config
+
+    fakes = {f"/dev/input/fake{i}": FakeInputDevice(fd, f"/dev/input/fake{i}") for i, fd in enumerate(fds)}
+    open_device = fakes.__getitem__
+    report = os.fdopen(report_fd, "w")
+
+    if engine == "threaded":
+        from monitor.controller import ControllerState
+        for path in fakes:
+            state = ControllerState(path, "DualSense Wireless Controller", None, get_config().stick_drift_threshold)
+            threading.Thread(target=monitor.monitor_controller, args=(state, threading.Event(), open_device), daemon=True).start()
+        print("ready", file=report, flush=True)
+        cpu0, csw0 = _usage()
+        time.sleep(duration)
+    else:
+        from monitor.engine import Engine
+
+        async def main():
+            eng = Engine(asyncio.get_running_loop(), open_device=open_device)
+            for path in fakes:
+                eng.add_controller(path, "DualSense Wireless Controller", None)
+            print("ready", file=report, flush=True)
+            start = _usage()
+            await asyncio.sleep(duration)
+            return start
+
+        cpu0, csw0 = asyncio.run(main())
+
+    cpu1, csw1 = _usage()
+    print(json.dumps({
+        "cpu_percent": round(100 * (cpu1 - cpu0) / duration, 2),
+        "context_switches_per_s": round((csw1 - csw0) / duration, 1),
+        "threads": threading.active_count(),
+    }), file=report, flush=True)
+    os._exit(0)
+
+def run_case(engine, count, duration, rate, home):
+    from fakes import stick_frame
+
+    pipes = [os.pipe() for _ in range(count)]
+    read_fds = [r for r, _ in pipes]
+    report_r, report_w = os.pipe()
+    env = dict(os.environ, HOME=home)
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--child", engine, "--duration", str(duration),
+         "--report-fd", str(report_w), "--fds", *map(str, read_fds)],
+        pass_fds=[*read_fds, report_w], stdout=subprocess.DEVNULL, env=env,
+    )
+    for r in read_fds + [report_w]:
+        os.close(r)
+
+    report = os.fdopen(report_r)
+    lines = (line.strip() for line in report)
+    if next(lines, None) != "ready":
+        proc.wait()
+        raise RuntimeError(f"{engine} child exited with {proc.returncode} before it was ready")
+
+    # Keep feeding a little past the measurement window; the child exits
+    # (closing its ends) as soon as it has its numbers.
+    interval = 1.0 / rate
+    deadline = time.monotonic() + duration + 0.5
+    next_tick = time.monotonic()
+    try:
+        while time.monotonic() < deadline:
+            now = time.time()
+            for _, w in pipes:
+                os.write(w, stick_frame(now))
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    except BrokenPipeError:
+        pass
+
+    line = next(lines, None)
+    report.close()
+    proc.wait()
+    if line is None:
+        raise RuntimeError(f"{engine} child exited with {proc.returncode} without a result")
+    result = json.loads(line)
+    for _, w in pipes:
+        os.close(w)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine and input mode benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--rate", type=int, default=250, help="Reports per second per controller")
+    parser.add_argument("--modes", nargs="+", choices=["events", "sampling"], default=["events", "sampling"])
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--child", choices=["threaded", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--fds", type=int, nargs="*", help=argparse.SUPPRESS)
+    parser.add_argument("--report-fd", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.fds, args.duration, args.report_fd)
+        return
+
+    print(f"{'controllers':>11} {'engine':>9} {'input':>9} {'cpu %':>8} {'ctx sw/s':>10} {'threads':>8}")
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as home:
+            # Long idle timeout so nothing gets disconnected mid-run
+            config_dir = os.path.join(home, ".config", "ps5-idle-timeout")
+            os.makedirs(config_dir)
+            with open(os.path.join(config_dir, "config.ini"), "w") as f:
+                f.write(f"[monitor]\nidle_timeout = 100000\ninput_mode = {mode}\nsample_interval = {args.sample_interval}\n")
+
+            for count in args.counts:
+                for engine in ("threaded", "async"):
+                    r = run_case(engine, count, args.duration, args.rate, home)
+                    print(f"{count:>11} {engine:>9} {mode:>9} {r['cpu_percent']:>8} {r['context_switches_per_s']:>10} {r['threads']:>8}")
+
+if __name__ == "__main__":
+    main()
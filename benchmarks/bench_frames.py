@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# benchmarks/bench_frames.py
+#
+# Per-event CPU cost of the activity filter on a high-rate stream: the old
+# event-at-a-time loop from monitor_controller versus the SYN_REPORT
+# frame-batched ControllerState.handle_events.
+#
+#   python3 benchmarks/bench_frames.py [--seconds 60] [--rate 250] [--batch 64]
+
+import argparse
+import os
+import sys
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from evdev import ecodes
+from fakes import dualsense_stream
+from monitor.config import load_config
+from monitor.controller import ControllerState
+
+THRESHOLD = 10
+
+
+def per_event(events, reload_config):
+    """The pre-batching loop body, one event at a time."""
+    abs_state = {}
+    last_input = time.time()
+    active = 0
+    for event in events:
+        if event.type == ecodes.EV_ABS:
+            prev = abs_state.get(event.code, event.value)
+            delta = abs(event.value - prev)
+            abs_state[event.code] = event.value
+            if event.code in (ecodes.ABS_HAT0X, ecodes.ABS_HAT0Y) and event.value != 0:
+                last_input = time.time()
+                active += 1
+            if delta > THRESHOLD:
+                last_input = time.time()
+                active += 1
+        elif event.type == ecodes.EV_KEY:
+            last_input = time.time()
+            active += 1
+        timeout = int(load_config()["monitor"]["idle_timeout"]) if reload_config else 300
+        if time.time() - last_input > timeout:
+            pass
+    return active
+
+def batched(events, batch):
+    state = ControllerState("/dev/input/bench", "bench", None, THRESHOLD)
+    state.kernel_clock = True
+    active = 0
+    for i in range(0, len(events), batch):
+        active += state.handle_events(events[i:i + batch])
+    return active
+
+def cpu_ns_per_event(fn, events, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time_ns()
+        fn(events, *args)
+        elapsed = time.process_time_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(events)
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame-batched activity filter benchmark")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--rate", type=int, default=250, help="Reports per second")
+    parser.add_argument("--batch", type=int, default=64, help="Events per dev.read() batch")
+    args = parser.parse_args()
+
+    events = dualsense_stream(args.seconds, args.rate)
+    print(f"{len(events)} events, {int(args.seconds * args.rate)} frames\n")
+
+    # The config-reloading variant is what monitor_controller did before the
+    # config snapshot; it is slow, so time it on a slice.
+    sample = events[:20000]
+    rows = [
+        ("per event + config reload (original)", cpu_ns_per_event(per_event, sample, True, repeat=1)),
+        ("per event", cpu_ns_per_event(per_event, events, False)),
+        (f"SYN_REPORT frames, batch {args.batch}", cpu_ns_per_event(batched, events, args.batch)),
+    ]
+    original, per_event_ns = rows[0][1], rows[1][1]
+    print(f"{'':<40} {'ns/event':>10} {'vs original':>12} {'vs per event':>13}")
+    for label, ns in rows:
+        print(f"{label:<40} {ns:10.1f} {original / ns:11.1f}x {per_event_ns / ns:12.2f}x")
+
+if __name__ == "__main__":
+    main()
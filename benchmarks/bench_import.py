@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# benchmarks/bench_import.py
+#
+# Import cost of the client-only commands (`--version`, `--status`), measured
+# with `python -X importtime`, plus a check that they never pull in the
+# daemon's modules or start threads. Exits non-zero when over budget, so it
+# can guard against regressions:
+#
+#   python3 benchmarks/bench_import.py [--budget-ms 20] [--runs 5]
+
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ENTRY = os.path.join(REPO_DIR, "ps5-idle-timeout.py")
+
+COMMANDS = (["--version"], ["--status"])
+
+# None of these belong in a client process
+DAEMON_MODULES = (
+    "evdev", "dbus_next", "asyncio", "gi", "dbus.mainloop.glib",
+    "monitor.monitor", "monitor.engine", "monitor.battery", "monitor.bluez",
+    "monitor.dbus_api", "monitor.aioloop",
+)
+
+# Runs the entry point in-process, then reports what got loaded. Imports
+# before the marker are the interpreter's and the probe's own.
+MARKER = "-- entry point --"
+PROBE = """
+import runpy, sys, threading
+import pkgutil  # run_path imports this lazily; keep it out of the measurement
+sys.argv = [{entry!r}, *{args!r}]
+print({marker!r}, file=sys.stderr, flush=True)
+runpy.run_path({entry!r}, run_name="__main__")
+print("modules", *sorted(sys.modules), file=sys.stderr)
+print("threads", threading.active_count(), file=sys.stderr)
+"""
+
+
+def parse_importtime(stderr):
+    """(total cumulative us of the entry point's top-level imports, {module: cumulative us})"""
+    total = 0
+    modules = {}
+    lines = stderr.splitlines()
+    for line in lines[lines.index(MARKER) + 1:]:
+        if not line.startswith("import time:"):
+            continue
+        _self_us, cumulative, name = line.split(":", 1)[1].split("|")
+        modules[name.strip()] = int(cumulative)
+        if not name.startswith("  "):  # nested imports are indented further
+            total += int(cumulative)
+    return total, modules
+
+def measure(args, runs):
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE.format(entry=ENTRY, args=args, marker=MARKER)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, cwd=REPO_DIR,
+        )
+        total, modules = parse_importtime(proc.stderr)
+        if best is None or total < best[0]:
+            best = (total, modules, proc.stderr)
+
+    total, modules, stderr = best
+    loaded, threads = set(), None
+    for line in stderr.splitlines():
+        if line.startswith("modules "):
+            loaded = set(line.split()[1:])
+        elif line.startswith("threads "):
+            threads = int(line.split()[1])
+    monitor_modules = {name: us for name, us in modules.items() if name.startswith("monitor")}
+    return total, monitor_modules, loaded, threads
+
+def main():
+    parser = argparse.ArgumentParser(description="Client command import-time benchmark")
+    parser.add_argument("--budget-ms", type=float, default=20.0, help="Max import time per command (best of --runs)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    ok = True
+    for command in COMMANDS:
+        total, monitor_modules, loaded, threads = measure(command, args.runs)
+        leaked = sorted(m for m in DAEMON_MODULES if m in loaded)
+        over = total / 1000 > args.budget_ms
+
+        print(f"ps5-idle-timeout {' '.join(command)}")
+        print(f"  imports: {total / 1000:7.1f} ms (budget {args.budget_ms:.0f} ms){'  OVER BUDGET' if over else ''}")
+        for name, us in sorted(monitor_modules.items(), key=lambda kv: -kv[1]):
+            print(f"    {name:<24} {us / 1000:6.1f} ms")
+        print(f"  threads at exit: {threads}")
+        if leaked:
+            print(f"  daemon modules imported: {', '.join(leaked)}")
+        ok &= not over and not leaked and threads == 1
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# benchmarks/bench_restart.py
+#
+# Restarts a daemon watching N fake controllers three ways and checks what
+# survives:
+#
+#   takeover    new daemon with --takeover: checkpoint + evdev fds over the socket
+#   checkpoint  SIGTERM (checkpoint file), then a plain start
+#   cold        SIGKILL (nothing saved), then a plain start
+#
+# Per case it reports how long until the new daemon serves every controller
+# again, how far the idle timers moved from where they should be, whether the
+# player numbers stayed, and whether a button press right after the restart
+# reaches the new daemon. With takeover the new daemon opens unrelated
+# placeholder pipes, so it only sees the press if the handed-over fds were
+# adopted.
+#
+#   python3 benchmarks/bench_restart.py [--counts 1 8] [--engines threaded async]
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+IDLE_TIMEOUT = 60
+AGE = 3  # seconds the old daemon runs before the restart
+
+
+def run_child(engine, sysfs, fds, takeover):
+    from fakes import FakeInputDevice
+    from monitor import macs, checkpoint
+    from monitor.monitor import scan_loop, shutdown_all_threads
+
+    macs._index = macs.DeviceIndex(sysfs)
+    nodes = {f"/dev/input/event{i}": fd for i, fd in enumerate(fds)}
+    placeholders = []
+
+    def open_device(path):
+        if takeover:
+            # Deliberately not the controller's pipe: only an adopted fd sees its input
+            r, w = os.pipe()
+            placeholders.append(w)
+            return FakeInputDevice(r, path)
+        try:
+            return FakeInputDevice(nodes.pop(path), path)
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    checkpoint.takeover_requested = takeover
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if engine == "threaded":
+            scan_loop(open_device)
+        else:
+            from monitor.engine import run_engine
+            run_engine(open_device)
+    except (KeyboardInterrupt, SystemExit):
+        checkpoint.save()
+        shutdown_all_threads()
+
+
+def wait_status(count, timeout=15, old=None):
+    """Poll the socket until it serves `count` controllers (from a process
+    other than `old`); returns (status, time)."""
+    from monitor.sockapi import request
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if old is None or old.poll() is not None:
+            try:
+                data = request("status", timeout=1)
+                if len(data) == count:
+                    return data, time.monotonic()
+            except (OSError, ValueError):
+                pass
+        time.sleep(0.002)
+    raise TimeoutError(f"no daemon serving {count} controllers")
+
+def run_case(engine, count, mode, env, sysfs, write_fds, read_fds):
+    from fakes import stick_frame, button_frames
+
+    def spawn(takeover=False):
+        args = [sys.executable, __file__, "--child", engine, "--sysfs", sysfs, "--fds", *map(str, read_fds)]
+        return subprocess.Popen(args + (["--takeover"] if takeover else []), pass_fds=read_fds, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    old = spawn()
+    new = None
+    try:
+        wait_status(count)
+        stop = threading.Event()
+
+        def drift():
+            while not stop.is_set():
+                for fd in write_fds:
+                    os.write(fd, stick_frame(time.monotonic()))
+                stop.wait(0.02)
+
+        feeder = threading.Thread(target=drift, daemon=True)
+        feeder.start()
+        time.sleep(AGE)
+        before, seen_before = wait_status(count)
+
+        start = time.monotonic()
+        if mode == "takeover":
+            new = spawn(takeover=True)
+        else:
+            old.send_signal(signal.SIGTERM if mode == "checkpoint" else signal.SIGKILL)
+            old.wait()
+            new = spawn()
+        after, seen_after = wait_status(count, old=old)
+        restart_ms = (seen_after - start) * 1000
+
+        by_mac = {info["mac"]: info for info in after.values()}
+        elapsed = seen_after - seen_before
+        timer_error = max(abs(by_mac[info["mac"]]["idle_remaining"] - (info["idle_remaining"] - elapsed))
+                          for info in before.values())
+        players_kept = all(by_mac[info["mac"]]["player"] == info["player"] for info in before.values())
+
+        stop.set()
+        feeder.join()
+        for fd in write_fds:
+            os.write(fd, button_frames(time.monotonic()))
+        time.sleep(0.3)
+        pressed, _ = wait_status(count)
+        input_seen = all(info["idle_remaining"] > IDLE_TIMEOUT - 1 for info in pressed.values())
+        return {"restart_ms": restart_ms, "timer_error_s": timer_error, "players_kept": players_kept,
+                "input_seen": input_seen, "old_exited": old.poll() is not None}
+    finally:
+        for proc in (old, new):
+            if proc is not None and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="What survives a daemon restart")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--engines", nargs="+", choices=["threaded", "async"], default=["threaded", "async"])
+    parser.add_argument("--modes", nargs="+", choices=["takeover", "checkpoint", "cold"],
+                        default=["takeover", "checkpoint", "cold"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--sysfs", help=argparse.SUPPRESS)
+    parser.add_argument("--fds", type=int, nargs="*", help=argparse.SUPPRESS)
+    parser.add_argument("--takeover", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.sysfs, args.fds, args.takeover)
+        return
+
+    from bench_scale import make_sysfs, fake_mac
+    from services import private_bus, MockBlueZ, MockUPower, MockNotifications
+
+    print(f"idle_timeout {IDLE_TIMEOUT}s, old daemon runs {AGE}s before the restart\n")
+    print(f"{'engine':>9} {'pads':>5} {'mode':>11} {'restart ms':>11} {'timer err s':>12} "
+          f"{'players':>8} {'input':>6} {'old gone':>9}")
+    ok = True
+    for engine in args.engines:
+        for count in args.counts:
+            for mode in args.modes:
+                with tempfile.TemporaryDirectory() as tmp, private_bus() as address:
+                    home = os.path.join(tmp, "home")
+                    runtime = os.path.join(tmp, "run")
+                    config_dir = os.path.join(home, ".config", "ps5-idle-timeout")
+                    os.makedirs(config_dir)
+                    os.makedirs(runtime, mode=0o700)
+                    with open(os.path.join(config_dir, "config.ini"), "w") as f:
+                        f.write(f"[monitor]\nidle_timeout = {IDLE_TIMEOUT}\nengine = {engine}\n"
+                                "discovery = poll\nrescan_interval = 1\n")
+                    sysfs = os.path.join(tmp, "sys")
+                    make_sysfs(sysfs, count)
+                    env = dict(os.environ, HOME=home, XDG_RUNTIME_DIR=runtime,
+                               DBUS_SYSTEM_BUS_ADDRESS=address, DBUS_SESSION_BUS_ADDRESS=address)
+                    os.environ["XDG_RUNTIME_DIR"] = runtime
+
+                    loop = asyncio.new_event_loop()
+                    loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+                    loop_thread.start()
+
+                    async def start_services():
+                        bluez = await MockBlueZ.start(address)
+                        upower = await MockUPower.start(address)
+                        notifications = await MockNotifications.start(address)
+                        for i in range(count):
+                            bluez.add_device(fake_mac(i))
+                            upower.add_device(fake_mac(i), percentage=80)
+                        return bluez, upower, notifications
+
+                    async def stop_services(services):
+                        for service in services:
+                            service.bus.disconnect()
+                            await service.bus.wait_for_disconnect()
+
+                    services = asyncio.run_coroutine_threadsafe(start_services(), loop).result(10)
+                    pipes = [os.pipe() for _ in range(count)]
+                    try:
+                        r = run_case(engine, count, mode, env, sysfs, [w for _, w in pipes], [r for r, _ in pipes])
+                    finally:
+                        for fds in pipes:
+                            for fd in fds:
+                                os.close(fd)
+                        asyncio.run_coroutine_threadsafe(stop_services(services), loop).result(10)
+                        loop.call_soon_threadsafe(loop.stop)
+                        loop_thread.join()
+
+                print(f"{engine:>9} {count:>5} {mode:>11} {r['restart_ms']:>11.0f} {r['timer_error_s']:>12.1f} "
+                      f"{'kept' if r['players_kept'] else 'moved':>8} {'yes' if r['input_seen'] else 'no':>6} "
+                      f"{'yes' if r['old_exited'] else 'no':>9}")
+                if mode != "cold":
+                    ok &= r["timer_error_s"] < 1 and r["players_kept"] and r["input_seen"] and r["old_exited"]
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# benchmarks/bench_scale.py
+#
+# End-to-end scaling run: the real daemon (scan_loop or the asyncio engine)
+# with N synthetic controllers, a fake sysfs tree, and UPower / BlueZ /
+# Notifications stand-ins on a private dbus-daemon. No Bluetooth hardware
+# needed. Per (engine, N) it reports:
+#
+#   cpu %, context switches/s   while every pad streams stick drift
+#   event latency               pipe write -> daemon read, for button presses
+#   status                      cost of one collect_status() call
+#   idle -> disconnect          idle deadline -> Disconnect() on the mock BlueZ
+#   rss, threads                of the daemon process
+#
+#   python3 benchmarks/bench_scale.py --counts 1 4 16 64 --out scale.json
+#   python3 benchmarks/bench_scale.py --compare scale-old.json
+#
+# Results are saved as JSON (with the commit they were measured on) so two
+# commits can be compared on the same box.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+IDLE_TIMEOUT = 5  # the config minimum
+STATUS_CALLS = 1000
+COLUMNS = (
+    # key, header, format
+    ("cpu_percent", "cpu %", "{:.2f}"),
+    ("context_switches_per_s", "ctx sw/s", "{:.0f}"),
+    ("event_latency_p50_ms", "ev p50 ms", "{:.3f}"),
+    ("event_latency_p99_ms", "ev p99 ms", "{:.3f}"),
+    ("status_us", "status us", "{:.1f}"),
+    ("disconnect_latency_p50_ms", "idle p50 ms", "{:.0f}"),
+    ("disconnect_latency_max_ms", "idle max ms", "{:.0f}"),
+    ("rss_kb", "rss kB", "{:.0f}"),
+    ("threads", "threads", "{:.0f}"),
+)
+
+
+def _usage():
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    return ru.ru_utime + ru.ru_stime, ru.ru_nvcsw + ru.ru_nivcsw
+
+def _proc_status(*fields):
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in fields:
+                values[key] = int(value.split()[0])
+    return values
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+def fake_mac(i):
+    return f"02:00:00:00:{i // 256:02x}:{i % 256:02x}"
+
+def make_sysfs(root, count):
+    """class/input-style tree with one DualSense gamepad node per controller."""
+    for i in range(count):
+        device = os.path.join(root, f"event{i}", "device")
+        os.makedirs(os.path.join(device, "id"))
+        for name, value in (
+            ("id/vendor", "054c"), ("id/product", "0ce6"), ("properties", "0"),
+            ("name", "DualSense Wireless Controller"), ("uniq", fake_mac(i)),
+            ("phys", f"00:00:00:00:00:00/input{i}"),
+        ):
+            with open(os.path.join(device, name), "w") as f:
+                f.write(value + "\n")
+
+
+def run_child(engine, sysfs, fds, count, duration):
+    from fakes import FakeInputDevice
+    from monitor import macs, monitor
+
+    # Discovery reads the fake tree instead of /sys/class/input
+    macs._index = macs.DeviceIndex(sysfs)
+    latencies = []
+    devices = {}
+    for i, fd in enumerate(fds):
+        dev = FakeInputDevice(fd, f"/dev/input/event{i}")
+        dev.latencies = latencies
+        devices[dev.path] = dev
+
+    def open_device(path):
+        # A real node goes away with the Bluetooth link; the fake sysfs entry
+        # stays, so a rescan after an idle disconnect must not get it back
+        try:
+            return devices.pop(path)
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    if engine == "threaded":
+        target = monitor.scan_loop
+    else:
+        from monitor.engine import run_engine
+        target = run_engine
+    threading.Thread(target=target, args=(open_device,), daemon=True).start()
+
+    deadline = time.monotonic() + 30
+    while len(monitor.status.current()) < count and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(1)  # let connect toasts, trust calls and battery lookups settle
+    print("ready", flush=True)
+
+    latencies.clear()
+    cpu0, csw0 = _usage()
+    time.sleep(duration)
+    cpu1, csw1 = _usage()
+    seen = list(latencies)
+
+    start = time.perf_counter()
+    for _ in range(STATUS_CALLS):
+        monitor.collect_status()
+    status_us = (time.perf_counter() - start) / STATUS_CALLS * 1e6
+
+    proc = _proc_status("VmRSS", "VmHWM", "Threads")
+    print(json.dumps({
+        "controllers_seen": len(monitor.status.current()),
+        "cpu_percent": round(100 * (cpu1 - cpu0) / duration, 2),
+        "context_switches_per_s": round((csw1 - csw0) / duration, 1),
+        "key_events": len(seen),
+        "event_latency_p50_ms": round(percentile(seen, 50) * 1000, 3) if seen else None,
+        "event_latency_p99_ms": round(percentile(seen, 99) * 1000, 3) if seen else None,
+        "event_latency_max_ms": round(max(seen) * 1000, 3) if seen else None,
+        "status_us": round(status_us, 2),
+        "rss_kb": proc.get("VmRSS"),
+        "peak_rss_kb": proc.get("VmHWM"),
+        "threads": proc.get("Threads"),
+    }), flush=True)
+
+    # Keep running for the idle phase; the parent kills us afterwards
+    threading.Event().wait()
+
+
+class Feeder(threading.Thread):
+    """Writes stick drift into every pipe at `rate` Hz, plus a button press
+    per controller every `press_every` seconds while `pressing` is set."""
+
+    def __init__(self, write_fds, rate, press_every):
+        super().__init__(daemon=True)
+        self.write_fds = write_fds
+        self.rate = rate
+        self.press_every = press_every
+        self.pressing = threading.Event()
+        self.pressing.set()
+        self.stop = threading.Event()
+        self.last_press = [0.0] * len(write_fds)
+        self.dropped = 0
+        for fd in write_fds:
+            os.set_blocking(fd, False)
+
+    def _write(self, fd, data):
+        try:
+            os.write(fd, data)
+        except BlockingIOError:
+            self.dropped += 1  # the daemon fell behind; don't stall the other pads
+        except BrokenPipeError:
+            self.stop.set()
+
+    def run(self):
+        from fakes import stick_frame, button_frames
+
+        count = len(self.write_fds)
+        interval = 1.0 / self.rate
+        # Stagger the presses so they don't all land in one tick
+        next_press = [time.monotonic() + self.press_every * i / count for i in range(count)]
+        next_tick = time.monotonic()
+        while not self.stop.is_set():
+            now = time.monotonic()
+            pressing = self.pressing.is_set()
+            for i, fd in enumerate(self.write_fds):
+                self._write(fd, stick_frame(now))
+                if pressing and now >= next_press[i]:
+                    self._write(fd, button_frames(now))
+                    self.last_press[i] = now
+                    next_press[i] += self.press_every
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def run_case(engine, count, args):
+    from services import private_bus, MockBlueZ, MockUPower, MockNotifications
+
+    with tempfile.TemporaryDirectory() as tmp, private_bus() as address:
+        home = os.path.join(tmp, "home")
+        config_dir = os.path.join(home, ".config", "ps5-idle-timeout")
+        os.makedirs(config_dir)
+        with open(os.path.join(config_dir, "config.ini"), "w") as f:
+            f.write(f"[monitor]\nidle_timeout = {IDLE_TIMEOUT}\nengine = {engine}\n"
+                    "discovery = poll\nrescan_interval = 1\n")
+        sysfs = os.path.join(tmp, "sys")
+        make_sysfs(sysfs, count)
+
+        loop = asyncio.new_event_loop()
+        loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+        loop_thread.start()
+
+        def on_loop(coro):
+            return asyncio.run_coroutine_threadsafe(coro, loop).result(10)
+
+        async def start_services():
+            bluez = await MockBlueZ.start(address)
+            upower = await MockUPower.start(address)
+            notifications = await MockNotifications.start(address)
+            for i in range(count):
+                bluez.add_device(fake_mac(i))
+                upower.add_device(fake_mac(i), percentage=80 - i % 60)
+            return bluez, upower, notifications
+
+        async def stop_services(*services):
+            # Hang up before the bus daemon goes away under the readers
+            for service in services:
+                service.bus.disconnect()
+                await service.bus.wait_for_disconnect()
+
+        bluez, upower, notifications = on_loop(start_services())
+
+        pipes = [os.pipe() for _ in range(count)]
+        read_fds = [r for r, _ in pipes]
+        env = dict(os.environ, HOME=home, DBUS_SYSTEM_BUS_ADDRESS=address, DBUS_SESSION_BUS_ADDRESS=address)
+        proc = subprocess.Popen(
+            [sys.executable, __file__, "--child", engine, "--sysfs", sysfs, "--duration", str(args.duration),
+             "--counts", str(count), "--fds", *map(str, read_fds)],
+            pass_fds=read_fds, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env,
+        )
+        for r in read_fds:
+            os.close(r)
+
+        feeder = Feeder([w for _, w in pipes], args.rate, args.press_every)
+        feeder.start()
+        try:
+            lines = iter(proc.stdout.readline, "")
+            for line in lines:
+                if line.strip() == "ready":
+                    break
+            result = next(json.loads(line) for line in lines if line.startswith("{"))
+
+            # Idle phase: stop pressing buttons (drift keeps coming) and wait
+            # for the mock BlueZ to see every Disconnect
+            feeder.pressing.clear()
+            time.sleep(0.05)  # a press may be mid-write
+            idle_deadlines = [t + IDLE_TIMEOUT for t in feeder.last_press]
+            give_up = max(idle_deadlines) + IDLE_TIMEOUT + 5
+            devices = [bluez.devices[fake_mac(i)] for i in range(count)]
+            while time.monotonic() < give_up and any(d.disconnected_at is None for d in devices):
+                time.sleep(0.05)
+        finally:
+            feeder.stop.set()
+            proc.kill()
+            proc.wait()
+            feeder.join()
+            for _, w in pipes:
+                os.close(w)
+            on_loop(stop_services(bluez, upower, notifications))
+            loop.call_soon_threadsafe(loop.stop)
+            loop_thread.join()
+
+        delays = [d.disconnected_at - deadline for d, deadline in zip(devices, idle_deadlines)
+                  if d.disconnected_at is not None]
+        result.update({
+            "engine": engine,
+            "controllers": count,
+            "disconnected": len(delays),
+            "disconnect_latency_p50_ms": round(percentile(delays, 50) * 1000, 1) if delays else None,
+            "disconnect_latency_max_ms": round(max(delays) * 1000, 1) if delays else None,
+            "notifications": len(notifications.sent),
+            "dropped_writes": feeder.dropped,
+        })
+        return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_table(results, baseline=None):
+    base = {(r["engine"], r["controllers"]): r for r in baseline["results"]} if baseline else {}
+    print(f"{'controllers':>11} {'engine':>9}" + "".join(f" {header:>14}" for _, header, _ in COLUMNS))
+    for r in results:
+        old = base.get((r["engine"], r["controllers"]))
+        cells = []
+        for key, _, fmt in COLUMNS:
+            value = r.get(key)
+            cell = "-" if value is None else fmt.format(value)
+            if old and old.get(key) and value is not None:
+                cell += f" {100 * (value - old[key]) / old[key]:+.0f}%"
+            cells.append(f" {cell:>14}")
+        print(f"{r['controllers']:>11} {r['engine']:>9}" + "".join(cells))
+        if r["disconnected"] < r["controllers"]:
+            print(f"{'':>21} only {r['disconnected']}/{r['controllers']} disconnected within the wait")
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end scaling benchmark with synthetic controllers")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--engines", nargs="+", choices=["threaded", "async"], default=["threaded", "async"])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of streaming per measurement")
+    parser.add_argument("--rate", type=int, default=250, help="Reports per second per controller")
+    parser.add_argument("--press-every", type=float, default=1.0, help="Seconds between button presses per controller")
+    parser.add_argument("--out", help="Write results here as JSON")
+    parser.add_argument("--compare", help="Earlier --out file to show changes against")
+    parser.add_argument("--child", choices=["threaded", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--sysfs", help=argparse.SUPPRESS)
+    parser.add_argument("--fds", type=int, nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.sysfs, args.fds, args.counts[0], args.duration)
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"changes against {baseline.get('commit') or args.compare}")
+
+    results = []
+    for count in args.counts:
+        for engine in args.engines:
+            results.append(run_case(engine, count, args))
+    print_table(results, baseline)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "settings": {"duration": args.duration, "rate": args.rate, "press_every": args.press_every,
+                             "idle_timeout": IDLE_TIMEOUT},
+                "results": results,
+            }, f, indent=2)
+        print(f"saved {args.out}")
+
+if __name__ == "__main__":
+    main()
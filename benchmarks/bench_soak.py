@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# benchmarks/bench_soak.py
+#
+# Memory across many simulated reconnects: each cycle registers a fake
+# controller on a fresh node path (like the kernel hands out a new eventN
+# on every reconnect), feeds it a few reports, then closes its pipe so the
+# engine sees the device go away and runs its normal cleanup. Exits
+# non-zero if traced memory keeps growing after warm-up or anything is left
+# registered.
+#
+#   python3 benchmarks/bench_soak.py [--cycles 10000] [--engines threaded async]
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep the events log and any toasts away from the real session
+os.environ["HOME"] = tempfile.mkdtemp(prefix="dualsense-soak-")
+os.environ["DBUS_SESSION_BUS_ADDRESS"] = "unix:path=/nonexistent"
+
+MACS = [f"02:00:00:00:00:{i:02x}" for i in range(4)]
+CHECKPOINTS = 10
+WARMUP = 0.2  # fraction of the run before the baseline is taken
+
+
+def _rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+def _checkpoint(cycle, start):
+    gc.collect()
+    return {
+        "cycle": cycle,
+        "traced_kb": tracemalloc.get_traced_memory()[0] / 1024,
+        "rss_kb": _rss_kb(),
+        "threads": threading.active_count(),
+        "seconds": time.monotonic() - start,
+    }
+
+def _feed(w):
+    from fakes import stick_frame, button_frames
+    now = time.monotonic()
+    os.write(w, stick_frame(now) + button_frames(now) + stick_frame(now))
+    os.close(w)  # EOF: the fake device raises OSError like a vanished node
+
+def soak_threaded(cycles, every):
+    from fakes import FakeInputDevice
+    from monitor import monitor
+
+    points = []
+    start = time.monotonic()
+    for i in range(cycles):
+        r, w = os.pipe()
+        path = f"/dev/input/event{1000 + i}"
+        entry = monitor.start_controller(path, "DualSense Wireless Controller", MACS[i % len(MACS)], [path],
+                                         lambda p, fd=r: FakeInputDevice(fd, p))
+        _feed(w)
+        entry.thread.join()
+        if (i + 1) % every == 0:
+            points.append(_checkpoint(i + 1, start))
+    return points, monitor.scheduler
+
+def soak_async(cycles, every):
+    from fakes import FakeInputDevice
+    from monitor.engine import Engine
+    from monitor.registry import registry
+
+    async def run():
+        fds = {}
+        engine = Engine(asyncio.get_running_loop(), open_device=lambda p: FakeInputDevice(fds.pop(p), p))
+        points = []
+        start = time.monotonic()
+        for i in range(cycles):
+            r, w = os.pipe()
+            path = f"/dev/input/event{1000 + i}"
+            fds[path] = r
+            engine.add_controller(path, "DualSense Wireless Controller", MACS[i % len(MACS)])
+            _feed(w)
+            while path in registry:
+                await asyncio.sleep(0)
+            if (i + 1) % every == 0:
+                points.append(_checkpoint(i + 1, start))
+        return points, engine
+
+    points, engine = asyncio.run(run())
+    assert not engine.devices and not engine._axes, "engine kept devices"
+    return points, engine.scheduler
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconnect soak test: memory must stay flat")
+    parser.add_argument("--cycles", type=int, default=10000)
+    parser.add_argument("--engines", nargs="+", choices=["threaded", "async"], default=["threaded", "async"])
+    parser.add_argument("--budget-kb", type=float, default=256, help="Allowed traced-memory growth after warm-up")
+    args = parser.parse_args()
+
+    from monitor.registry import registry
+    from monitor import status
+
+    every = max(1, args.cycles // CHECKPOINTS)
+    ok = True
+    for engine in args.engines:
+        tracemalloc.start()
+        threads_before = threading.active_count()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            points, scheduler = (soak_threaded if engine == "threaded" else soak_async)(args.cycles, every)
+        tracemalloc.stop()
+
+        print(f"{engine}: {args.cycles} reconnects")
+        print(f"{'cycle':>8} {'traced kB':>10} {'rss kB':>8} {'threads':>8} {'seconds':>8}")
+        for p in points:
+            print(f"{p['cycle']:>8} {p['traced_kb']:>10.1f} {p['rss_kb']:>8} {p['threads']:>8} {p['seconds']:>8.1f}")
+
+        baseline = points[max(0, int(len(points) * WARMUP) - 1)]
+        growth = points[-1]["traced_kb"] - baseline["traced_kb"]
+        leftovers = {
+            "registered": len(registry),
+            "status entries": len(status.current()),
+            "scheduler heap": len(scheduler._heap),
+            "extra threads": threading.active_count() - threads_before,
+        }
+        print(f"  growth after cycle {baseline['cycle']}: {growth:+.1f} kB (budget {args.budget_kb:.0f} kB)")
+        print("  left over: " + ", ".join(f"{k} {v}" for k, v in leftovers.items()))
+        ok &= growth <= args.budget_kb and not leftovers["registered"] and not leftovers["status entries"] \
+            and leftovers["scheduler heap"] <= 16
+        print()
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# benchmarks/bench_socket.py
+#
+# Round-trip latency of a status query over the Unix socket vs D-Bus,
+# against a stand-in daemon (real StatusService and socket server, fake
+# controllers in the status snapshot) on a private session bus.
+#
+#   python3 benchmarks/bench_socket.py [--controllers 4] [--requests 2000]
+#
+# warm = one connection reused for every request (panel scripts, --watch)
+# cold = connect, ask, disconnect per request (what one CLI call does)
+# cli  = wall time of a whole `ps5-idle-timeout --status` process
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ENTRY = os.path.join(REPO_DIR, "ps5-idle-timeout.py")
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_child(controllers):
+    from monitor import status
+    from monitor.controller import ControllerState
+    from monitor.socket_server import start_socket_server
+
+    entries = []
+    for i in range(controllers):
+        path = f"/dev/input/event{10 + i}"
+        state = ControllerState(path, "DualSense Wireless Controller", f"02:00:00:00:00:{i:02x}", 10)
+        entries.append(status.ControllerStatus(path, i + 1, state.name, state.mac, f"{80 - i}%", False, 600, state))
+    status.publish(entries)
+    start_socket_server()
+
+    try:
+        from monitor.dbus_api import install_main_loop, run_dbus_loop
+        install_main_loop()
+        print("ready dbus", file=sys.stderr, flush=True)
+        run_dbus_loop(status.status_dict)
+    except Exception as e:
+        print(f"ready nodbus {type(e).__name__}: {e}", file=sys.stderr, flush=True)
+        while True:
+            time.sleep(3600)
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1e6
+    return pick(50), pick(99)
+
+def time_calls(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+def socket_cases(n):
+    from monitor.sockapi import Client, request
+    client = Client()
+    yield "socket", "warm", time_calls(lambda: client.call("status"), n)
+    client.close()
+    yield "socket", "cold", time_calls(lambda: request("status"), max(1, n // 4))
+
+def dbus_cases(n, address):
+    import dbus
+
+    def proxy(bus):
+        remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
+        return dbus.Interface(remote, "org.dualsense.Monitor")
+
+    iface = proxy(dbus.bus.BusConnection(address))
+    yield "dbus", "warm", time_calls(lambda: iface.GetStatus(), n)
+
+    def cold():
+        bus = dbus.bus.BusConnection(address)
+        proxy(bus).GetStatus()
+        bus.close()
+    yield "dbus", "cold", time_calls(cold, max(1, n // 4))
+
+def cli_case(transport, env, runs):
+    if transport == "dbus":
+        env = dict(env, XDG_RUNTIME_DIR=tempfile.mkdtemp())  # no socket there: falls back to D-Bus
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, ENTRY, "--status"], env=env, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket vs D-Bus round-trip latency")
+    parser.add_argument("--controllers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--cli-runs", type=int, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.controllers)
+        return
+
+    from services import private_bus
+
+    with tempfile.TemporaryDirectory() as runtime, private_bus() as address:
+        env = dict(os.environ, XDG_RUNTIME_DIR=runtime, DBUS_SESSION_BUS_ADDRESS=address,
+                   HOME=os.path.join(runtime, "home"))
+        os.environ.update(XDG_RUNTIME_DIR=runtime, DBUS_SESSION_BUS_ADDRESS=address)
+        proc = subprocess.Popen([sys.executable, __file__, "--child", "--controllers", str(args.controllers)],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=env)
+        try:
+            line = ""
+            while not line.startswith("ready"):
+                line = proc.stderr.readline()
+                if not line:
+                    sys.exit("stand-in daemon exited")
+            have_dbus = line.split()[1] == "dbus"
+            time.sleep(0.5)  # bus name and socket both up
+
+            print(f"{args.controllers} controllers in the status")
+            print(f"{'transport':>10} {'mode':>6} {'p50 us':>10} {'p99 us':>10}")
+            rows = list(socket_cases(args.requests))
+            if have_dbus:
+                rows += list(dbus_cases(args.requests, address))
+            for transport in ("socket", "dbus") if have_dbus else ("socket",):
+                rows.append((transport, "cli", cli_case(transport, env, args.cli_runs)))
+            for transport, mode, (p50, p99) in rows:
+                print(f"{transport:>10} {mode:>6} {p50:>10.0f} {p99:>10.0f}")
+            if not have_dbus:
+                print(f"  D-Bus rows skipped, stand-in daemon has no D-Bus service ({line.split(None, 2)[2].strip()})")
+        finally:
+            proc.kill()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
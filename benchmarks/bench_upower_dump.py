@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# benchmarks/bench_upower_dump.py
+#
+# Parser cost of the bulk `upower --dump` fallback on captured dumps, plus
+# the process spawns it replaces.
+#
+#   python3 benchmarks/bench_upower_dump.py [--repeat 2000] [fixtures...]
+
+import argparse
+import glob
+import os
+import sys
+import timeit
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, REPO_DIR)
+
+from monitor.battery import parse_upower_dump
+
+
+def main():
+    parser = argparse.ArgumentParser(description="upower --dump parser benchmark")
+    parser.add_argument("fixtures", nargs="*", default=sorted(glob.glob(os.path.join(FIXTURES, "upower_dump_*.txt"))))
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<34} {'lines':>6} {'batteries':>9} {'µs/dump':>9} {'Mlines/s':>9} {'spawns old → new':>17}")
+    for path in args.fixtures:
+        with open(path) as f:
+            lines = f.read().splitlines()
+
+        table = parse_upower_dump(lines)
+        controllers = sum(1 for line in lines if "ps_controller_battery" in line and line.startswith("Device:"))
+        seconds = timeit.timeit(lambda: parse_upower_dump(lines), number=args.repeat) / args.repeat
+
+        # Old fallback: `upower -e` + one `upower -i` per controller, and it
+        # ran twice per cache refresh (battery level, then charging state).
+        old_spawns = 2 * (1 + controllers)
+        print(
+            f"{os.path.basename(path):<34} {len(lines):>6} {len(table):>9} "
+            f"{seconds * 1e6:>9.1f} {len(lines) / seconds / 1e6:>9.2f} {old_spawns:>11} → 1"
+        )
+
+if __name__ == "__main__":
+    main()
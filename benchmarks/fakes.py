@@ -0,0 +1,118 @@
+# benchmarks/fakes.py
+#
+# Stand-ins used by the benchmarks so they run on a box with no controllers.
+
+import os
+import random
+import select
+import struct
+import time
+
+from evdev import ecodes
+from evdev.events import InputEvent
+from evdev.device import AbsInfo
+
+EVENT_FORMAT = "llHHi"  # struct input_event on 64-bit Linux
+EVENT_SIZE = struct.calcsize(EVENT_FORMAT)
+
+
+STICKS = (ecodes.ABS_X, ecodes.ABS_Y, ecodes.ABS_RX, ecodes.ABS_RY)
+
+
+class FakeInputDevice:
+    """Pipe-backed stand-in for evdev.InputDevice (fd, read, read_loop, close).
+
+    The state queries used by sampling mode (capabilities, active_keys,
+    absinfo) report four centered sticks and no buttons held. If `latencies`
+    is a list, read() appends the age of every EV_KEY event it hands out,
+    assuming the writer stamped events with time.monotonic().
+    """
+
+    def __init__(self, fd, path="/dev/input/fake", name="DualSense Wireless Controller"):
+        self.fd = fd
+        self.path = path
+        self.name = name
+        self.keys = []
+        self.axes = {code: 128 for code in STICKS}
+        self.latencies = None
+        os.set_blocking(fd, False)
+
+    def capabilities(self):
+        return {ecodes.EV_ABS: [(code, self.absinfo(code)) for code in self.axes]}
+
+    def active_keys(self):
+        return list(self.keys)
+
+    def absinfo(self, code):
+        return AbsInfo(self.axes[code], 0, 255, 0, 0, 0)
+
+    def fileno(self):
+        return self.fd
+
+    def read(self):
+        data = os.read(self.fd, EVENT_SIZE * 64)
+        if not data:
+            raise OSError("fake device closed")
+        now = time.monotonic()
+        for offset in range(0, len(data) - len(data) % EVENT_SIZE, EVENT_SIZE):
+            event = InputEvent(*struct.unpack_from(EVENT_FORMAT, data, offset))
+            if self.latencies is not None and event.type == ecodes.EV_KEY:
+                self.latencies.append(now - event.timestamp())
+            yield event
+
+    def read_loop(self):
+        while True:
+            select.select([self.fd], [], [])
+            try:
+                yield from self.read()
+            except BlockingIOError:
+                continue
+
+    def close(self):
+        os.close(self.fd)
+
+
+def pack_event(sec, usec, etype, code, value):
+    return struct.pack(EVENT_FORMAT, sec, usec, etype, code, value)
+
+def button_frames(now, code=ecodes.BTN_SOUTH):
+    """A press and a release, as two reports."""
+    sec = int(now)
+    usec = int((now - sec) * 1_000_000)
+    return b"".join((
+        pack_event(sec, usec, ecodes.EV_KEY, code, 1),
+        pack_event(sec, usec, ecodes.EV_SYN, ecodes.SYN_REPORT, 0),
+        pack_event(sec, usec, ecodes.EV_KEY, code, 0),
+        pack_event(sec, usec, ecodes.EV_SYN, ecodes.SYN_REPORT, 0),
+    ))
+
+def stick_frame(now, center=128, jitter=2, rng=random):
+    """One report of two drifting stick axes followed by SYN_REPORT."""
+    sec = int(now)
+    usec = int((now - sec) * 1_000_000)
+    return b"".join((
+        pack_event(sec, usec, ecodes.EV_ABS, ecodes.ABS_X, center + rng.randint(-jitter, jitter)),
+        pack_event(sec, usec, ecodes.EV_ABS, ecodes.ABS_Y, center + rng.randint(-jitter, jitter)),
+        pack_event(sec, usec, ecodes.EV_SYN, ecodes.SYN_REPORT, 0),
+    ))
+
+def dualsense_stream(seconds, rate=250, jitter=3, press_every=2.0, seed=1):
+    """Synthetic gamepad-node traffic: four drifting sticks reporting every
+    frame and a button press/release every `press_every` seconds.
+    Returns a list of InputEvent with monotonically increasing timestamps."""
+    rng = random.Random(seed)
+    events = []
+    next_press = press_every
+    pressed = False
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        sec, usec = int(t), int((t - int(t)) * 1_000_000)
+        for code in STICKS:
+            events.append(InputEvent(sec, usec, ecodes.EV_ABS, code, 128 + rng.randint(-jitter, jitter)))
+        if t >= next_press:
+            pressed = not pressed
+            events.append(InputEvent(sec, usec, ecodes.EV_KEY, ecodes.BTN_SOUTH, int(pressed)))
+            if not pressed:
+                next_press += press_every
+        events.append(InputEvent(sec, usec, ecodes.EV_SYN, ecodes.SYN_REPORT, 0))
+    return events
@@ -0,0 +1,227 @@
+# benchmarks/services.py
+#
+# Stand-in system services on a private dbus-daemon, so the D-Bus clients
+# can be exercised on a box with no Bluetooth adapter.
+
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+from dbus_next.aio import MessageBus
+from dbus_next.service import ServiceInterface, method, signal, dbus_property, PropertyAccess
+
+BUS_CONFIG = """<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:dir={dir}</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+"""
+
+
+@contextmanager
+def private_bus():
+    """Run a throwaway dbus-daemon; yields its address."""
+    if shutil.which("dbus-daemon") is None:
+        raise RuntimeError("dbus-daemon not found")
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "bus.conf")
+        with open(config, "w") as f:
+            f.write(BUS_CONFIG.format(dir=tmp))
+        proc = subprocess.Popen(
+            ["dbus-daemon", "--nofork", "--print-address", f"--config-file={config}"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        try:
+            yield proc.stdout.readline().strip()
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+def _object_path(mac):
+    return "/org/bluez/hci0/dev_" + mac.upper().replace(":", "_")
+
+class MockDevice1(ServiceInterface):
+    """org.bluez.Device1 with the bits the monitor uses."""
+
+    def __init__(self, mac, name, disconnect_delay=0.0):
+        super().__init__("org.bluez.Device1")
+        self._mac = mac.upper()
+        self._name = name
+        self._connected = True
+        self._trusted = False
+        self.disconnect_delay = disconnect_delay
+        self.disconnect_calls = 0
+        self.disconnected_at = None  # time.monotonic() of the first Disconnect
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Address(self) -> "s":
+        return self._mac
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Name(self) -> "s":
+        return self._name
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Connected(self) -> "b":
+        return self._connected
+
+    @dbus_property()
+    def Trusted(self) -> "b":
+        return self._trusted
+
+    @Trusted.setter
+    def Trusted(self, value: "b"):
+        self._trusted = value
+        self.emit_properties_changed({"Trusted": value})
+
+    @method()
+    async def Disconnect(self):
+        self.disconnect_calls += 1
+        if self.disconnected_at is None:
+            self.disconnected_at = time.monotonic()
+        if self.disconnect_delay:
+            await asyncio.sleep(self.disconnect_delay)
+        self._connected = False
+        self.emit_properties_changed({"Connected": False})
+
+class MockBlueZ:
+    """org.bluez with one adapter's worth of Device1 objects.
+
+    dbus_next answers GetManagedObjects on "/" and emits
+    InterfacesAdded/InterfacesRemoved for exported objects by itself.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.devices = {}
+
+    @classmethod
+    async def start(cls, address):
+        bus = await MessageBus(bus_address=address).connect()
+        await bus.request_name("org.bluez")
+        return cls(bus)
+
+    def add_device(self, mac, name="DualSense Wireless Controller", **kwargs):
+        device = MockDevice1(mac, name, **kwargs)
+        self.bus.export(_object_path(mac), device)
+        self.devices[mac.lower()] = device
+        return device
+
+    def remove_device(self, mac):
+        device = self.devices.pop(mac.lower())
+        self.bus.unexport(_object_path(mac), device)
+
+
+class MockUPowerDevice(ServiceInterface):
+    """org.freedesktop.UPower.Device for one controller battery."""
+
+    def __init__(self, mac, percentage=80.0, state=2):
+        super().__init__("org.freedesktop.UPower.Device")
+        self._serial = mac.lower()
+        self._percentage = float(percentage)
+        self._state = state  # 1 charging, 2 discharging
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Serial(self) -> "s":
+        return self._serial
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Percentage(self) -> "d":
+        return self._percentage
+
+    @dbus_property(access=PropertyAccess.READ)
+    def State(self) -> "u":
+        return self._state
+
+    def set_battery(self, percentage=None, state=None):
+        changed = {}
+        if percentage is not None:
+            self._percentage = changed["Percentage"] = float(percentage)
+        if state is not None:
+            self._state = changed["State"] = state
+        self.emit_properties_changed(changed)
+
+class _UPowerManager(ServiceInterface):
+    def __init__(self):
+        super().__init__("org.freedesktop.UPower")
+        self.paths = []
+
+    @method()
+    def EnumerateDevices(self) -> "ao":
+        return list(self.paths)
+
+    @signal()
+    def DeviceAdded(self, path) -> "o":
+        return path
+
+    @signal()
+    def DeviceRemoved(self, path) -> "o":
+        return path
+
+class MockUPower:
+    """org.freedesktop.UPower with one battery device per controller."""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.manager = _UPowerManager()
+        self.devices = {}
+        bus.export("/org/freedesktop/UPower", self.manager)
+
+    @classmethod
+    async def start(cls, address):
+        bus = await MessageBus(bus_address=address).connect()
+        upower = cls(bus)
+        await bus.request_name("org.freedesktop.UPower")
+        return upower
+
+    def add_device(self, mac, **kwargs):
+        path = "/org/freedesktop/UPower/devices/gaming_input_ps_controller_battery_" + mac.lower().replace(":", "o")
+        device = MockUPowerDevice(mac, **kwargs)
+        self.bus.export(path, device)
+        self.devices[mac.lower()] = device
+        self.manager.paths.append(path)
+        self.manager.DeviceAdded(path)
+        return device
+
+
+class _Notifications(ServiceInterface):
+    def __init__(self):
+        super().__init__("org.freedesktop.Notifications")
+        self.sent = []  # (replaces_id, body)
+
+    @method()
+    def Notify(self, app_name: "s", replaces_id: "u", app_icon: "s", summary: "s", body: "s",
+               actions: "as", hints: "a{sv}", expire_timeout: "i") -> "u":
+        self.sent.append((replaces_id, body))
+        return replaces_id or len(self.sent)
+
+class MockNotifications:
+    """Session notification daemon that only counts what it is sent."""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.service = _Notifications()
+        bus.export("/org/freedesktop/Notifications", self.service)
+
+    @classmethod
+    async def start(cls, address):
+        bus = await MessageBus(bus_address=address).connect()
+        notifications = cls(bus)
+        await bus.request_name("org.freedesktop.Notifications")
+        return notifications
+
+    @property
+    def sent(self):
+        return self.service.sent
@@ -8,6 +8,10 @@ INSTALL_DIR="$HOME/.local/share/$SCRIPT_NAME"
 BIN_PATH="$HOME/.local/bin/$SCRIPT_NAME"
 SERVICE_SOURCE="./ps5-idle-timeout.service"
 SERVICE_DEST="$HOME/.config/systemd/user/$SCRIPT_NAME.service"
+ONDEMAND_SOURCE="./$SCRIPT_NAME-ondemand.service"
+ONDEMAND_DEST="$HOME/.config/systemd/user/$SCRIPT_NAME-ondemand.service"
+RULES_SOURCE="./70-$SCRIPT_NAME.rules"
+RULES_DEST="/etc/udev/rules.d/70-$SCRIPT_NAME.rules"
 CONFIG_DIR="$HOME/.config/$SCRIPT_NAME"
 CONFIG_PATH="$CONFIG_DIR/config.ini"
 DEFAULT_CONFIG="./config.ini"
@@ -37,23 +41,40 @@ else
   echo " Config already exists at $CONFIG_PATH, skipping."
 fi
 
-read -r -p "  Install and run as a systemd user service? [y/N] " CONFIRM
-if [[ "$CONFIRM" =~ ^[Yy]$ ]]; then
-  # SERVICE_SOURCE="./ps5-idle-timeout.service"
-  SERVICE_DEST="$HOME/.config/systemd/user/$SCRIPT_NAME.service"
+echo "  How should the monitor run?"
+echo "    1) Always, as a systemd user service"
+echo "    2) On demand: started when a controller connects, exits once none is left (udev rule, needs sudo)"
+echo "    3) Manually"
+read -r -p "  Choice [1/2/3]: " CHOICE
+case "$CHOICE" in
+  1)
+    sed "s|/path/to/project|$INSTALL_DIR|g" "$SERVICE_SOURCE" > "$SERVICE_DEST"
+    rm -f "$ONDEMAND_DEST"
 
-  # Patch unit to use resolved path
-  sed "s|/path/to/project|$INSTALL_DIR|g" "$SERVICE_SOURCE" > "$SERVICE_DEST"
-
-  systemctl --user daemon-reexec
-  systemctl --user daemon-reload
-  systemctl --user enable --now "$SCRIPT_NAME.service"
-  echo " Systemd service enabled."
-else
-  echo "  Skipped systemd service setup. You can run manually:"
-  echo "   $BIN_PATH --daemon"
-fi
+    systemctl --user daemon-reexec
+    systemctl --user daemon-reload
+    systemctl --user enable --now "$SCRIPT_NAME.service"
+    echo " Systemd service enabled."
+    ;;
+  2)
+    cp "$ONDEMAND_SOURCE" "$ONDEMAND_DEST"
+    if [ -f "$SERVICE_DEST" ]; then
+      systemctl --user disable --now "$SCRIPT_NAME.service" || true
+      rm -f "$SERVICE_DEST"
+    fi
+    sudo cp "$RULES_SOURCE" "$RULES_DEST"
+    sudo udevadm control --reload-rules
 
+    systemctl --user daemon-reload
+    # Pick up a controller that is already connected
+    sudo udevadm trigger --action=add --subsystem-match=input
+    echo " On-demand activation installed ($RULES_DEST)."
+    ;;
+  *)
+    echo "  Skipped systemd service setup. You can run manually:"
+    echo "   $BIN_PATH --daemon"
+    ;;
+esac
 
 echo " $SCRIPT_NAME installed and running."
 echo " To run manually:"
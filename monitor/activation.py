@@ -0,0 +1,144 @@
+# monitor/activation.py
+#
+# Starting and stopping with the controllers, and talking to systemd.
+#
+#   * On demand (`--on-demand`): udev starts ps5-idle-timeout-ondemand.service
+#     when a DualSense appears (70-ps5-idle-timeout.rules), and the daemon
+#     exits `exit_grace` seconds after the last controller is gone, so
+#     nothing runs while no pad is connected.
+#   * Type=notify: READY=1 once the first scan is done, which makes the
+#     startup time show up in `systemctl --user status` and
+#     `systemd-analyze`, and WATCHDOG=1 pings while the daemon's loops
+#     still answer. Without $NOTIFY_SOCKET all of this is a no-op.
+
+import os
+import signal
+import socket
+import threading
+import time
+
+from monitor.notif import log
+
+on_demand = False  # set by `--on-demand`
+
+_exit_timer = None
+_exit_lock = threading.Lock()
+
+
+def notify(*fields):
+    """sd_notify(3): send "KEY=VALUE" fields to systemd; False if not
+    running under a service manager that listens."""
+    address = os.environ.get("NOTIFY_SOCKET")
+    if not address:
+        return False
+    if address.startswith("@"):
+        address = "\0" + address[1:]  # abstract namespace
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC) as sock:
+            sock.connect(address)
+            sock.sendall("\n".join(fields).encode())
+    except OSError as e:
+        log(f"⚠️ sd_notify failed: {e}")
+        return False
+    return True
+
+def process_age():
+    """Seconds since this process was started (interpreter startup included)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # starttime is field 22, counted after the ")" that ends comm
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def loop_responds(loop, timeout):
+    """True if an asyncio loop running on another thread gets to a
+    callback within `timeout` seconds."""
+    done = threading.Event()
+    try:
+        loop.call_soon_threadsafe(done.set)
+    except RuntimeError:
+        return False  # closed
+    return done.wait(timeout)
+
+def watchdog_interval():
+    """Seconds between WATCHDOG=1 pings, or None if systemd doesn't want any."""
+    try:
+        usec = int(os.environ.get("WATCHDOG_USEC", ""))
+    except ValueError:
+        return None
+    pid = os.environ.get("WATCHDOG_PID")
+    if usec <= 0 or (pid and pid != str(os.getpid())):
+        return None
+    return usec / 1e6 / 2
+
+def start_watchdog(alive):
+    """Ping systemd's watchdog while `alive(timeout)` says the daemon is
+    healthy. A hung daemon stops pinging and gets restarted."""
+    interval = watchdog_interval()
+    if interval is None:
+        return
+
+    def run():
+        warned = False
+        while True:
+            started = time.monotonic()
+            if alive(interval / 2):
+                notify("WATCHDOG=1")
+                warned = False
+            elif not warned:
+                log("⚠️ Event loop not responding, skipping watchdog ping")
+                warned = True
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    threading.Thread(target=run, daemon=True).start()
+
+def ready(alive):
+    """The first scan is done: tell systemd, start the watchdog and, on
+    demand, the exit countdown."""
+    from monitor import metrics, status
+
+    count = len(status.current())
+    age = process_age()
+    if age is not None:
+        metrics.observe("dualsense_startup_seconds", age)
+        log(f"🚀 Ready in {age:.2f}s, watching {count} controller(s)")
+    notify("READY=1", f"STATUS=Watching {count} controller(s)")
+    start_watchdog(alive)
+    if on_demand:
+        status.add_listener(_on_status_change)
+        _on_status_change((), status.current())
+
+def stopping():
+    notify("STOPPING=1")
+
+def _on_status_change(old, new):
+    global _exit_timer
+    from monitor.config import get_config
+
+    if not on_demand:
+        return
+    notify(f"STATUS=Watching {len(new)} controller(s)")
+    with _exit_lock:
+        if new:
+            if _exit_timer is not None:
+                _exit_timer.cancel()
+                _exit_timer = None
+        elif _exit_timer is None:
+            grace = get_config().exit_grace
+            _exit_timer = threading.Timer(grace, _exit_if_idle, args=(grace,))
+            _exit_timer.daemon = True
+            _exit_timer.start()
+
+def _exit_if_idle(grace):
+    global _exit_timer
+    from monitor import status
+
+    with _exit_lock:
+        _exit_timer = None
+        if status.current():
+            return  # one came back just now
+    log(f"💤 No controller for {grace}s, exiting until the next one connects")
+    # Same path as `--stop` and systemd: the main thread shuts down
+    os.kill(os.getpid(), signal.SIGTERM)
@@ -0,0 +1,27 @@
+# monitor/aioloop.py
+#
+# Shared event loop and background thread for the dbus_next clients
+# (UPower, BlueZ), so blocking code can call into them.
+
+import asyncio
+import threading
+
+_loop = None
+_lock = threading.Lock()
+
+def get_loop():
+    """The shared loop, started on first use so importing this is free."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True).start()
+            _loop = loop
+    return _loop
+
+def submit(coro):
+    """Schedule a coroutine on the shared loop; returns a concurrent Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+def run_async_task(coro, timeout=None):
+    return submit(coro).result(timeout)
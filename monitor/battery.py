@@ -2,26 +2,32 @@
 
 from dbus_next.aio import MessageBus
 from dbus_next.constants import MessageType
-from dbus_next import BusType
+from dbus_next import BusType, Message
 import asyncio
 import threading
 import time
 import subprocess
 from .macs import normalize_mac
+from .aioloop import run_async_task, submit
+from . import metrics
 
+upower_bus_name = "org.freedesktop.UPower"
 upower_path = "/org/freedesktop/UPower"
 upower_interface = "org.freedesktop.UPower"
 device_interface = "org.freedesktop.UPower.Device"
+properties_interface = "org.freedesktop.DBus.Properties"
 
-# Shared event loop and background thread
-_loop = asyncio.new_event_loop()
-_thread = threading.Thread(target=_loop.run_forever, daemon=True)
-_thread.start()
-
-def run_async_task(coro):
-    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+STATE_CHARGING = 1
+STATE_FULLY_CHARGED = 4
 
 async def get_device_info(mac):
+    start = time.perf_counter()
+    try:
+        return await _query_device_info(mac)
+    finally:
+        metrics.observe("dualsense_upower_query_seconds", time.perf_counter() - start)
+
+async def _query_device_info(mac):
     try:
         bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
         introspection = await bus.introspect("org.freedesktop.UPower", upower_path)
@@ -41,44 +47,228 @@ async def get_device_info(mac):
                 if normalize_mac(serial) == mac:
                     percentage = props.get("Percentage", 0.0)
                     state = props.get("State", 0)  # 1=charging, 2=discharging, 4=fully charged
-                    charging = state in [1, 4]
-                    return f"{percentage:.0f}%", charging
+                    return _format_battery(percentage, state)
             except Exception:
                 continue
     except Exception as e:
         print(f"⚠️ D-Bus UPower query failed: {e}")
 
-    # Fallback to subprocess if D-Bus fails
+    # Fallback to the upower CLI if D-Bus fails
     try:
-        output = subprocess.run(["upower", "-e"], capture_output=True, text=True).stdout
-        devices = [d for d in output.splitlines() if "ps_controller_battery" in d]
-
-        for device in devices:
-            info = subprocess.run(["upower", "-i", device], capture_output=True, text=True).stdout
-            found_mac = False
-            battery = "Unknown"
-            charging = False
-
-            for line in info.splitlines():
-                line = line.strip()
-                if line.startswith("serial:"):
-                    serial_mac = normalize_mac(line.split(":", 1)[1])
-                    if serial_mac == normalize_mac(mac):
-                        found_mac = True
-                if found_mac and line.startswith("percentage:"):
-                    battery = line.split(":", 1)[1].strip()
-                if found_mac and line.startswith("icon-name:"):
-                    charging = "charging" in line.lower() or "charged" in line.lower()
-
-            if found_mac:
-                return battery, charging
+        return get_upower_dump_table().get(normalize_mac(mac), ("Unknown", False))
     except Exception as e:
         print(f"⚠️ Fallback battery check failed: {e}")
 
     return "Unknown", False
 
-def get_battery_level(mac):
-    return run_async_task(get_device_info(mac))[0]
 
-def is_charging(mac):
-    return run_async_task(get_device_info(mac))[1]
+def parse_upower_dump(lines):
+    """Parse `upower --dump` output in one pass into {mac: (percentage, charging)}.
+
+    Devices are keyed by their serial, which is the MAC for Bluetooth
+    batteries; anything without a MAC-looking serial or a percentage is skipped.
+    """
+    table = {}
+    serial = percentage = state = icon = None
+
+    def flush():
+        if serial and percentage and serial.count(":") == 5:
+            if state is not None:
+                charging = state in ("charging", "fully-charged")
+            else:
+                charging = icon is not None and ("charging" in icon or "charged" in icon)
+            table[normalize_mac(serial)] = (percentage, charging)
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith("Device:") or line.startswith("Daemon:"):
+            flush()
+            serial = percentage = state = icon = None
+            continue
+
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        if key == "serial":
+            serial = value.strip()
+        elif key == "percentage":
+            percentage = value.strip()
+        elif key == "state":
+            state = value.strip()
+        elif key == "icon-name":
+            icon = value.strip().strip("'").lower()
+
+    flush()
+    return table
+
+_dump_lock = threading.Lock()
+_dump_cache = {"time": 0.0, "table": {}}
+DUMP_TTL = 5  # seconds
+
+def get_upower_dump_table(ttl=DUMP_TTL):
+    """MAC -> (percentage, charging) for every battery, from one `upower --dump`.
+
+    Shared by all controllers: callers arriving while a dump is running wait
+    for it and reuse the result instead of spawning their own.
+    """
+    with _dump_lock:
+        if time.monotonic() - _dump_cache["time"] < ttl:
+            return _dump_cache["table"]
+
+        metrics.inc("dualsense_subprocess_spawns_total", command="upower")
+        with metrics.timed("dualsense_subprocess_seconds", command="upower"):
+            with subprocess.Popen(["upower", "--dump"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True) as proc:
+                table = parse_upower_dump(proc.stdout)
+
+        _dump_cache["time"] = time.monotonic()
+        _dump_cache["table"] = table
+        return table
+
+def get_battery_info(mac):
+    """One UPower query for both values: (percentage string, charging)."""
+    return run_async_task(get_device_info(mac))
+
+
+def _format_battery(percentage, state):
+    return f"{percentage:.0f}%", state in (STATE_CHARGING, STATE_FULLY_CHARGED)
+
+class UPowerClient:
+    """Long-lived UPower connection with a push-updated battery cache.
+
+    Keeps one system bus connection, a MAC -> device path index maintained
+    from DeviceAdded/DeviceRemoved, and Percentage/State pushed in through
+    PropertiesChanged. Once `ready` is set, lookup() is a dict read.
+    """
+
+    def __init__(self, bus_address=None):
+        self.bus_address = bus_address
+        self.bus = None
+        self.paths = {}    # mac -> device path
+        self.devices = {}  # device path -> {"mac", "percentage", "state"}
+        self.ready = threading.Event()
+        self._listeners = []
+
+    def add_listener(self, fn):
+        """Call fn(mac) whenever a device's battery info changes."""
+        self._listeners.append(fn)
+
+    def _notify(self, mac):
+        for fn in self._listeners:
+            try:
+                fn(mac)
+            except Exception as e:
+                print(f"⚠️ Battery listener failed: {e}")
+
+    async def _call(self, path, interface, member, signature="", body=()):
+        reply = await self.bus.call(Message(
+            destination=upower_bus_name, path=path, interface=interface,
+            member=member, signature=signature, body=list(body),
+        ))
+        if reply.message_type == MessageType.ERROR:
+            raise RuntimeError(f"{member} failed: {reply.error_name} {reply.body}")
+        return reply.body
+
+    async def _add_match(self, rule):
+        await self.bus.call(Message(
+            destination="org.freedesktop.DBus", path="/org/freedesktop/DBus",
+            interface="org.freedesktop.DBus", member="AddMatch",
+            signature="s", body=[rule],
+        ))
+
+    async def connect(self):
+        if self.bus_address:
+            self.bus = await MessageBus(bus_address=self.bus_address).connect()
+        else:
+            self.bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
+        self.bus.add_message_handler(self._on_message)
+
+        await self._add_match(f"type='signal',sender='{upower_bus_name}',interface='{upower_interface}'")
+        await self._add_match(
+            f"type='signal',sender='{upower_bus_name}',interface='{properties_interface}',"
+            f"member='PropertiesChanged',arg0='{device_interface}'"
+        )
+        # UPower restarting means new device paths
+        await self._add_match(
+            "type='signal',sender='org.freedesktop.DBus',interface='org.freedesktop.DBus',"
+            f"member='NameOwnerChanged',arg0='{upower_bus_name}'"
+        )
+        await self.resync()
+
+    async def resync(self):
+        self.paths.clear()
+        self.devices.clear()
+        [device_paths] = await self._call(upower_path, upower_interface, "EnumerateDevices")
+        for path in device_paths:
+            await self._load_device(path)
+        self.ready.set()
+        self._notify(None)
+
+    async def _load_device(self, path):
+        try:
+            [props] = await self._call(path, properties_interface, "GetAll", "s", [device_interface])
+        except Exception:
+            return
+        serial = props["Serial"].value if "Serial" in props else ""
+        if not serial:
+            return
+        mac = normalize_mac(serial)
+        self.devices[path] = {
+            "mac": mac,
+            "percentage": props["Percentage"].value if "Percentage" in props else 0.0,
+            "state": props["State"].value if "State" in props else 0,
+        }
+        self.paths[mac] = path
+        if self.ready.is_set():
+            self._notify(mac)
+
+    def _drop_device(self, path):
+        info = self.devices.pop(path, None)
+        if info and self.paths.get(info["mac"]) == path:
+            del self.paths[info["mac"]]
+
+    def _on_message(self, msg):
+        if msg.message_type != MessageType.SIGNAL:
+            return
+
+        if msg.interface == properties_interface and msg.member == "PropertiesChanged":
+            info = self.devices.get(msg.path)
+            if info is None or msg.body[0] != device_interface:
+                return
+            changed = msg.body[1]
+            if "Percentage" in changed:
+                info["percentage"] = changed["Percentage"].value
+            if "State" in changed:
+                info["state"] = changed["State"].value
+            self._notify(info["mac"])
+
+        elif msg.interface == upower_interface and msg.member == "DeviceAdded":
+            asyncio.ensure_future(self._load_device(msg.body[0]))
+
+        elif msg.interface == upower_interface and msg.member == "DeviceRemoved":
+            self._drop_device(msg.body[0])
+
+        elif msg.member == "NameOwnerChanged" and msg.body[0] == upower_bus_name:
+            self.ready.clear()
+            if msg.body[2]:
+                asyncio.ensure_future(self.resync())
+
+    def lookup(self, mac):
+        """(percentage string, charging) from the cache; no D-Bus traffic."""
+        path = self.paths.get(normalize_mac(mac))
+        info = self.devices.get(path) if path else None
+        if info is None:
+            return "Unknown", False
+        return _format_battery(info["percentage"], info["state"])
+
+
+upower_client = UPowerClient()
+
+def start_upower_client():
+    """Connect the shared client in the background; lookups fall back until it's ready."""
+    async def connect():
+        try:
+            await upower_client.connect()
+        except Exception as e:
+            print(f"⚠️ UPower client unavailable, using per-query fallback: {e}")
+
+    submit(connect())
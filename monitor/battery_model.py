@@ -0,0 +1,150 @@
+# monitor/battery_model.py
+#
+# Per-controller battery estimate, fed by the readings the daemon takes
+# anyway (UPower pushes, fallback queries). It predicts the current level
+# and time left, and says when the next real reading is worth taking.
+#
+# A DualSense reports its level in coarse steps (the kernel hands out 5%,
+# 15%, ... 95%, 100%: "75%" means 70-80). The moment the level steps down
+# the true value sits at the top of the new step, so the estimate runs from
+# there, at a rate measured between steps (a typical rate until two steps
+# were seen), and never leaves the step the last reading vouches for. All
+# times are time.monotonic().
+
+DISCHARGE_RATE = 100 / (6 * 3600)  # %/s, a DualSense lasts about 6 h
+CHARGE_RATE = 100 / (3 * 3600)     # %/s, about 3 h from empty
+MIN_RATE = 100 / (48 * 3600)  # %/s, slowest rate believed in either direction
+SMOOTHING = 0.5     # weight of a newly measured rate
+HALF_STEP = 5       # %, a reading is this close to the true level
+QUERY_STEP = 5      # % the estimate may move before a real reading is due
+LOW = 20            # % below which the level is watched closely
+MIN_QUERY = 10      # s, never query more often than this
+LOW_QUERY = 60      # s, max gap while low
+CHARGING_QUERY = 120  # s, max gap while charging (status only; an idle hold rechecks every 10 s)
+MAX_QUERY = 600     # s
+TRANSITION_WINDOW = 120  # s after plugging in or out with MIN_QUERY readings
+
+
+def parse_percent(battery):
+    """Percentage from a reading like "80%"; None for "Unknown"."""
+    try:
+        return float(str(battery).rstrip("%"))
+    except ValueError:
+        return None
+
+
+class BatteryModel:
+    __slots__ = ("battery", "charging", "percent", "read_at", "level_since", "level_at", "edge_seen", "rate",
+                 "changed_at")
+
+    def __init__(self):
+        self.battery = "Unknown"  # last reading as reported
+        self.charging = False
+        self.percent = None       # same, as a number
+        self.read_at = None       # when the last reading was taken
+        self.level_since = None   # (estimated) time the current level was reached
+        self.level_at = None      # estimated true level at level_since
+        self.edge_seen = False    # level_since is a real level change, not the first reading
+        self.rate = None          # measured %/s, signed; None until a level change was seen
+        self.changed_at = None    # last switch between charging and discharging
+
+    def observe(self, battery, charging, now, exact=False):
+        """Feed a reading (battery string, charging) taken at `now`. `exact`
+        when readings are pushed, so a change happened right at `now`."""
+        percent = parse_percent(battery)
+        prev_read, self.read_at = self.read_at, now
+        self.battery = battery
+        if percent is None:
+            return
+
+        if self.percent is None or charging != self.charging:
+            if self.percent is not None:
+                self.changed_at = now
+            self.charging = charging
+            self.percent = percent
+            self.level_since = now
+            self.level_at = percent
+            self.edge_seen = False
+            self.rate = None  # the old rate was for the other direction
+            return
+
+        if percent == self.percent:
+            return
+        # The level changed somewhere since the previous reading
+        changed = now if exact or prev_read is None else (prev_read + now) / 2
+        level_at = percent - HALF_STEP if percent > self.percent else percent + HALF_STEP
+        if self.edge_seen and changed > self.level_since:
+            measured = (level_at - self.level_at) / (changed - self.level_since)
+            # A reading flapping back to the old step measures 0 or the
+            # wrong direction; neither says anything about the rate
+            if measured and (measured > 0) == charging:
+                self.rate = measured if self.rate is None else self.rate + SMOOTHING * (measured - self.rate)
+        self.percent = percent
+        self.level_since = changed
+        self.level_at = level_at
+        self.edge_seen = True
+
+    def reading(self):
+        return self.battery, self.charging
+
+    def current_rate(self):
+        """%/s, signed, never closer to 0 than MIN_RATE."""
+        if self.rate is None:
+            return CHARGE_RATE if self.charging else -DISCHARGE_RATE
+        return max(self.rate, MIN_RATE) if self.charging else min(self.rate, -MIN_RATE)
+
+    def predict(self, now):
+        """Estimated level in %, or None before the first reading."""
+        if self.percent is None:
+            return None
+        if self.charging and self.percent >= 100:
+            return 100.0
+        estimate = self.level_at + self.current_rate() * (now - self.level_since)
+        estimate = min(self.percent + HALF_STEP, max(self.percent - HALF_STEP, estimate))
+        return min(100.0, max(0.0, estimate))
+
+    def time_left(self, now):
+        """Seconds until empty (discharging) or full (charging), or None."""
+        estimate = self.predict(now)
+        if estimate is None:
+            return None
+        rate = self.current_rate()
+        return (100 - estimate) / rate if self.charging else estimate / -rate
+
+    def next_query(self, now):
+        """When the next real reading is due."""
+        if self.read_at is None:
+            return now
+        if self.percent is None:
+            return self.read_at + MIN_QUERY
+        if self.changed_at is not None and now - self.changed_at < TRANSITION_WINDOW:
+            return self.read_at + MIN_QUERY
+
+        estimate = self.predict(now)
+        target = 100 if self.charging else (LOW if estimate > LOW else 0)
+        # Aim a reading at the crossing of the next threshold
+        step = min(QUERY_STEP, max(1.0, abs(target - estimate)))
+        interval = step / abs(self.current_rate())
+        if self.charging:
+            interval = min(interval, CHARGING_QUERY)
+        elif estimate <= LOW:
+            interval = min(interval, LOW_QUERY)
+        return self.read_at + min(MAX_QUERY, max(MIN_QUERY, interval))
+
+    def due(self, now, max_age=None):
+        """True if a real reading should be taken; `max_age` caps how old
+        the last one may be (for decisions that act on it)."""
+        if self.read_at is None or now >= self.next_query(now):
+            return True
+        return max_age is not None and now - self.read_at >= max_age
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(model, name, data[name])
+        return model
@@ -0,0 +1,199 @@
+# monitor/bluez.py
+
+import asyncio
+import subprocess
+import threading
+from dbus_next.aio import MessageBus
+from dbus_next.constants import MessageType
+from dbus_next import BusType, Message, Variant
+from .macs import normalize_mac
+from .aioloop import submit
+from . import metrics
+
+bluez_bus_name = "org.bluez"
+device_interface = "org.bluez.Device1"
+object_manager_interface = "org.freedesktop.DBus.ObjectManager"
+properties_interface = "org.freedesktop.DBus.Properties"
+
+DEFAULT_TIMEOUT = 5  # seconds
+DUALSENSE_NAMES = ("DualSense", "Wireless Controller")
+
+
+class BlueZClient:
+    """Long-lived BlueZ connection with an ObjectManager cache of Device1 objects.
+
+    The cache (address -> object path, plus Name/Connected/Trusted) is kept
+    current from InterfacesAdded/InterfacesRemoved and PropertiesChanged, so
+    disconnecting or trusting a controller is a single method call instead
+    of a bluetoothctl session.
+    """
+
+    def __init__(self, bus_address=None):
+        self.bus_address = bus_address
+        self.bus = None
+        self.paths = {}    # mac -> object path
+        self.devices = {}  # object path -> {"mac", "name", "connected", "trusted"}
+        self.ready = threading.Event()
+
+    async def _call(self, path, interface, member, signature="", body=(), timeout=DEFAULT_TIMEOUT):
+        reply = await asyncio.wait_for(self.bus.call(Message(
+            destination=bluez_bus_name, path=path, interface=interface,
+            member=member, signature=signature, body=list(body),
+        )), timeout)
+        if reply.message_type == MessageType.ERROR:
+            raise RuntimeError(f"{member} failed: {reply.error_name} {' '.join(map(str, reply.body))}".strip())
+        return reply.body
+
+    async def _add_match(self, rule):
+        await self.bus.call(Message(
+            destination="org.freedesktop.DBus", path="/org/freedesktop/DBus",
+            interface="org.freedesktop.DBus", member="AddMatch",
+            signature="s", body=[rule],
+        ))
+
+    async def connect(self):
+        if self.bus_address:
+            self.bus = await MessageBus(bus_address=self.bus_address).connect()
+        else:
+            self.bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
+        self.bus.add_message_handler(self._on_message)
+
+        await self._add_match(f"type='signal',sender='{bluez_bus_name}',interface='{object_manager_interface}'")
+        await self._add_match(
+            f"type='signal',sender='{bluez_bus_name}',interface='{properties_interface}',"
+            f"member='PropertiesChanged',arg0='{device_interface}'"
+        )
+        await self._add_match(
+            "type='signal',sender='org.freedesktop.DBus',interface='org.freedesktop.DBus',"
+            f"member='NameOwnerChanged',arg0='{bluez_bus_name}'"
+        )
+        await self.resync()
+
+    async def resync(self):
+        [objects] = await self._call("/", object_manager_interface, "GetManagedObjects")
+        self.paths.clear()
+        self.devices.clear()
+        for path, interfaces in objects.items():
+            if device_interface in interfaces:
+                self._add_device(path, interfaces[device_interface])
+        self.ready.set()
+
+    def _add_device(self, path, props):
+        if "Address" not in props:
+            return
+        mac = normalize_mac(props["Address"].value)
+        self.devices[path] = {
+            "mac": mac,
+            "name": props["Name"].value if "Name" in props else "",
+            "connected": props["Connected"].value if "Connected" in props else False,
+            "trusted": props["Trusted"].value if "Trusted" in props else False,
+        }
+        self.paths[mac] = path
+
+    def _drop_device(self, path):
+        info = self.devices.pop(path, None)
+        if info and self.paths.get(info["mac"]) == path:
+            del self.paths[info["mac"]]
+
+    def _on_message(self, msg):
+        if msg.message_type != MessageType.SIGNAL:
+            return
+
+        if msg.interface == properties_interface and msg.member == "PropertiesChanged":
+            info = self.devices.get(msg.path)
+            if info is None or msg.body[0] != device_interface:
+                return
+            changed = msg.body[1]
+            for prop, key in (("Name", "name"), ("Connected", "connected"), ("Trusted", "trusted")):
+                if prop in changed:
+                    info[key] = changed[prop].value
+
+        elif msg.interface == object_manager_interface and msg.member == "InterfacesAdded":
+            path, interfaces = msg.body
+            if device_interface in interfaces:
+                self._add_device(path, interfaces[device_interface])
+
+        elif msg.interface == object_manager_interface and msg.member == "InterfacesRemoved":
+            path, interfaces = msg.body
+            if device_interface in interfaces:
+                self._drop_device(path)
+
+        elif msg.member == "NameOwnerChanged" and msg.body[0] == bluez_bus_name:
+            self.ready.clear()
+            if msg.body[2]:
+                asyncio.ensure_future(self.resync())
+
+    def _path_for(self, mac):
+        path = self.paths.get(normalize_mac(mac))
+        if path is None:
+            raise KeyError(f"{mac} is not known to BlueZ")
+        return path
+
+    async def disconnect(self, mac, timeout=DEFAULT_TIMEOUT):
+        await self._call(self._path_for(mac), device_interface, "Disconnect", timeout=timeout)
+
+    async def set_trusted(self, mac, trusted=True, timeout=DEFAULT_TIMEOUT):
+        await self._call(
+            self._path_for(mac), properties_interface, "Set", "ssv",
+            [device_interface, "Trusted", Variant("b", trusted)], timeout=timeout,
+        )
+
+    def is_trusted(self, mac):
+        path = self.paths.get(normalize_mac(mac))
+        return bool(path and self.devices[path]["trusted"])
+
+    def dualsense_devices(self):
+        """MAC -> name for every DualSense BlueZ knows about (cache only)."""
+        return {
+            info["mac"]: info["name"]
+            for info in self.devices.values()
+            if any(n in info["name"] for n in DUALSENSE_NAMES)
+        }
+
+
+bluez_client = BlueZClient()
+
+def start_bluez_client():
+    """Connect the shared client in the background; callers fall back to bluetoothctl until it's ready."""
+    async def connect():
+        try:
+            await bluez_client.connect()
+        except Exception as e:
+            print(f"⚠️ BlueZ D-Bus client unavailable, using bluetoothctl: {e}")
+
+    submit(connect())
+
+def _bluetoothctl(*args, timeout=DEFAULT_TIMEOUT):
+    metrics.inc("dualsense_subprocess_spawns_total", command="bluetoothctl")
+    with metrics.timed("dualsense_subprocess_seconds", command="bluetoothctl"):
+        result = subprocess.run(
+            ["bluetoothctl", *args],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=timeout,
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"bluetoothctl {args[0]} exited with code {result.returncode}")
+
+def disconnect_device(mac, timeout=DEFAULT_TIMEOUT):
+    """Blocking disconnect with a timeout. Returns (ok, error message or None)."""
+    try:
+        if bluez_client.ready.is_set():
+            submit(bluez_client.disconnect(mac, timeout)).result(timeout + 1)
+        else:
+            _bluetoothctl("disconnect", mac, timeout=timeout)
+        return True, None
+    except Exception as e:
+        return False, str(e) or type(e).__name__
+
+def trust_device(mac, timeout=DEFAULT_TIMEOUT):
+    """Mark a device as trusted unless BlueZ already has it trusted."""
+    try:
+        if bluez_client.ready.is_set():
+            if not bluez_client.is_trusted(mac):
+                submit(bluez_client.set_trusted(mac, True, timeout)).result(timeout + 1)
+        else:
+            _bluetoothctl("trust", mac, timeout=timeout)
+        return True, None
+    except Exception as e:
+        return False, str(e) or type(e).__name__
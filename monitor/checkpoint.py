@@ -0,0 +1,218 @@
+# monitor/checkpoint.py
+#
+# Per-controller state carried across a daemon restart: idle timer and
+# timeout, hold, charging flag, battery model, player number and input
+# counters.
+#
+# Two ways it gets from the old process to the new one:
+#   * `--restart` starts the new daemon with `--takeover`. Before it touches
+#     D-Bus or the socket, the new daemon asks the running one for "handoff"
+#     over the socket API. The reply carries the checkpoint and the open
+#     evdev fds (SCM_RIGHTS); the old daemon then exits. Adopting the fds
+#     keeps each controller's kernel event queue, so nothing pressed during
+#     the restart is missed.
+#   * On SIGTERM/Ctrl+C the daemon writes the checkpoint to a file in the
+#     runtime dir; a daemon started within MAX_AGE seconds picks it up and
+#     reopens the nodes itself.
+#
+# Timers are CLOCK_MONOTONIC values, so they're only reused on the same boot.
+
+import os
+import json
+import time
+import threading
+
+from monitor.notif import log
+from monitor.battery_model import BatteryModel
+from monitor.sockapi import Client, SocketError, runtime_dir
+
+CHECKPOINT_NAME = "ps5-idle.state"
+VERSION = 2
+MAX_AGE = 60  # seconds a checkpoint file stays usable
+MAX_FDS = 253  # SCM_MAX_FD; nodes past this are reopened by path
+EXIT_WAIT = 5.0  # seconds to wait for the old daemon to go away
+
+takeover_requested = False  # set by `--takeover`
+handed_off = False  # our controllers went to a new daemon: don't write a file
+
+_saved = {}  # controller path -> checkpoint record, until the first scan is done
+_fds = {}  # node path -> fd handed over by the old daemon
+_claimed = set()  # node paths of claimed records, whose fds are still wanted
+_lock = threading.Lock()
+
+
+def checkpoint_path():
+    return os.path.join(runtime_dir(), CHECKPOINT_NAME)
+
+def _boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+def build():
+    """Checkpoint of every registered controller; returns (data, fds)
+    where data["fds"] names the node each fd belongs to."""
+    from monitor.registry import registry
+
+    controllers = []
+    nodes, fds = [], []
+    for entry in registry.entries():
+        state = entry.state
+        controllers.append({
+            "path": entry.path,
+            "name": entry.name,
+            "mac": entry.mac,
+            "player": entry.player,
+            "nodes": entry.nodes,
+            "last_input": state.last_input,
+            "hold_until": state.hold_until,
+            "idle_timeout": state.idle_timeout,
+            "charging": state.charging,
+            "battery": entry.battery.to_dict(),
+            "stats": state.stats,
+        })
+        for node, dev in (entry.devices or {}).items():
+            if len(fds) < MAX_FDS:
+                nodes.append(node)
+                fds.append(dev.fd)
+    data = {
+        "version": VERSION,
+        "boot_id": _boot_id(),
+        "written": time.time(),
+        "pid": os.getpid(),
+        "controllers": controllers,
+        "fds": nodes,
+    }
+    return data, fds
+
+def save():
+    """Write the checkpoint file on the way out (not after a handoff)."""
+    if handed_off:
+        return
+    data, _ = build()
+    path = checkpoint_path()
+    if not data["controllers"]:
+        _discard(path)
+        return
+    data["fds"] = []  # gone with this process
+    tmp = f"{path}.{os.getpid()}"
+    try:
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+        log(f"💾 Saved state of {len(data['controllers'])} controller(s) for the next start")
+    except OSError as e:
+        log(f"⚠️ Could not save checkpoint: {e}")
+        _discard(tmp)
+
+def _discard(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def _load_file():
+    path = checkpoint_path()
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    finally:
+        _discard(path)  # used at most once
+    if time.time() - data.get("written", 0) > MAX_AGE:
+        log("⚠️ Ignoring checkpoint: too old")
+        return None
+    return data
+
+def _take_over():
+    """Ask the running daemon for its controllers; returns (data, fds), or
+    (None, []) if no daemon is listening."""
+    try:
+        client = Client(timeout=EXIT_WAIT)
+    except OSError:
+        return None, []
+    with client:
+        data, fds = client.call_fds("handoff")
+        # The old daemon exits right after replying; its D-Bus name and
+        # socket must be free before we claim them
+        try:
+            while client.sock.recv(4096):
+                pass
+        except OSError:
+            log("⚠️ Old daemon still running after handoff")
+    log(f"🤝 Took over {len(data['controllers'])} controller(s) from pid {data.get('pid')}")
+    return data, fds
+
+def resume(open_device):
+    """Load the checkpoint (handed over or from the file) before the daemon
+    starts its services. Returns an `open_device` that adopts handed-over
+    fds and otherwise calls the given one."""
+    data, fds = None, []
+    if takeover_requested:
+        try:
+            data, fds = _take_over()
+        except (OSError, SocketError, ValueError, KeyError) as e:
+            log(f"⚠️ Could not take over from the running daemon: {e}")
+    if data is None:
+        data = _load_file()
+    else:
+        _discard(checkpoint_path())
+
+    if not data or data.get("version") != VERSION or data.get("boot_id") != _boot_id():
+        for fd in fds:
+            os.close(fd)
+        return open_device
+
+    _saved.update((c["path"], c) for c in data["controllers"])
+    _fds.update(zip(data.get("fds", ()), fds))
+
+    def adopt(node):
+        with _lock:
+            fd = _fds.pop(node, None)
+        try:
+            dev = open_device(node)
+        except Exception:
+            if fd is not None:
+                os.close(fd)
+            raise
+        if fd is not None:
+            # Same device behind the node? (eventN numbers get reused)
+            if os.fstat(fd).st_rdev == os.fstat(dev.fd).st_rdev:
+                os.dup2(fd, dev.fd)  # dev now reads the old daemon's queue
+            os.close(fd)
+        return dev
+
+    return adopt
+
+def claim(path, mac):
+    """The checkpoint record for a controller found by the first scan, if
+    it is the same controller."""
+    with _lock:
+        saved = _saved.pop(path, None)
+        if saved is None or saved["mac"] != mac:
+            return None
+        _claimed.update(saved["nodes"])
+        return saved
+
+def restore(entry, saved):
+    state = entry.state
+    state.last_input = min(saved["last_input"], time.monotonic())
+    state.hold_until = saved["hold_until"]
+    state.idle_timeout = saved.get("idle_timeout")
+    state.charging = saved["charging"]
+    state.stats.update(saved.get("stats") or {})
+    if saved.get("battery"):
+        entry.battery = BatteryModel.from_dict(saved["battery"])
+    entry.restored = True
+
+def finish():
+    """After the first scan: forget records nobody claimed and close their fds."""
+    with _lock:
+        _saved.clear()
+        for node in [node for node in _fds if node not in _claimed]:
+            os.close(_fds.pop(node))
+        _claimed.clear()
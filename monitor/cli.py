@@ -3,59 +3,194 @@
 import os
 import sys
 import time
-import subprocess
 import argparse
-import socket
 import json
 
-from monitor.battery import get_battery_level
+# Keep this module's imports light: panel scripts run `--status` every few
+# seconds. Anything heavier is imported inside the branch that needs it.
 from monitor.notif import log
-from monitor.monitor import scan_loop, shutdown_all_threads
-from monitor.macs import find_dualsense_event_devices
-from monitor.config import load_config
-from configparser import ConfigParser
-from monitor.config import HOME_CONFIG
+from monitor.config import get_config, save_setting, MIN_IDLE_TIMEOUT
 
-config = load_config()
 PID_FILE = os.path.expanduser("~/.cache/ps5-idle-timeout.pid")
+BULK_TIMEOUT = 15  # seconds; the daemon gives each disconnect 5
+
+def socket_request(op, timeout=2.0, **args):
+    """Ask the daemon over its Unix socket. Returns None if it isn't
+    listening there, so the caller can fall back to D-Bus."""
+    from monitor.sockapi import Client
+    try:
+        client = Client(timeout=timeout)
+    except OSError:
+        return None
+    with client:
+        return client.call(op, **args)
+
+def _duration(seconds):
+    minutes = int(seconds) // 60
+    return f"{minutes // 60}h {minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m"
+
+def battery_text(info):
+    """The reported level plus the daemon's estimate, e.g. "75% (≈72%, 4h 10m left)"."""
+    battery = info.get("battery", "Unknown")
+    extra = []
+    predicted = info.get("battery_predicted")
+    if predicted not in (None, "") and f"{predicted}%" != battery:
+        extra.append(f"≈{predicted}%")
+    if info.get("time_to_full") not in (None, ""):
+        extra.append(f"full in {_duration(info['time_to_full'])}")
+    elif info.get("time_to_empty") not in (None, ""):
+        extra.append(f"{_duration(info['time_to_empty'])} left")
+    return f"{battery} ({', '.join(extra)})" if extra else battery
+
+def print_status(data, player_filter=None, warnings=None):
+    for path, info in data.items():
+        if player_filter is not None and info.get("player") != player_filter:
+            continue
+
+        battery = battery_text(info)
+        charging = info.get("charging", False)
+        idle = info.get("idle_remaining", 0)
+
+        if charging:
+            status_line = "⚡ Charging — idle timer paused"
+        elif warnings and path in warnings:
+            status_line = f"⏳ Idle — disconnecting soon (warned at {warnings[path]})"
+        else:
+            remaining = idle
+            status_line = f"Idle timeout in: {remaining:.1f}s"
+
+        print(f"• Player {info['player']}: {info['name']} ({info.get('mac')}) — Battery: {battery} — {status_line}")
+
+def print_events(events):
+    for event in events:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event.get("ts", 0)))
+        who = f"Player {event['player']}" if event.get("player") not in (None, "") else "Player ?"
+        parts = [f"{event.get('event', '?'):<17}", who]
+        if event.get("name"):
+            parts.append(str(event["name"]))
+        if event.get("mac"):
+            parts.append(f"({event['mac']})")
+        line = " ".join(parts)
+        if event.get("reason"):
+            line += f" — {event['reason']}"
+        if event.get("battery"):
+            line += f" — battery {event['battery']}"
+        if event.get("error"):
+            line += f" — {event['error']}"
+        print(f"[{when}] {line}")
+
+def print_results(results):
+    """One line per controller of a bulk operation, then the totals."""
+    if not results:
+        print("No matching controllers")
+        return
+    for result in results:
+        mac = result.get("mac") or "??"
+        if result.get("player") not in (None, ""):
+            who = f"Player {result['player']}: {result.get('name') or 'Unknown'} ({mac})"
+        else:
+            who = mac
+        outcome = "✅ disconnected" if result.get("ok") else f"⚠️ {result.get('error') or 'failed'}"
+        print(f"• {who} — {outcome}")
+    done = sum(1 for result in results if result.get("ok"))
+    print(f"\n{done} of {len(results)} disconnected")
+
+def bulk_request(op, method, *dbus_args, **args):
+    """Run a bulk op over the socket, or the D-Bus method if the socket isn't there."""
+    results = socket_request(op, timeout=BULK_TIMEOUT, **args)
+    if results is None:
+        import dbus
+        bus = dbus.SessionBus()
+        remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
+        iface = dbus.Interface(remote, "org.dualsense.Monitor")
+        results = [{str(k): v for k, v in r.items()} for r in getattr(iface, method)(*dbus_args, timeout=BULK_TIMEOUT)]
+    return results
+
+def watch_status(player_filter=None):
+    """Redraw the status table whenever the daemon signals a change."""
+    import dbus
+    import dbus.mainloop.glib
+    from gi.repository import GLib
+
+    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+    bus = dbus.SessionBus()
+    data = {}
+    warnings = {}  # path -> time of the last IdleWarning
+
+    def redraw():
+        print("\033[H\033[J", end="")
+        print(f"🎮 Controller Status — updated {time.strftime('%H:%M:%S')} (Ctrl+C to quit)\n")
+        if not data:
+            print("No controllers connected")
+        print_status(data, player_filter, warnings)
+        sys.stdout.flush()
+
+    def on_status(status_map):
+        data.clear()
+        for path, info in status_map.items():
+            data[str(path)] = {str(key): value for key, value in info.items()}
+        for path in list(warnings):
+            if path not in data:
+                del warnings[path]
+        redraw()
+
+    def on_idle_warning(path, seconds_remaining):
+        warnings[str(path)] = time.strftime("%H:%M:%S")
+        redraw()
+
+    def on_owner(owner):
+        # Daemon (re)started or went away: take a fresh copy
+        data.clear()
+        if owner:
+            try:
+                remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
+                on_status(dbus.Interface(remote, "org.dualsense.Monitor").GetStatusMap())
+                return
+            except dbus.DBusException as e:
+                log(f"⚠️ Could not query D-Bus status: {e}")
+        redraw()
+
+    bus.add_signal_receiver(on_status, signal_name="StatusChanged", dbus_interface="org.dualsense.Monitor")
+    bus.add_signal_receiver(on_idle_warning, signal_name="IdleWarning", dbus_interface="org.dualsense.Monitor")
+    bus.watch_name_owner("org.dualsense.Monitor", on_owner)
+    try:
+        GLib.MainLoop().run()
+    except KeyboardInterrupt:
+        print()
 
 def handle_cli_args(script_path):
     parser = argparse.ArgumentParser(description="DualSense idle timeout monitor & battery checker")
     parser.add_argument("-s", "--status", nargs="?", const="all",metavar="", help="Show all controllers, or only one by player number (e.g., -s 1)")
+    parser.add_argument("-w","--watch", action="store_true", help="With --status: keep running and redraw when the status changes")
     parser.add_argument("-v","--version", action="store_true", help="Print version and exit")
     parser.add_argument("-d","--daemon", action="store_true", help="Run monitor in background (detached)")
     parser.add_argument("-x","--stop", action="store_true", help="Stop the background daemon")
-    parser.add_argument("-r","--restart", action="store_true", help="Restart the script to reload config")
+    parser.add_argument("-r","--restart", action="store_true", help="Restart the daemon, keeping idle timers and player numbers")
+    parser.add_argument("--takeover", action="store_true", help="Start the monitor and take over the controllers of the running daemon")
+    parser.add_argument("--on-demand", action="store_true", help="Exit exit_grace seconds after the last controller disconnects (for the udev-activated service)")
     parser.add_argument("-t","--set-timeout", type=int, help="Set new idle timeout value (in seconds)", metavar=" ")
     parser.add_argument("-n","--notify-now", action="store_true", help="Send a desktop notification with current controller status")
+    parser.add_argument("-l","--log", nargs="?", const=20, type=int, metavar="N", help="Show the last N controller events (default 20)")
+    parser.add_argument("-m","--metrics", action="store_true", help="Print the daemon's runtime metrics (Prometheus text format)")
     parser.add_argument("-k","--disconnect", type=int, help="Disconnect controller by index (e.g., 1 for Player 1)", metavar=" ")
+    parser.add_argument("--disconnect-all", action="store_true", help="Disconnect every controller at once")
+    parser.add_argument("--disconnect-idle", type=float, metavar="SECONDS", help="Disconnect every controller idle for at least SECONDS")
+    parser.add_argument("--disconnect-mac", nargs="+", metavar="MAC", help="Disconnect the controllers with these MAC addresses")
+    parser.add_argument("--controller-timeout", nargs=2, type=int, metavar=("PLAYER", "SECONDS"), help="Idle timeout for one controller until it disconnects (0 = back to the configured one)")
+    parser.add_argument("--record", metavar="FILE", help="Record the first controller's raw input to FILE until Ctrl+C")
+    parser.add_argument("--replay", metavar="FILE", help="Run a recording through the activity filter and report idle decisions")
+    parser.add_argument("--threshold", type=int, nargs="+", metavar="N", help="With --replay: drift thresholds to try (default: from config)")
+    parser.add_argument("--speed", type=float, default=0, help="With --replay: 1 = recorded pace, 0 = as fast as possible (default)")
 
 
     args = parser.parse_args()
+    config = get_config()
 
     if args.version:
-        print(f"ps5-idle-timeout version {config['app']['version']}")
+        print(f"ps5-idle-timeout version {config.version}")
         return True
 
     if args.status is not None:
-        try:
-            import dbus
-            bus = dbus.SessionBus()
-            remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
-            iface = dbus.Interface(remote, "org.dualsense.Monitor")
-            data = json.loads(iface.GetStatus())
-        except Exception as e:
-            log(f"⚠️ Could not query D-Bus status: {e}")
-            data = {}
-
-        print("🎮 Controller Status\n")
-        monitor_cfg = config["monitor"]
-        print(
-            f"🛠️  Config — idle_timeout: {monitor_cfg['idle_timeout']}s, "
-            f"rescan_interval: {monitor_cfg['rescan_interval']}s, "
-            f"drift_threshold: {monitor_cfg['stick_drift_threshold']}\n"
-        )
-
         # Handle player number filter if one was passed
         player_filter = None
         if args.status != "all":
@@ -65,23 +200,94 @@ def handle_cli_args(script_path):
                 log("⚠️ Invalid player number for --status")
                 return True
 
-        for path, info in data.items():
-            if player_filter is not None and info.get("player") != player_filter:
-                continue
+        if args.watch:
+            watch_status(player_filter)
+            return True
 
-            battery = info.get("battery", "Unknown")
-            charging = info.get("charging", False)
-            idle = info.get("idle_remaining", 0)
-            timeout = int(config["monitor"]["idle_timeout"])
+        try:
+            data = socket_request("status")
+            if data is None:
+                import dbus
+                bus = dbus.SessionBus()
+                remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
+                iface = dbus.Interface(remote, "org.dualsense.Monitor")
+                data = json.loads(iface.GetStatus())
+        except Exception as e:
+            log(f"⚠️ Could not query daemon status: {e}")
+            data = {}
 
-            if charging:
-                status_line = f"⚡ Charging — idle timer paused"
-            else:
-                remaining = idle
-                status_line = f"Idle timeout in: {remaining:.1f}s"
+        print("🎮 Controller Status\n")
+        print(
+            f"🛠️  Config — idle_timeout: {config.idle_timeout}s, "
+            f"rescan_interval: {config.rescan_interval}s, "
+            f"drift_threshold: {config.stick_drift_threshold}\n"
+        )
+
+        print_status(data, player_filter)
+        return True
+
+    if args.log is not None:
+        try:
+            events = socket_request("events", n=args.log)
+            if events is None:
+                import dbus
+                bus = dbus.SessionBus()
+                remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
+                iface = dbus.Interface(remote, "org.dualsense.Monitor")
+                events = [{str(k): v for k, v in e.items()} for e in iface.GetRecentEvents(args.log)]
+        except Exception:
+            # Daemon not running: read what it wrote to disk
+            from monitor.events import read_events_file
+            events = read_events_file(args.log)
+
+        if not events:
+            print("No controller events recorded yet")
+        print_events(events)
+        return True
+
+    if args.metrics:
+        try:
+            data = socket_request("metrics")
+            if data is None:
+                import dbus
+                bus = dbus.SessionBus()
+                remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
+                iface = dbus.Interface(remote, "org.dualsense.Monitor")
+                data = json.loads(iface.GetMetrics())
+        except Exception as e:
+            log(f"⚠️ Could not query daemon metrics: {e}")
+            return True
+
+        from monitor.metrics import render_prometheus
+        print(render_prometheus(data), end="")
+        return True
+
+    if args.record:
+        from monitor.macs import find_dualsense_controllers
+        from monitor.recording import record_controller
+
+        controllers = find_dualsense_controllers(roles=config.activity_nodes)
+        if not controllers:
+            log("⚠️ No DualSense controller found to record")
+            return True
+        controller = controllers[0]
+        log(f"⏺️ Recording {controller.name} ({controller.mac}) to {args.record} — Ctrl+C to stop")
+        start = time.monotonic()
+        count = record_controller(args.record, controller)
+        log(f"💾 Recorded {count} events in {time.monotonic() - start:.0f}s")
+        return True
 
-            print(f"• Player {info['player']}: {info['name']} ({info['mac']}) — Battery: {battery} — {status_line}")
+    if args.replay:
+        from monitor.recording import replay, print_replay
 
+        thresholds = args.threshold or [config.stick_drift_threshold]
+        print(f"🔁 Replaying {args.replay} with idle_timeout {config.idle_timeout}s\n")
+        for threshold in thresholds:
+            try:
+                print_replay(replay(args.replay, threshold, config.idle_timeout, args.speed))
+            except (OSError, ValueError) as e:
+                log(f"⚠️ Could not replay {args.replay}: {e}")
+                break
         return True
 
     if args.daemon:
@@ -97,9 +303,10 @@ def handle_cli_args(script_path):
                 # PID file exists but process is not alive — continue to spawn new one
                 os.remove(PID_FILE)
 
+        import subprocess
         log("🔧 Starting in daemon mode...", summary="Daemon")
         proc = subprocess.Popen(
-            [sys.executable, script_path],
+            [sys.executable, script_path] + (["--on-demand"] if args.on_demand else []),
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             stdin=subprocess.DEVNULL,
@@ -125,56 +332,96 @@ def handle_cli_args(script_path):
         return True
 
     if args.restart:
+        import subprocess
         log("🔁 Restarting script manually...", summary="Restart")
-        shutdown_all_threads()
-        time.sleep(0.5)
-        subprocess.Popen(
-            [sys.executable, script_path],
+        # The new process takes the controllers (and their open devices)
+        # over from the running daemon, which then exits
+        proc = subprocess.Popen(
+            [sys.executable, script_path, "--takeover"] + (["--on-demand"] if args.on_demand else []),
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             stdin=subprocess.DEVNULL,
             close_fds=True,
             start_new_session=True
         )
+        if os.path.exists(PID_FILE):
+            with open(PID_FILE, "w") as f:
+                f.write(str(proc.pid))
         return True
 
-    if args.set_timeout is not None:
-        new_config = ConfigParser()
-        if os.path.exists(HOME_CONFIG):
-                config.read(HOME_CONFIG)
-        else:
-                os.makedirs(os.path.dirname(HOME_CONFIG), exist_ok=True)
+    if args.takeover or args.on_demand:
+        if args.takeover:
+            from monitor import checkpoint
+            checkpoint.takeover_requested = True
+        if args.on_demand:
+            from monitor import activation
+            activation.on_demand = True
+        return False  # go on and run the monitor
 
-        if not config.has_section("monitor"):
-                config.add_section("monitor")
-        config.set("monitor", "idle_timeout", str(args.set_timeout))
-        with open(HOME_CONFIG, "w") as f:
-                config.write(f)
+    if args.set_timeout is not None:
+        if args.set_timeout < MIN_IDLE_TIMEOUT:
+            log(f"⚠️ idle_timeout must be at least {MIN_IDLE_TIMEOUT}s")
+            return True
 
+        # The running daemon watches config.ini and picks this up live
+        save_setting("monitor", "idle_timeout", args.set_timeout)
         log(f"✅ idle_timeout set to {args.set_timeout}s", notify=True, summary="Config Updated")
         return True
     
     if args.notify_now:
         try:
-            import dbus
-            bus = dbus.SessionBus()
-            remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
-            iface = dbus.Interface(remote, "org.dualsense.Monitor")
-            iface.SendStatusToast()
+            if socket_request("notify") is None:
+                import dbus
+                bus = dbus.SessionBus()
+                remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
+                iface = dbus.Interface(remote, "org.dualsense.Monitor")
+                iface.SendStatusToast()
         except Exception as e:
             log(f"⚠️ Could not send status toast: {e}")
         return True
 
     if args.disconnect is not None:
         try:
-            import dbus
-            bus = dbus.SessionBus()
-            remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
-            iface = dbus.Interface(remote, "org.dualsense.Monitor")
-            result = iface.DisconnectByIndex(args.disconnect)
+            result = socket_request("disconnect", timeout=10, player=args.disconnect)
+            if result is None:
+                import dbus
+                bus = dbus.SessionBus()
+                remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
+                iface = dbus.Interface(remote, "org.dualsense.Monitor")
+                result = iface.DisconnectByIndex(args.disconnect)
             print(result)
         except Exception as e:
             log(f"⚠️ Could not disconnect by index: {e}")
         return True
 
+    if args.disconnect_all or args.disconnect_idle is not None or args.disconnect_mac:
+        try:
+            if args.disconnect_all:
+                results = bulk_request("disconnect_all", "DisconnectAll")
+            elif args.disconnect_idle is not None:
+                results = bulk_request("disconnect_idle", "DisconnectIdle", args.disconnect_idle,
+                                       min_idle=args.disconnect_idle)
+            else:
+                results = bulk_request("disconnect_macs", "DisconnectByMac", args.disconnect_mac,
+                                       macs=args.disconnect_mac)
+            print_results(results)
+        except Exception as e:
+            log(f"⚠️ Could not disconnect controllers: {e}")
+        return True
+
+    if args.controller_timeout is not None:
+        player, seconds = args.controller_timeout
+        try:
+            result = socket_request("set_controller_timeout", player=player, seconds=seconds)
+            if result is None:
+                import dbus
+                bus = dbus.SessionBus()
+                remote = bus.get_object("org.dualsense.Monitor", "/org/dualsense/Monitor")
+                iface = dbus.Interface(remote, "org.dualsense.Monitor")
+                result = iface.SetControllerTimeout(player, seconds)
+            print(result)
+        except Exception as e:
+            log(f"⚠️ Could not set the controller's idle timeout: {e}")
+        return True
+
     return False  # no flags matched — run main loop
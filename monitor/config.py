@@ -1,7 +1,11 @@
 # monitor/config.py
 
 import os
+import time
+import struct
+import threading
 import configparser
+from collections import namedtuple
 
 
 HOME_CONFIG = os.path.expanduser("~/.config/ps5-idle-timeout/config.ini")
@@ -13,13 +17,27 @@ DEFAULTS = {
         "idle_timeout": "60",
         "rescan_interval": "2",
         "stick_drift_threshold": "10",
-        "ignore_idle_when_charging": "true"
+        "ignore_idle_when_charging": "true",
+        "engine": "async",
+        "discovery": "hotplug",
+        "activity_nodes": "gamepad, touchpad",
+        "input_mode": "events",
+        "sample_interval": "1.0",
+        "metrics_textfile": "",
+        "exit_grace": "60"
     },
     "app": {
         "version": "1.2.0"
     }
 }
 
+ENGINES = ("async", "threaded")
+DISCOVERY_MODES = ("hotplug", "poll")
+NODE_ROLES = ("gamepad", "touchpad", "motion")
+INPUT_MODES = ("events", "sampling")
+MIN_SAMPLE_INTERVAL = 0.1  # seconds
+MIN_IDLE_TIMEOUT = 5  # seconds
+
 def load_config():
     config = configparser.ConfigParser()
     config.read_dict(DEFAULTS)  # Load defaults first
@@ -35,4 +53,187 @@ def load_config():
             if not config.has_option(section, key):
                 config.set(section, key, value)
 
-    return config
\ No newline at end of file
+    return config
+
+
+# A namedtuple rather than a dataclass: dataclasses pulls in inspect, which
+# is most of the import time of a one-shot CLI call.
+class ConfigSnapshot(namedtuple("ConfigSnapshot", (
+    "idle_timeout rescan_interval stick_drift_threshold ignore_idle_when_charging "
+    "engine discovery activity_nodes input_mode sample_interval metrics_textfile exit_grace version"
+))):
+    """Validated, immutable view of config.ini.
+
+    The daemon holds exactly one of these at a time (see get_config()); a
+    reload builds a new snapshot and swaps the reference, so readers never
+    see a half-updated config and never touch the disk.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_parser(cls, config):
+        monitor = config["monitor"]
+        snapshot = cls(
+            idle_timeout=monitor.getint("idle_timeout"),
+            rescan_interval=monitor.getint("rescan_interval"),
+            stick_drift_threshold=monitor.getint("stick_drift_threshold"),
+            ignore_idle_when_charging=monitor.getboolean("ignore_idle_when_charging"),
+            engine=monitor.get("engine").strip().lower(),
+            discovery=monitor.get("discovery").strip().lower(),
+            activity_nodes=tuple(r.strip().lower() for r in monitor.get("activity_nodes").split(",") if r.strip()),
+            input_mode=monitor.get("input_mode").strip().lower(),
+            sample_interval=monitor.getfloat("sample_interval"),
+            metrics_textfile=monitor.get("metrics_textfile").strip(),
+            exit_grace=monitor.getint("exit_grace"),
+            version=config["app"]["version"],
+        )
+        if snapshot.idle_timeout < MIN_IDLE_TIMEOUT:
+            raise ValueError(f"idle_timeout must be at least {MIN_IDLE_TIMEOUT}s")
+        if snapshot.rescan_interval < 1:
+            raise ValueError("rescan_interval must be at least 1s")
+        if snapshot.stick_drift_threshold < 0:
+            raise ValueError("stick_drift_threshold can't be negative")
+        if snapshot.engine not in ENGINES:
+            raise ValueError(f"engine must be one of {', '.join(ENGINES)}")
+        if snapshot.discovery not in DISCOVERY_MODES:
+            raise ValueError(f"discovery must be one of {', '.join(DISCOVERY_MODES)}")
+        if not snapshot.activity_nodes or not set(snapshot.activity_nodes) <= set(NODE_ROLES):
+            raise ValueError(f"activity_nodes must be a list of {', '.join(NODE_ROLES)}")
+        if snapshot.input_mode not in INPUT_MODES:
+            raise ValueError(f"input_mode must be one of {', '.join(INPUT_MODES)}")
+        if snapshot.sample_interval < MIN_SAMPLE_INTERVAL:
+            raise ValueError(f"sample_interval must be at least {MIN_SAMPLE_INTERVAL}s")
+        if snapshot.exit_grace < 0:
+            raise ValueError("exit_grace can't be negative")
+        return snapshot
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+_listeners = []
+
+def get_config():
+    """Current config snapshot; loaded from disk only the first time."""
+    snapshot = _snapshot
+    if snapshot is None:
+        snapshot = reload_config()
+    return snapshot
+
+def reload_config():
+    """Re-read config.ini and swap in a new snapshot if it is valid.
+
+    An invalid file keeps the previous snapshot (or the defaults on first
+    load). Listeners are called with (old, new) when anything changed.
+    """
+    global _snapshot
+    with _snapshot_lock:
+        old = _snapshot
+        try:
+            new = ConfigSnapshot.from_parser(load_config())
+        except (ValueError, configparser.Error) as e:
+            print(f"⚠️ Ignoring invalid config {HOME_CONFIG}: {e}")
+            if old is not None:
+                return old
+            defaults = configparser.ConfigParser()
+            defaults.read_dict(DEFAULTS)
+            new = ConfigSnapshot.from_parser(defaults)
+        _snapshot = new
+
+    if old is not None and new != old:
+        for listener in list(_listeners):
+            listener(old, new)
+    return new
+
+def add_reload_listener(fn):
+    _listeners.append(fn)
+
+def save_setting(section, key, value):
+    """Write one key to the user config, leaving everything else as is."""
+    config = configparser.ConfigParser()
+    if os.path.exists(HOME_CONFIG):
+        config.read(HOME_CONFIG)
+    else:
+        os.makedirs(os.path.dirname(HOME_CONFIG), exist_ok=True)
+
+    if not config.has_section(section):
+        config.add_section(section)
+    config.set(section, key, str(value))
+
+    # Write next to it and rename so the watcher never sees a partial file
+    tmp_path = HOME_CONFIG + ".tmp"
+    with open(tmp_path, "w") as f:
+        config.write(f)
+    os.replace(tmp_path, HOME_CONFIG)
+
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+_watcher = None
+
+def _inotify_watch(directory):
+    import ctypes  # daemon only; the CLI never watches
+    libc = ctypes.CDLL(None, use_errno=True)
+    fd = libc.inotify_init1(IN_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        err = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(err, f"inotify_add_watch failed for {directory}")
+    return fd
+
+def _watch_loop(fd):
+    filename = os.fsencode(os.path.basename(HOME_CONFIG))
+    while True:
+        data = os.read(fd, 4096)
+        offset = 0
+        changed = False
+        while offset < len(data):
+            _wd, _mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name == filename:
+                changed = True
+        if changed:
+            reload_config()
+
+def _poll_loop(interval=5):
+    last = None
+    while True:
+        try:
+            mtime = os.stat(HOME_CONFIG).st_mtime_ns
+        except OSError:
+            mtime = None
+        if last is not None and mtime != last:
+            reload_config()
+        last = mtime
+        time.sleep(interval)
+
+def watch_config():
+    """Start the background thread that reloads the snapshot on file changes.
+
+    Uses inotify on the config directory (editors usually replace the file,
+    so watching the file itself would lose track of it) and falls back to
+    polling the mtime if inotify isn't available.
+    """
+    global _watcher
+    if _watcher is not None:
+        return
+    get_config()
+
+    config_dir = os.path.dirname(HOME_CONFIG)
+    try:
+        os.makedirs(config_dir, exist_ok=True)
+        fd = _inotify_watch(config_dir)
+        _watcher = threading.Thread(target=_watch_loop, args=(fd,), daemon=True)
+    except (OSError, AttributeError) as e:
+        print(f"⚠️ inotify unavailable ({e}), polling {HOME_CONFIG} instead")
+        _watcher = threading.Thread(target=_poll_loop, daemon=True)
+    _watcher.start()
@@ -0,0 +1,198 @@
+# monitor/controller.py
+
+import os
+import time
+import fcntl
+import struct
+from evdev import ecodes
+
+HAT_CODES = frozenset((ecodes.ABS_HAT0X, ecodes.ABS_HAT0Y))
+
+EV_SYN = ecodes.EV_SYN
+EV_KEY = ecodes.EV_KEY
+EV_ABS = ecodes.EV_ABS
+SYN_REPORT = ecodes.SYN_REPORT
+SYN_DROPPED = ecodes.SYN_DROPPED
+
+EVIOCSCLOCKID = 0x400445a0  # _IOW('E', 0xa0, int)
+FLUSH_CHUNK = 24 * 1024  # bytes; 1024 input_events
+
+# Per-controller input counters. A frame (or sample) is accepted for the
+# first reason that applies: key, hat, axis; otherwise it was drift.
+INPUT_STATS = ("events", "frames", "samples", "key", "hat", "axis", "drift_filtered")
+
+def set_monotonic_clock(dev):
+    """Ask evdev to timestamp this device's events with CLOCK_MONOTONIC.
+
+    Returns False if the ioctl isn't supported (e.g. not a real evdev node);
+    callers then stamp activity with time.monotonic() at read time instead.
+    """
+    try:
+        fcntl.ioctl(dev.fd, EVIOCSCLOCKID, struct.pack("i", time.CLOCK_MONOTONIC))
+        return True
+    except OSError:
+        return False
+
+def read_pending(dev):
+    """Drain everything the kernel has queued for `dev` in bulk reads."""
+    events = []
+    try:
+        while True:
+            batch = list(dev.read())
+            events.extend(batch)
+            if len(batch) < 64:  # evdev reads at most 64 events per call
+                break
+    except BlockingIOError:
+        pass
+    return events
+
+def flush_pending(dev):
+    """Throw away whatever is queued for `dev` without decoding it."""
+    try:
+        while len(os.read(dev.fd, FLUSH_CHUNK)) == FLUSH_CHUNK:
+            pass
+    except BlockingIOError:
+        pass
+
+def abs_axes(dev):
+    """ABS codes the device reports; looked up once per node for sampling."""
+    return [code for code, _info in dev.capabilities().get(EV_ABS, ())]
+
+def sample_device(dev, axes):
+    """Current held buttons (EVIOCGKEY) and axis values (EVIOCGABS)."""
+    return frozenset(dev.active_keys()), {code: dev.absinfo(code).value for code in axes}
+
+
+class ControllerState:
+    """Per-controller activity state, shared by the threaded and asyncio engines."""
+
+    def __init__(self, path, name, mac, drift_threshold):
+        self.path = path
+        self.name = name
+        self.mac = mac
+        self.drift_threshold = drift_threshold
+        self.kernel_clock = False  # event timestamps are CLOCK_MONOTONIC
+        self.last_input = time.monotonic()
+        self.hold_until = 0.0  # earliest time the idle check may run again
+        self.idle_timeout = None  # per-controller override, None = config
+        self.charging = None
+        self.disconnected = False
+        self.failed_idle_at = None  # last_input of the idle stretch a disconnect failed in
+        # node path -> [frame_abs, frame_key, abs_state]; the touchpad node
+        # reuses ABS_X/ABS_Y, so each node keeps its own baselines and frame
+        self._nodes = {}
+        self._samples = {}  # node path -> (keys, axis values) at the last sample
+        self.stats = dict.fromkeys(INPUT_STATS, 0)
+
+    def touch(self):
+        self.last_input = time.monotonic()
+
+    def idle_for(self):
+        return time.monotonic() - self.last_input
+
+    def handle_events(self, events, node=None):
+        """Feed a batch of evdev events from one of the controller's nodes,
+        grouped into SYN_REPORT frames.
+
+        Within a frame only the latest value per axis is kept, and drift is
+        evaluated once per axis when the frame closes. Activity is stamped
+        with the kernel timestamp of the frame's SYN_REPORT. A trailing
+        partial frame is carried over to the next batch from that node.
+        Returns True if any frame counted as real input.
+        """
+        filt = self._nodes.get(node)
+        if filt is None:
+            filt = self._nodes[node] = [{}, False, {}]
+        frame_abs, frame_key, abs_state = filt
+        threshold = self.drift_threshold
+        active_at = None
+        frames = keys = hats = axes = filtered = 0
+
+        for event in events:
+            etype = event.type
+            if etype == EV_ABS:
+                frame_abs[event.code] = event.value
+            elif etype == EV_KEY:
+                frame_key = True
+            elif etype == EV_SYN:
+                code = event.code
+                if code == SYN_REPORT:
+                    frames += 1
+                    hat = axis = False
+                    for code, value in frame_abs.items():
+                        prev = abs_state.get(code, value)
+                        abs_state[code] = value
+                        if code in HAT_CODES:
+                            if value:
+                                hat = True
+                        elif value - prev > threshold or prev - value > threshold:
+                            axis = True
+                    if frame_key:
+                        keys += 1
+                        active_at = event
+                    elif hat:
+                        hats += 1
+                        active_at = event
+                    elif axis:
+                        axes += 1
+                        active_at = event
+                    elif frame_abs:
+                        filtered += 1
+                elif code != SYN_DROPPED:
+                    continue
+                # Frame closed (or the kernel dropped events): start clean
+                frame_abs.clear()
+                frame_key = False
+
+        filt[1] = frame_key
+        stats = self.stats
+        stats["events"] += len(events)
+        stats["frames"] += frames
+        stats["key"] += keys
+        stats["hat"] += hats
+        stats["axis"] += axes
+        stats["drift_filtered"] += filtered
+        if active_at is None:
+            return False
+
+        if self.kernel_clock:
+            self.last_input = active_at.sec + active_at.usec / 1_000_000
+        else:
+            self.last_input = time.monotonic()
+        return True
+
+    def handle_sample(self, keys, values, node=None):
+        """Compare a state snapshot from `sample_device` with the previous one.
+
+        Any change in held buttons, a hat leaving center or an axis moving
+        more than the drift threshold since the last sample counts as input.
+        The first sample of a node only sets the baseline.
+        """
+        prev = self._samples.get(node)
+        self._samples[node] = (keys, values)
+        stats = self.stats
+        stats["samples"] += 1
+        if prev is None:
+            return False
+
+        prev_keys, prev_values = prev
+        reason = "key" if keys != prev_keys else None
+        if reason is None:
+            threshold = self.drift_threshold
+            for code, value in values.items():
+                before = prev_values.get(code, value)
+                if code in HAT_CODES:
+                    if value and value != before:
+                        reason = "hat"
+                        break
+                elif value - before > threshold or before - value > threshold:
+                    reason = "axis"
+                    break
+
+        if reason is None:
+            if values != prev_values:
+                stats["drift_filtered"] += 1
+            return False
+        stats[reason] += 1
+        self.last_input = time.monotonic()
+        return True
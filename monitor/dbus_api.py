@@ -5,14 +5,74 @@ import dbus.service
 import dbus.mainloop.glib
 from gi.repository import GLib
 import json
-import os
-
-# ✅ Set the main loop globally BEFORE any connections are made
-dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
+import time
+import inspect
+import functools
+from monitor import status, metrics
 
 BUS_NAME = "org.dualsense.Monitor"
 OBJ_PATH = "/org/dualsense/Monitor"
 
+STATUS_SIGNAL_INTERVAL = 1.0    # seconds between StatusChanged signals
+BATTERY_SIGNAL_INTERVAL = 30.0  # seconds between BatteryChanged signals per controller
+IDLE_WARNING_LEAD = 30          # seconds of warning before an idle disconnect
+
+def _typed(info):
+    # A variant can't hold None; leave the key out so a missing estimate
+    # doesn't come back as "" in an integer field
+    return dbus.Dictionary({
+        key: value for key, value in info.items() if value is not None
+    }, signature="sv")
+
+
+def _timed(func):
+    """Record the method's latency in metrics. The wrapper keeps the
+    original signature, which dbus-python inspects for its arguments."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with metrics.timed("dualsense_dbus_method_seconds", method=func.__name__):
+            return func(*args, **kwargs)
+    wrapper.__signature__ = inspect.signature(func)
+    return wrapper
+
+
+class _Throttle:
+    """Rate-limit fn per key on the GLib thread.
+
+    The first call goes out at once; calls within `interval` of it collapse
+    into one trailing call with the latest arguments.
+    """
+
+    def __init__(self, interval, fn):
+        self.interval = interval
+        self.fn = fn
+        self.last = {}
+        self.pending = {}
+
+    def __call__(self, key, *args):
+        if key in self.pending:
+            self.pending[key] = args
+            return
+        wait = self.last.get(key, float("-inf")) + self.interval - time.monotonic()
+        if wait <= 0:
+            self.last[key] = time.monotonic()
+            self.fn(*args)
+        else:
+            self.pending[key] = args
+            GLib.timeout_add(int(wait * 1000) + 1, self._flush, key)
+
+    def _flush(self, key):
+        args = self.pending.pop(key, None)
+        if args is not None:
+            self.last[key] = time.monotonic()
+            self.fn(*args)
+        return False
+
+    def forget(self, key):
+        self.last.pop(key, None)
+        self.pending.pop(key, None)
+
+
 class StatusService(dbus.service.Object):
     def __init__(self, get_status_fn):
         self.get_status_fn = get_status_fn
@@ -20,92 +80,192 @@ class StatusService(dbus.service.Object):
         name = dbus.service.BusName(BUS_NAME, self.bus)
         super().__init__(name, OBJ_PATH)
 
+        self._status_throttle = _Throttle(STATUS_SIGNAL_INTERVAL, lambda: self.StatusChanged(self.GetStatusMap()))
+        self._battery_throttle = _Throttle(BATTERY_SIGNAL_INTERVAL, self.BatteryChanged)
+        self._warned = {}  # path -> last_input the IdleWarning was sent for
+        self._warning_timer = None
+        # Snapshots are published from the monitor's threads; hop onto ours
+        status.add_listener(lambda old, new: GLib.idle_add(self._on_status_change, old, new))
+        GLib.idle_add(self._on_status_change, (), status.current())
+
+    # Signals
+
+    @dbus.service.signal(BUS_NAME, signature="sa{sv}")
+    def ControllerConnected(self, path, info):
+        pass
+
+    @dbus.service.signal(BUS_NAME, signature="sa{sv}")
+    def ControllerDisconnected(self, path, info):
+        pass
+
+    @dbus.service.signal(BUS_NAME, signature="ssb")
+    def BatteryChanged(self, path, battery, charging):
+        pass
+
+    @dbus.service.signal(BUS_NAME, signature="sd")
+    def IdleWarning(self, path, seconds_remaining):
+        pass
+
+    @dbus.service.signal(BUS_NAME, signature="a{sa{sv}}")
+    def StatusChanged(self, status_map):
+        pass
+
+    def _on_status_change(self, old, new):
+        now = time.monotonic()
+        before = {entry.path: entry for entry in old}
+        after = {entry.path: entry for entry in new}
+
+        for path, entry in after.items():
+            prev = before.get(path)
+            if prev is None:
+                self.ControllerConnected(path, _typed(entry.as_dict(now)))
+            elif (entry.battery, entry.charging) != (prev.battery, prev.charging):
+                self._battery_throttle(path, path, entry.battery, entry.charging)
+        for path, entry in before.items():
+            if path not in after:
+                self._battery_throttle.forget(path)
+                self._warned.pop(path, None)
+                self.ControllerDisconnected(path, _typed(entry.as_dict(now)))
+
+        self._status_throttle(None)
+        self._arm_idle_warning()
+        return False
+
+    def _arm_idle_warning(self):
+        # One timer for the soonest warning. Input doesn't republish the
+        # snapshot, so the deadlines are re-read whenever the timer fires.
+        if self._warning_timer is not None:
+            GLib.source_remove(self._warning_timer)
+            self._warning_timer = None
+
+        now = time.monotonic()
+        soonest = None
+        for entry in status.current():
+            if entry.charging:
+                continue
+            lead = min(IDLE_WARNING_LEAD, entry.idle_timeout / 2)
+            last_input = entry.state.last_input
+            if self._warned.get(entry.path) == last_input:
+                # Already warned; a new warning needs fresh input first
+                wait = entry.idle_timeout - lead
+            else:
+                remaining = entry.idle_timeout - (now - last_input)
+                wait = remaining - lead
+                if wait <= 0:
+                    if remaining > 0:
+                        self.IdleWarning(entry.path, remaining)
+                    self._warned[entry.path] = last_input
+                    wait = entry.idle_timeout - lead
+            soonest = wait if soonest is None else min(soonest, wait)
+
+        if soonest is not None:
+            self._warning_timer = GLib.timeout_add(int(soonest * 1000) + 1, self._on_warning_timer)
+
+    def _on_warning_timer(self):
+        self._warning_timer = None
+        self._arm_idle_warning()
+        return False
+
+    # Methods
+
     @dbus.service.method(BUS_NAME, in_signature="", out_signature="s")
+    @_timed
     def GetStatus(self):
         data = self.get_status_fn()
         return json.dumps(data)
 
-    @dbus.service.method(BUS_NAME, in_signature="", out_signature="s")
-    def SendStatusToast(self):
+    @dbus.service.method(BUS_NAME, in_signature="", out_signature="a{sa{sv}}")
+    @_timed
+    def GetStatusMap(self):
+        # Same data as GetStatus, typed, so clients don't have to parse JSON
         data = self.get_status_fn()
-        lines = []
-
-        for info in data.values():
-            name = info.get("name", "Controller")
-            battery = info.get("battery", "Unknown")
-            charging = info.get("charging", False)
-            idle = info.get("idle_remaining", 0)
-            mac = info.get("mac", "??")
-            timeout = int(os.environ.get("DUALSENSE_TIMEOUT", 60))
-
-            if charging:
-                status = "⚡ Charging"
-            else:
-                remaining = max(0, timeout - idle)
-                status = f"Idle in {remaining:.0f}s"
+        return dbus.Dictionary({path: _typed(info) for path, info in data.items()}, signature="sa{sv}")
+
+    @dbus.service.method(BUS_NAME, in_signature="i", out_signature="aa{sv}")
+    @_timed
+    def GetRecentEvents(self, n):
+        # Straight from the in-memory ring buffer, oldest first
+        from monitor.events import event_log
+        return dbus.Array([_typed(entry) for entry in event_log.recent(n)], signature="a{sv}")
+
+    @dbus.service.method(BUS_NAME, in_signature="", out_signature="s")
+    @_timed
+    def GetMetrics(self):
+        return metrics.snapshot_json()
 
-            lines.append(f"{name} ({mac}) — {battery} — {status}")
+    @dbus.service.method(BUS_NAME, in_signature="", out_signature="s")
+    @_timed
+    def SendStatusToast(self):
+        from monitor.monitor import send_status_toast
+        return send_status_toast()
 
-        from monitor.notif import send_dbus_notification
-        send_dbus_notification("🎮 DualSense Status", "\n".join(lines))
-        return "ok"
-    
     @dbus.service.method(BUS_NAME, in_signature="i", out_signature="s")
+    @_timed
     def SetTimeout(self, seconds):
-        from monitor.config import HOME_CONFIG, load_config
-        from configparser import ConfigParser
-        from monitor.notif import log
+        from monitor.monitor import set_idle_timeout
+        return set_idle_timeout(int(seconds))
 
-        if not isinstance(seconds, int) or seconds < 5:
-            return "Invalid timeout value"
+    @dbus.service.method(BUS_NAME, in_signature="ii", out_signature="s")
+    @_timed
+    def SetControllerTimeout(self, index, seconds):
+        from monitor.monitor import set_controller_timeout
+        return set_controller_timeout(int(index), int(seconds))
 
-        config = ConfigParser()
-        config.read(HOME_CONFIG)
-        if not config.has_section("monitor"):
-            config.add_section("monitor")
-        config.set("monitor", "idle_timeout", str(seconds))
-        with open(HOME_CONFIG, "w") as f:
-            config.write(f)
+    def _in_thread(self, method, fn, callback, errback, results=False):
+        # BlueZ calls block, so keep them off the GLib loop
+        import threading
+
+        def run():
+            try:
+                with metrics.timed("dualsense_dbus_method_seconds", method=method):
+                    result = fn()
+            except Exception as e:
+                errback(e)
+            else:
+                callback(dbus.Array([_typed(r) for r in result], signature="a{sv}") if results else result)
 
-        log(f"⏱️ Idle timeout updated to {seconds}s", notify=True, summary="Idle Timeout Changed")
-        return f"Idle timeout set to {seconds}s"
+        threading.Thread(target=run, daemon=True).start()
 
     @dbus.service.method(BUS_NAME,
                         in_signature='i',
                         out_signature='s',
                         async_callbacks=('dbus_callback', 'dbus_errback'))
     def DisconnectByIndex(self, index, dbus_callback, dbus_errback):
-        import threading
-        from monitor.monitor import controller_threads, lock
-        import subprocess
-        from monitor.notif import log
+        from monitor.monitor import disconnect_player
+        self._in_thread("DisconnectByIndex", lambda: disconnect_player(int(index)), dbus_callback, dbus_errback)
+
+    # Bulk disconnects run concurrently and return one {player, mac, name,
+    # ok, error} dict per controller
+
+    @dbus.service.method(BUS_NAME, in_signature="", out_signature="aa{sv}",
+                         async_callbacks=("dbus_callback", "dbus_errback"))
+    def DisconnectAll(self, dbus_callback, dbus_errback):
+        from monitor.monitor import disconnect_all
+        self._in_thread("DisconnectAll", disconnect_all, dbus_callback, dbus_errback, results=True)
+
+    @dbus.service.method(BUS_NAME, in_signature="d", out_signature="aa{sv}",
+                         async_callbacks=("dbus_callback", "dbus_errback"))
+    def DisconnectIdle(self, min_idle, dbus_callback, dbus_errback):
+        from monitor.monitor import disconnect_idle
+        self._in_thread("DisconnectIdle", lambda: disconnect_idle(float(min_idle)), dbus_callback, dbus_errback,
+                        results=True)
+
+    @dbus.service.method(BUS_NAME, in_signature="as", out_signature="aa{sv}",
+                         async_callbacks=("dbus_callback", "dbus_errback"))
+    def DisconnectByMac(self, macs, dbus_callback, dbus_errback):
+        from monitor.monitor import disconnect_macs
+        self._in_thread("DisconnectByMac", lambda: disconnect_macs([str(mac) for mac in macs]), dbus_callback,
+                        dbus_errback, results=True)
 
-        def do_disconnect():
-            try:
-                with lock:
-                    for info in controller_threads.values():
-                        if info.get("player") == index:
-                            mac = info.get("mac")
-                            name = info.get("name", "Unknown")
-                            if not mac:
-                                dbus_callback(f"{name} has no MAC — cannot disconnect")
-                                return
-
-                            try:
-                                subprocess.run(["bluetoothctl", "disconnect", mac], check=True)
-                                log(f"🔌 Disconnected {name} (Player {index})", notify=True, summary="Disconnected")
-                                dbus_callback(f"Disconnected {name} (Player {index})")
-                                return
-                            except subprocess.CalledProcessError as e:
-                                dbus_callback(f"Failed to disconnect Player {index}: {e}")
-                                return
-
-                dbus_callback(f"No controller found at index {index}")
-            except Exception as e:
-                dbus_errback(e)
 
-        threading.Thread(target=do_disconnect, daemon=True).start()
+def install_main_loop():
+    """Make GLib the default D-Bus main loop.
 
+    Must run before the first dbus.SessionBus() in the process (the daemon
+    calls this at startup), or the shared connection won't dispatch to
+    StatusService.
+    """
+    dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
 
 def run_dbus_loop(get_status_fn):
     print("📡 D-Bus service starting...")
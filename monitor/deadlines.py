@@ -0,0 +1,110 @@
+# monitor/deadlines.py
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """Min-heap of per-controller idle deadlines on the monotonic clock.
+
+    Input events never touch the heap, they only bump `state.last_input`.
+    When an entry comes due its real deadline is recomputed; if the
+    controller was active in the meantime the entry is lazily pushed back,
+    otherwise it is handed out as expired. An expired key stays out of the
+    heap until `reschedule()` or `remove()` is called for it.
+    """
+
+    def __init__(self, timeout_fn):
+        self.timeout_fn = timeout_fn
+        self._heap = []
+        self._states = {}
+        self._live = {}  # key -> seq of its valid heap entry, None while expiring
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def deadline_for(self, state):
+        return max(state.last_input + self.timeout_fn(state), state.hold_until)
+
+    def _push(self, key, deadline):
+        seq = next(self._seq)
+        self._live[key] = seq
+        heapq.heappush(self._heap, (deadline, seq, key))
+
+    def _peek(self):
+        # Drop entries superseded by a later push or a remove()
+        while self._heap and self._live.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def add(self, key, state):
+        with self._cond:
+            self._states[key] = state
+            self._push(key, self.deadline_for(state))
+            self._cond.notify()
+
+    def reschedule(self, key):
+        with self._cond:
+            state = self._states.get(key)
+            if state is not None:
+                self._push(key, self.deadline_for(state))
+                self._cond.notify()
+
+    def remove(self, key):
+        with self._cond:
+            self._states.pop(key, None)
+            self._live.pop(key, None)
+            # Dead entries normally leave when they reach the top, up to a
+            # timeout later; many reconnects in that time would pile them up
+            if len(self._heap) > 2 * len(self._live) + 16:
+                self._heap = [e for e in self._heap if self._live.get(e[2]) == e[1]]
+                heapq.heapify(self._heap)
+
+    def refresh(self):
+        """Recompute every deadline, e.g. after idle_timeout changed."""
+        with self._cond:
+            for key, state in self._states.items():
+                if self._live.get(key) is not None:
+                    self._push(key, self.deadline_for(state))
+            self._cond.notify()
+
+    def next_deadline(self):
+        with self._cond:
+            entry = self._peek()
+            return entry[0] if entry else None
+
+    def pop_expired(self, now=None):
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._cond:
+            while True:
+                entry = self._peek()
+                if entry is None or entry[0] > now:
+                    break
+                heapq.heappop(self._heap)
+                key = entry[2]
+                state = self._states[key]
+                deadline = self.deadline_for(state)
+                if deadline > now:
+                    self._push(key, deadline)
+                    continue
+                self._live[key] = None
+                expired.append((key, state))
+        return expired
+
+    def run(self, on_expire):
+        """Sleep until the earliest deadline, then hand expired keys to on_expire.
+
+        With nothing scheduled this blocks without waking up at all.
+        """
+        while True:
+            with self._cond:
+                entry = self._peek()
+                delay = None if entry is None else entry[0] - time.monotonic()
+                if delay is None or delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+            for key, state in self.pop_expired():
+                on_expire(key, state)
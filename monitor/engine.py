@@ -0,0 +1,264 @@
+# monitor/engine.py
+
+import asyncio
+import time
+from evdev import InputDevice
+from .notif import log
+from .macs import find_dualsense_controllers
+from .controller import (
+    ControllerState, set_monotonic_clock, read_pending, flush_pending, abs_axes, sample_device,
+)
+from .deadlines import DeadlineScheduler
+from .hotplug import open_hotplug, HOTPLUG_SETTLE
+from .monitor import (
+    handle_idle, get_idle_timeout, announce_controller, publish_status, record_event,
+    register_controller, match_controllers, start_services, add_timeout_listener,
+)
+from .registry import registry
+from . import metrics
+from . import checkpoint
+from . import activation
+from .aioloop import get_loop
+from .config import get_config, add_reload_listener
+
+class Engine:
+    """Multiplexes every controller's event nodes on a single asyncio loop.
+
+    Each device fd is registered with `loop.add_reader` and drained with the
+    non-blocking `dev.read()` (the same mechanism evdev's async_read uses), so
+    there is one thread for all controllers instead of one per event node.
+    Idle expiry is a single loop timer armed at the earliest deadline.
+
+    With `input_mode = sampling` nothing is registered per fd; one periodic
+    timer snapshots every controller's state instead.
+    """
+
+    def __init__(self, loop, open_device=InputDevice):
+        self.loop = loop
+        self.open_device = open_device
+        self.devices = {}  # controller path -> {node path: InputDevice}
+        self.scheduler = DeadlineScheduler(get_idle_timeout)
+        self._timer = None
+        self.hotplug = None
+        self._rescan_handle = None
+        self._rescan_task = None  # keeps the hotplug rescan task referenced while it runs
+        self._changed = []
+        self.sampling = get_config().input_mode == "sampling"
+        self._sampler = None
+        self._axes = {}  # fd -> ABS codes, sampling mode only
+        add_reload_listener(self._on_config_reload)
+        add_timeout_listener(self._refresh_deadlines)
+
+    def _open_node(self, path, node):
+        try:
+            dev = self.open_device(node)
+        except Exception as e:
+            log(f"❌ Could not open {node}: {e}")
+            return None
+        self.devices[path][node] = dev
+        if self.sampling:
+            self._axes[dev.fd] = abs_axes(dev)
+            if self._sampler is None:
+                self._sampler = self.loop.call_later(get_config().sample_interval, self._sample_all)
+        else:
+            self.loop.add_reader(dev.fd, self._on_readable, path, node)
+        return dev
+
+    def add_controller(self, path, name, mac, nodes=None):
+        """Start watching a controller on all of its activity nodes.
+
+        `nodes` defaults to just `path`. Returns the player number, or None
+        if none of the nodes could be opened.
+        """
+        self.devices[path] = {}
+        opened = [dev for dev in (self._open_node(path, node) for node in nodes or [path]) if dev]
+        if not opened:
+            del self.devices[path]
+            return None
+
+        state = ControllerState(path, name, mac, get_config().stick_drift_threshold)
+        state.kernel_clock = all([set_monotonic_clock(dev) for dev in opened])
+        entry = register_controller(path, name, mac, list(self.devices[path]), state)
+        entry.devices = self.devices[path]
+
+        self.scheduler.add(path, state)
+        self._arm_timer()
+        publish_status()
+        log(f"🔹 Monitoring {name} ({mac}) at {', '.join(self.devices[path])}")
+        return entry.player
+
+    def add_node(self, path, node):
+        """Attach a node that showed up after its controller was added."""
+        entry = registry.get(path)
+        if entry is None or node in self.devices.get(path, ()):
+            return
+        dev = self._open_node(path, node)
+        if dev is None:
+            return
+        state = entry.state
+        state.kernel_clock = state.kernel_clock and set_monotonic_clock(dev)
+        entry.nodes = list(self.devices[path])
+        log(f"🔹 Also monitoring {state.name} at {node}")
+
+    def remove_controller(self, path):
+        for dev in self.devices.pop(path, {}).values():
+            if self._axes.pop(dev.fd, None) is None:
+                self.loop.remove_reader(dev.fd)
+            try:
+                dev.close()
+            except OSError:
+                pass
+
+        self.scheduler.remove(path)
+        registry.remove(path)
+        publish_status()
+
+    def _on_readable(self, path, node):
+        dev = self.devices.get(path, {}).get(node)
+        entry = registry.get(path)
+        if dev is None or entry is None:
+            return
+
+        state = entry.state
+        if entry.stop.is_set():
+            self.remove_controller(path)
+            return
+
+        try:
+            state.handle_events(read_pending(dev), node)
+        except OSError:
+            self._lost(path, state)
+
+    def _lost(self, path, state):
+        # Any node going away means the controller went away
+        if not state.disconnected:
+            log(f"🔌 Device {state.name} disconnected unexpectedly")
+            record_event("lost", state, reason="input device went away")
+        self.remove_controller(path)
+        if not state.disconnected:
+            log(f"🚑 Finished monitoring {state.name}", notify=True, summary="Disconnected")
+
+    def _sample_all(self):
+        # One wakeup per sample_interval covers every controller
+        self._sampler = None
+        for path, nodes in list(self.devices.items()):
+            entry = registry.get(path)
+            if entry is None:
+                continue
+            state = entry.state
+            if entry.stop.is_set():
+                self.remove_controller(path)
+                continue
+            try:
+                for node, dev in nodes.items():
+                    flush_pending(dev)
+                    keys, values = sample_device(dev, self._axes[dev.fd])
+                    state.handle_sample(keys, values, node)
+            except OSError:
+                self._lost(path, state)
+        if self.devices:
+            self._sampler = self.loop.call_later(get_config().sample_interval, self._sample_all)
+
+    def _on_config_reload(self, old, new):
+        # Runs on the config watcher thread
+        if new.idle_timeout != old.idle_timeout:
+            self._refresh_deadlines()
+
+    def _refresh_deadlines(self):
+        self.scheduler.refresh()
+        self.loop.call_soon_threadsafe(self._arm_timer)
+
+    def _arm_timer(self):
+        # loop.time() is time.monotonic(), the same clock as the deadlines
+        deadline = self.scheduler.next_deadline()
+        if self._timer is not None:
+            if deadline is not None and self._timer.when() == deadline:
+                return
+            self._timer.cancel()
+            self._timer = None
+        if deadline is not None:
+            self._timer = self.loop.call_at(deadline, self._on_deadline)
+
+    def _on_deadline(self):
+        self._timer = None
+        for path, state in self.scheduler.pop_expired(time.monotonic()):
+            # Charging check + bluetoothctl block, so keep them off the loop
+            fut = self.loop.run_in_executor(None, handle_idle, state)
+            fut.add_done_callback(lambda f, p=path: self._idle_done(p, f))
+        self._arm_timer()
+
+    def _idle_done(self, path, fut):
+        if not fut.cancelled() and fut.exception() is None and fut.result():
+            self.remove_controller(path)
+        else:
+            self.scheduler.reschedule(path)
+            publish_status()  # the charging check may have refreshed the battery
+        self._arm_timer()
+
+    def _alive(self, timeout):
+        # Called from the watchdog thread: both loops must get to a callback
+        return activation.loop_responds(self.loop, timeout) and activation.loop_responds(get_loop(), timeout)
+
+    def prune_stopped(self):
+        for entry in registry.entries():
+            if entry.stop.is_set():
+                self.remove_controller(entry.path)
+
+    async def rescan(self):
+        start = time.perf_counter()
+        try:
+            await self._rescan()
+        finally:
+            metrics.observe("dualsense_scan_seconds", time.perf_counter() - start, engine="async")
+
+    async def _rescan(self):
+        changed, self._changed = self._changed, []
+        roles = get_config().activity_nodes
+        controllers = await self.loop.run_in_executor(None, find_dualsense_controllers, changed, roles)
+        self.prune_stopped()
+
+        new, late = match_controllers(controllers)
+        for entry, node_paths in late:
+            for node in node_paths:
+                self.add_node(entry.path, node)
+        for path, name, mac, node_paths in new:
+            player_number = self.add_controller(path, name, mac, node_paths)
+            if player_number is not None:
+                self.loop.run_in_executor(None, announce_controller, name, mac, player_number)
+
+    def _on_hotplug(self):
+        # Coalesce a burst of add/remove uevents into one rescan
+        events = self.hotplug.read_events()
+        self._changed.extend(events)
+        if events and self._rescan_handle is None:
+            self._rescan_handle = self.loop.call_later(HOTPLUG_SETTLE, self._hotplug_rescan)
+
+    def _hotplug_rescan(self):
+        self._rescan_handle = None
+        self._rescan_task = None  # keeps the hotplug rescan task referenced while it runs
+        self._rescan_task = self.loop.create_task(self.rescan())
+
+    async def run(self):
+        if get_config().discovery == "hotplug":
+            # Subscribe before the first scan so nothing slips in between
+            self.hotplug = open_hotplug()
+
+        if self.hotplug is not None:
+            self.loop.add_reader(self.hotplug.fileno(), self._on_hotplug)
+        await self.rescan()
+        checkpoint.finish()  # controllers the first scan didn't find are gone
+        activation.ready(self._alive)
+        if self.hotplug is not None:
+            await asyncio.Event().wait()  # everything else is callbacks
+
+        while True:
+            await asyncio.sleep(get_config().rescan_interval)
+            await self.rescan()
+
+
+async def _run(open_device):
+    engine = Engine(asyncio.get_running_loop(), open_device)
+    await engine.run()
+
+def run_engine(open_device=InputDevice):
+    asyncio.run(_run(start_services(open_device)))
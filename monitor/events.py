@@ -0,0 +1,117 @@
+# monitor/events.py
+#
+# Structured record of what happened to each controller (connects, idle
+# disconnects, failures, ...), for auditing after the fact. Recent events
+# live in a ring buffer; a background writer appends them to a JSON-lines
+# file in batches.
+
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from collections import deque
+
+EVENTS_FILE = os.path.expanduser("~/.cache/ps5-idle-timeout/events.jsonl")
+RING_SIZE = 500
+QUEUE_SIZE = 1024
+FLUSH_INTERVAL = 2.0  # seconds between batched writes
+MAX_BYTES = 1024 * 1024
+BACKUPS = 3  # events.jsonl.1 .. .3
+
+
+class EventLog:
+    def __init__(self, path=EVENTS_FILE):
+        self.path = path
+        self.ring = deque(maxlen=RING_SIZE)
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, event, mac=None, player=None, reason=None, battery=None, **extra):
+        """Note an event. Never blocks and never touches the disk itself."""
+        entry = {
+            "ts": round(time.time(), 3),
+            "event": event,
+            "mac": mac,
+            "player": player,
+            "reason": reason,
+            "battery": battery,
+            **extra,
+        }
+        self.ring.append(entry)
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+        return entry
+
+    def recent(self, n=50):
+        """The last n events, oldest first."""
+        events = list(self.ring)
+        return events[-n:] if n > 0 else events
+
+    def flush(self, timeout=FLUSH_INTERVAL + 1):
+        with self.queue.all_tasks_done:
+            self.queue.all_tasks_done.wait_for(lambda: not self.queue.unfinished_tasks, timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            time.sleep(FLUSH_INTERVAL)
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except OSError as e:
+                print(f"⚠️ Could not write {self.path}: {e}")
+            for _ in batch:
+                self.queue.task_done()
+
+    def _write(self, batch):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            size = f.tell()
+        if size > MAX_BYTES:
+            self._rotate()
+
+    def _rotate(self):
+        for i in range(BACKUPS - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def read_events_file(n=50, path=EVENTS_FILE):
+    """Last n events from the JSON-lines file (current file only), for when
+    the daemon isn't running."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = deque(f, maxlen=n)
+    except OSError:
+        return []
+    events = []
+    for line in lines:
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            continue  # torn write at the end of the file
+    return events
+
+
+event_log = EventLog()
+record = event_log.record
@@ -0,0 +1,93 @@
+# monitor/hotplug.py
+
+import os
+import re
+import socket
+import struct
+
+NETLINK_KOBJECT_UEVENT = 15
+KERNEL_GROUP = 1  # raw kernel uevents
+UDEV_GROUP = 2    # re-broadcast by udevd once its rules (permissions, links) have run
+UDEV_MAGIC = 0xfeedcafe
+
+# How long to wait for the rest of a burst (a DualSense adds several nodes at once)
+HOTPLUG_SETTLE = 0.05  # seconds
+
+_EVENT_NODE = re.compile(r"^(?:/dev/)?input/event\d+$")
+
+
+def parse_uevent(data):
+    """Parse a kernel or libudev netlink datagram into a dict of properties."""
+    if data.startswith(b"libudev\0"):
+        if struct.unpack_from("!I", data, 8)[0] != UDEV_MAGIC:
+            return {}
+        # Everything after the (big-endian) magic is in host byte order
+        _header_size, props_off, props_len = struct.unpack_from("=3I", data, 12)
+        payload = data[props_off:props_off + props_len]
+    else:
+        # "ACTION@DEVPATH\0KEY=VALUE\0..."
+        payload = data.split(b"\0", 1)[1] if b"\0" in data else b""
+
+    props = {}
+    for item in payload.split(b"\0"):
+        key, sep, value = item.partition(b"=")
+        if sep:
+            props[key.decode(errors="replace")] = value.decode(errors="replace")
+    return props
+
+
+class HotplugMonitor:
+    """Non-blocking NETLINK_KOBJECT_UEVENT listener for /dev/input/event* nodes.
+
+    Nothing here wakes up on a timer: callers wait on fileno() with select or
+    loop.add_reader and call read_events() when it becomes readable.
+    """
+
+    def __init__(self):
+        # Prefer udev's post-processed events so the node is ready to open;
+        # without a running udevd only the kernel group carries anything.
+        self.group = UDEV_GROUP if os.path.exists("/run/udev/control") else KERNEL_GROUP
+        self.sock = socket.socket(
+            socket.AF_NETLINK,
+            socket.SOCK_RAW | socket.SOCK_NONBLOCK | socket.SOCK_CLOEXEC,
+            NETLINK_KOBJECT_UEVENT,
+        )
+        try:
+            self.sock.bind((0, self.group))
+        except OSError:
+            self.sock.close()
+            raise
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def read_events(self):
+        """Drain pending uevents; returns [(action, "/dev/input/eventN"), ...]."""
+        events = []
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            props = parse_uevent(data)
+            if props.get("SUBSYSTEM") != "input":
+                continue
+            devname = props.get("DEVNAME", "")
+            if not _EVENT_NODE.match(devname):
+                continue
+            if not devname.startswith("/dev/"):
+                devname = "/dev/" + devname
+            events.append((props.get("ACTION", ""), devname))
+        return events
+
+    def close(self):
+        self.sock.close()
+
+
+def open_hotplug():
+    """HotplugMonitor, or None if netlink isn't usable (callers then poll)."""
+    try:
+        return HotplugMonitor()
+    except OSError as e:
+        print(f"⚠️ Hotplug monitor unavailable ({e}), falling back to polling")
+        return None
@@ -1,64 +1,127 @@
 import os
-import subprocess
 import threading
-import time
-from evdev import InputDevice, list_devices, ecodes
+from collections import namedtuple
+from .config import NODE_ROLES
 
-IDLE_TIMEOUT = 10  # seconds
-RESCAN_INTERVAL = 2  # seconds
-STICK_DRIFT_THRESHOLD = 10  # analog drift filter
+SYSFS_INPUT = "/sys/class/input"
+SONY_VENDOR_ID = 0x054c
+DUALSENSE_PRODUCT_IDS = {0x0ce6, 0x0df2}  # DualSense, DualSense Edge
 
-controller_threads = {}
-lock = threading.Lock()
+# input device property bits (INPUT_PROP_* in linux/input-event-codes.h)
+INPUT_PROP_POINTER = 0x00
+INPUT_PROP_BUTTONPAD = 0x02
+INPUT_PROP_ACCELEROMETER = 0x06
 
-# Bluetooth MAC cache
-_last_bt_query = 0
-_bt_cache_ttl = 10  # seconds
-_bt_device_cache = {}
+InputNode = namedtuple("InputNode", "path name mac phys vendor product role")
+Controller = namedtuple("Controller", "path name mac nodes")
 
-def get_dualsense_macs():
-    """Return a dictionary of MAC -> device name for DualSense devices, with caching."""
-    global _last_bt_query, _bt_device_cache
-    now = time.time()
-    if now - _last_bt_query < _bt_cache_ttl:
-        return _bt_device_cache
-
-    try:
-        output = subprocess.run(["bluetoothctl", "devices"], capture_output=True, text=True, check=True).stdout
-        _bt_device_cache = {
-            line.split()[1]: " ".join(line.split()[2:])
-            for line in output.splitlines()
-            if "DualSense" in line or "Wireless Controller" in line
-        }
-        _last_bt_query = now
-    except subprocess.CalledProcessError as e:
-        print(f"⚠️ Failed to query bluetoothctl: {e}")
-        # fallback: keep last cache
-    return _bt_device_cache
-
-def get_mac_for_device(dev_path):
+def _read_sysfs(path):
     try:
-        event_name = os.path.basename(dev_path)
-        uniq_path = f"/sys/class/input/{event_name}/device/uniq"
-        if os.path.exists(uniq_path):
-            with open(uniq_path) as f:
-                mac = f.read().strip()
-                return mac if mac else None
-    except Exception:
-        pass
-    return None
-
-def find_dualsense_event_devices():
-    devices = []
-    for path in list_devices():
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+class DeviceIndex:
+    """Incremental map of input event nodes to their sysfs identity.
+
+    Only nodes that appeared since the last refresh (or were invalidated by
+    a hotplug event) are read, and non-Sony nodes cost two tiny reads of
+    id/vendor and id/product. Nothing is ever opened under /dev/input.
+    """
+
+    def __init__(self, sysfs_root=SYSFS_INPUT):
+        self.sysfs_root = sysfs_root
+        self.nodes = {}  # "event5" -> InputNode, or None if not a DualSense
+        self._lock = threading.Lock()
+
+    def _read_node(self, node):
+        base = os.path.join(self.sysfs_root, node, "device")
+        try:
+            vendor = int(_read_sysfs(os.path.join(base, "id", "vendor")), 16)
+            product = int(_read_sysfs(os.path.join(base, "id", "product")), 16)
+        except ValueError:
+            return None
+        if vendor != SONY_VENDOR_ID or product not in DUALSENSE_PRODUCT_IDS:
+            return None
+
         try:
-            dev = InputDevice(path)
-            if "dualsense" in dev.name.lower() or "wireless controller" in dev.name.lower():
-                mac = get_mac_for_device(path)
-                devices.append((path, dev.name, mac))
-        except Exception:
+            props = int(_read_sysfs(os.path.join(base, "properties")) or "0", 16)
+        except ValueError:
+            props = 0
+        if props & (1 << INPUT_PROP_ACCELEROMETER):
+            role = "motion"
+        elif props & ((1 << INPUT_PROP_POINTER) | (1 << INPUT_PROP_BUTTONPAD)):
+            role = "touchpad"
+        else:
+            role = "gamepad"
+
+        return InputNode(
+            path=os.path.join("/dev/input", node),
+            name=_read_sysfs(os.path.join(base, "name")),
+            mac=_read_sysfs(os.path.join(base, "uniq")) or None,
+            phys=_read_sysfs(os.path.join(base, "phys")),
+            vendor=vendor,
+            product=product,
+            role=role,
+        )
+
+    def invalidate(self, dev_path):
+        """Forget a node so the next refresh re-reads it (node numbers get reused)."""
+        with self._lock:
+            self.nodes.pop(os.path.basename(dev_path), None)
+
+    def refresh(self):
+        try:
+            present = {n for n in os.listdir(self.sysfs_root) if n.startswith("event")}
+        except OSError:
+            present = set()
+
+        with self._lock:
+            for node in self.nodes.keys() - present:
+                del self.nodes[node]
+            for node in present - self.nodes.keys():
+                self.nodes[node] = self._read_node(node)
+            return [info for info in self.nodes.values() if info is not None]
+
+_index = DeviceIndex()
+
+def _group_key(info):
+    if info.mac:
+        return normalize_mac(info.mac)
+    # No uniq (some USB setups): the HID phys is shared by all of a pad's nodes
+    return info.phys.rsplit("/", 1)[0]
+
+def find_dualsense_controllers(changed=(), roles=("gamepad", "touchpad")):
+    """Group DualSense event nodes into one Controller per physical pad.
+
+    Only nodes whose role is in `roles` are returned, so e.g. the motion
+    sensor node is never opened unless asked for. A Controller's path is its
+    first selected node (the gamepad node by default). If the gamepad node
+    is indexed after the touchpad, the same pad comes back under a new path;
+    the engines match it to the one they watch by MAC (monitor.match_controllers).
+    """
+    for _action, dev_path in changed:
+        _index.invalidate(dev_path)
+
+    groups = {}
+    for info in _index.refresh():
+        groups.setdefault(_group_key(info), []).append(info)
+
+    controllers = []
+    for infos in groups.values():
+        infos.sort(key=lambda info: (NODE_ROLES.index(info.role), info.path))
+        nodes = tuple(info for info in infos if info.role in roles)
+        if not nodes:
             continue
-    return devices
+        # infos[0] is the gamepad node when there is one: it has the plain name
+        controllers.append(Controller(
+            path=nodes[0].path,
+            name=infos[0].name,
+            mac=infos[0].mac,
+            nodes=nodes,
+        ))
+    return sorted(controllers)
 
 def normalize_mac(mac):
     return mac.strip().lower().replace("-", ":")
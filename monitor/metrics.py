@@ -0,0 +1,125 @@
+# monitor/metrics.py
+#
+# Counters and latency histograms for what the daemon spends its time on.
+# The input hot path doesn't touch this module: each ControllerState keeps
+# plain int counters and a collector reads them when metrics are requested.
+
+import os
+import time
+import json
+import threading
+from contextlib import contextmanager
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TEXTFILE_INTERVAL = 15  # seconds between Prometheus textfile writes
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_collectors = []
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def inc(name, n=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[i] += 1
+                break
+        else:
+            hist[len(BUCKETS)] += 1
+        hist[-1] += seconds
+
+@contextmanager
+def timed(name, **labels):
+    """Observe how long the block takes, also when it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def add_collector(fn):
+    """fn() -> iterable of (name, labels dict, value), read at snapshot time."""
+    _collectors.append(fn)
+
+def snapshot():
+    """Everything as plain JSON-able data."""
+    with _lock:
+        counters = [{"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in _counters.items()]
+        histograms = []
+        for (name, labels), hist in _histograms.items():
+            cumulative, buckets = 0, []
+            for bound, count in zip(BUCKETS + (float("inf"),), hist):
+                cumulative += count
+                buckets.append(["+Inf" if bound == float("inf") else bound, cumulative])
+            histograms.append({"name": name, "labels": dict(labels), "buckets": buckets,
+                               "count": cumulative, "sum": hist[-1]})
+    for fn in _collectors:
+        try:
+            for name, labels, value in fn():
+                counters.append({"name": name, "labels": labels, "value": value})
+        except Exception as e:
+            print(f"⚠️ Metrics collector failed: {e}")
+    return {"counters": counters, "histograms": histograms}
+
+def _labels(labels, extra=None):
+    items = dict(labels, **extra) if extra else labels
+    if not items:
+        return ""
+    inner = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for k, v in items.items())
+    return "{" + inner + "}"
+
+def render_prometheus(data=None):
+    """Prometheus text exposition format for a snapshot() result."""
+    data = snapshot() if data is None else data
+    lines = []
+    typed = set()
+    for c in sorted(data["counters"], key=lambda c: c["name"]):
+        if c["name"] not in typed:
+            typed.add(c["name"])
+            lines.append(f"# TYPE {c['name']} counter")
+        lines.append(f"{c['name']}{_labels(c['labels'])} {c['value']}")
+    for h in sorted(data["histograms"], key=lambda h: h["name"]):
+        if h["name"] not in typed:
+            typed.add(h["name"])
+            lines.append(f"# TYPE {h['name']} histogram")
+        for bound, count in h["buckets"]:
+            lines.append(f"{h['name']}_bucket{_labels(h['labels'], {'le': bound})} {count}")
+        lines.append(f"{h['name']}_sum{_labels(h['labels'])} {h['sum']:.6f}")
+        lines.append(f"{h['name']}_count{_labels(h['labels'])} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+def snapshot_json():
+    return json.dumps(snapshot())
+
+def start_textfile_exporter(path):
+    """Rewrite `path` every TEXTFILE_INTERVAL seconds (for node_exporter's
+    textfile collector). Written to a temp file and renamed, so the
+    collector never reads a partial file."""
+    def run():
+        while True:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                tmp = f"{path}.tmp"
+                with open(tmp, "w") as f:
+                    f.write(render_prometheus())
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"⚠️ Could not write metrics to {path}: {e}")
+            time.sleep(TEXTFILE_INTERVAL)
+
+    threading.Thread(target=run, name="metrics-textfile", daemon=True).start()
@@ -1,184 +1,551 @@
 import os
 import time
-import subprocess
+import select
 import threading
-from evdev import InputDevice, list_devices, ecodes
-from .notif import log
-from .macs import get_dualsense_macs, get_mac_for_device, find_dualsense_event_devices
-from .config import load_config
+from concurrent.futures import ThreadPoolExecutor
+from evdev import InputDevice
+from .notif import log, set_coalescer, send_dbus_notification
+from .macs import find_dualsense_controllers, normalize_mac
+from .hotplug import open_hotplug, HOTPLUG_SETTLE
+from .config import get_config, add_reload_listener, watch_config, save_setting, reload_config, MIN_IDLE_TIMEOUT
 from monitor.dbus_api import run_dbus_loop
-from .battery import get_battery_level, is_charging
-
-_config = load_config()
-RESCAN_INTERVAL = int(_config["monitor"]["rescan_interval"])
-STICK_DRIFT_THRESHOLD = int(_config["monitor"]["stick_drift_threshold"])
-
-controller_threads = {}
-lock = threading.Lock()
-last_input_times = {}
-last_charging_log = {}
-
-# Battery info cache to avoid repeated D-Bus calls
-_battery_cache = {}
-
-def get_idle_timeout():
-    return int(load_config()["monitor"]["idle_timeout"])
-
-def get_cached_battery_info(mac, ttl=10):
-    now = time.time()
-    entry = _battery_cache.get(mac)
-    if entry and now - entry['time'] < ttl:
-        return entry['battery'], entry['charging']
-
-    battery = get_battery_level(mac)
-    charging = is_charging(mac)
-    _battery_cache[mac] = {"time": now, "battery": battery, "charging": charging}
+from .battery import get_battery_info, upower_client, start_upower_client
+from .bluez import disconnect_device, trust_device, start_bluez_client
+from .socket_server import start_socket_server
+from .controller import (
+    ControllerState, set_monotonic_clock, read_pending, flush_pending, abs_axes, sample_device,
+)
+from .deadlines import DeadlineScheduler
+from . import status
+from .events import record
+from .registry import registry
+from . import metrics
+from . import checkpoint
+from . import activation
+from .aioloop import get_loop
+
+# How long to wait before re-checking an idle controller that is charging
+CHARGING_RECHECK = 10  # seconds
+# How long to wait before retrying an idle disconnect that failed
+DISCONNECT_RETRY = 30  # seconds
+# Oldest battery reading an idle disconnect may be based on
+DECISION_MAX_AGE = 10  # seconds
+# Bluetooth disconnects a bulk operation runs at once
+BULK_WORKERS = 16
+
+def get_idle_timeout(state=None):
+    """The controller's own timeout if one was set, else the configured one."""
+    if state is not None and state.idle_timeout is not None:
+        return state.idle_timeout
+    return get_config().idle_timeout
+
+# Idle deadlines for the threaded engine, serviced by a single sleeper thread
+scheduler = DeadlineScheduler(get_idle_timeout)
+_timeout_listeners = [scheduler.refresh]
+
+def add_timeout_listener(fn):
+    """fn() after a controller's own idle timeout changed."""
+    _timeout_listeners.append(fn)
+
+def _apply_config(old, new):
+    if new.stick_drift_threshold != old.stick_drift_threshold:
+        for entry in registry.entries():
+            entry.state.drift_threshold = new.stick_drift_threshold
+    if new.idle_timeout != old.idle_timeout:
+        log(f"⏱️ Idle timeout is now {new.idle_timeout}s")
+        scheduler.refresh()
+        publish_status()
+
+add_reload_listener(_apply_config)
+
+def get_cached_battery_info(mac, max_age=None):
+    """(battery, charging) for a controller.
+
+    With the UPower client this is a cache read. Otherwise UPower is only
+    queried when the controller's battery model says a reading is due, or
+    the last one is `max_age` seconds old or more.
+    """
+    entry = registry.by_mac(mac)
+    if upower_client.ready.is_set():
+        battery, charging = upower_client.lookup(mac)
+        if entry:
+            entry.battery.observe(battery, charging, time.monotonic(), exact=True)
+        return battery, charging
+
+    if entry and not entry.battery.due(time.monotonic(), max_age):
+        return entry.battery.reading()
+    battery, charging = get_battery_info(mac)
+    if entry:
+        entry.battery.observe(battery, charging, time.monotonic())
     return battery, charging
 
-def monitor_controller(dev_path, name, mac, stop_event):
-    try:
-        dev = InputDevice(dev_path)
-        log(f"🔹 Monitoring {name} ({mac}) at {dev_path}")
-    except Exception as e:
-        log(f"❌ Could not open {dev_path}: {e}")
+def peek_battery_info(mac):
+    """Battery info from whatever is cached already; never queries UPower."""
+    if not mac:
+        return "Unknown", False
+    if upower_client.ready.is_set():
+        return upower_client.lookup(mac)
+    entry = registry.by_mac(mac)
+    return entry.battery.reading() if entry else ("Unknown", False)
+
+def publish_status():
+    """Rebuild the status snapshot served over D-Bus.
+
+    Called whenever a controller comes or goes or its battery changes.
+    """
+    status.publish(lambda: [
+        status.ControllerStatus(entry.path, entry.player, entry.name, entry.mac, *peek_battery_info(entry.mac),
+                                get_idle_timeout(entry.state), entry.state, entry.battery)
+        for entry in registry.entries()
+    ])
+
+def _on_battery_change(mac):
+    # Pushed by UPower; mac is None after a full resync
+    now = time.monotonic()
+    entries = registry.entries() if mac is None else [registry.by_mac(mac)]
+    for entry in entries:
+        if entry is not None and entry.mac:
+            entry.battery.observe(*upower_client.lookup(entry.mac), now, exact=True)
+    publish_status()
+
+upower_client.add_listener(_on_battery_change)
+
+def _input_metrics():
+    for entry in registry.entries():
+        labels = {"mac": entry.mac or "", "player": entry.player}
+        stats = entry.state.stats
+        yield "dualsense_input_events_total", labels, stats["events"]
+        yield "dualsense_input_frames_total", labels, stats["frames"]
+        yield "dualsense_input_samples_total", labels, stats["samples"]
+        for reason in ("key", "hat", "axis"):
+            yield "dualsense_input_accepted_total", dict(labels, reason=reason), stats[reason]
+        yield "dualsense_input_drift_filtered_total", labels, stats["drift_filtered"]
+
+metrics.add_collector(_input_metrics)
+
+def record_event(event, state, reason=None, **extra):
+    """Add a controller event to the audit log (see monitor/events.py)."""
+    entry = registry.get(state.path)
+    return record(event, mac=state.mac, player=entry.player if entry else None, reason=reason,
+                  battery=peek_battery_info(state.mac)[0], name=state.name, **extra)
+
+def handle_idle(state):
+    """Charging check and disconnect for a controller past its idle timeout.
+
+    Returns True once the controller has been disconnected. A failed
+    disconnect returns False with a hold, so the caller's reschedule
+    retries it after DISCONNECT_RETRY.
+    """
+    if not state.mac:
+        log(f"⚠️ {state.name} idle but no MAC found — can't disconnect")
+        record_event("idle_skipped", state, reason="no MAC")
+        state.hold_until = time.monotonic() + get_idle_timeout(state)
+        return False
+
+    # Both outcomes act on the reading (disconnect, or hold while charging
+    # and notice the unplug that restarts the countdown): never a stale one
+    battery, charging = get_cached_battery_info(state.mac, max_age=DECISION_MAX_AGE)
+    if state.charging is not None and charging != state.charging:
+        if charging:
+            log(f"⚡ {state.name} is now charging — skipping idle disconnect")
+            record_event("charging", state)
+        else:
+            log(f"🔋 {state.name} is no longer charging — resetting idle timer")
+            record_event("charging_stopped", state, reason="idle timer reset")
+            state.charging = charging
+            state.touch()
+            return False
+
+    state.charging = charging
+
+    if charging and get_config().ignore_idle_when_charging:
+        state.hold_until = time.monotonic() + CHARGING_RECHECK
+        return False
+
+    log(f"⚠️ {state.name} is idle, disconnecting {state.mac}")
+    ok, error = disconnect_device(state.mac)
+
+    idle = round(state.idle_for())
+    if not ok:
+        # Still connected: keep watching it and try again. Toast only the
+        # first failure of an idle stretch, not every retry.
+        first = state.failed_idle_at != state.last_input
+        state.failed_idle_at = state.last_input
+        log(f"⚠️ Failed to disconnect {state.name} ({state.mac}) ({error}), retrying in {DISCONNECT_RETRY}s",
+            notify=first, summary="Disconnect Failed")
+        record_event("disconnect_failed", state, reason="idle", error=error, idle_seconds=idle)
+        state.hold_until = time.monotonic() + DISCONNECT_RETRY
+        return False
+
+    log(f"🔌 Disconnected {state.name} ({state.mac})", notify=True, summary="Disconnected")
+    record_event("disconnected", state, reason="idle", idle_seconds=idle)
+    state.disconnected = True
+    return True
+
+def monitor_controller(state, stop_event, open_device=InputDevice, nodes=None, attach=False):
+    # One thread watches every activity node of the controller (gamepad,
+    # touchpad, ...); `nodes` defaults to just the controller's main node.
+    # With `attach` these are nodes that showed up after the controller was
+    # already being monitored: they join its entry instead of owning it.
+    devices = {}
+    for path in nodes or [state.path]:
+        try:
+            dev = open_device(path)
+        except Exception as e:
+            log(f"❌ Could not open {path}: {e}")
+            continue
+        devices[dev.fd] = (dev, path)
+    if not devices:
+        if attach:
+            _detach_nodes(state, nodes)
+        elif registry.remove(state.path, state) is not None:
+            scheduler.remove(state.path)
+            publish_status()
         return
-
-    last_input = time.time()
-    abs_state = {}
-    disconnected = False
-
-    last_input_times[dev_path] = last_input
+    opened = ', '.join(p for _, p in devices.values())
+    if attach:
+        log(f"🔹 Also monitoring {state.name} at {opened}")
+    else:
+        log(f"🔹 Monitoring {state.name} ({state.mac}) at {opened}")
+    entry = registry.get(state.path)
+    if entry is not None and entry.state is state:
+        entry.devices = {**(entry.devices or {}), **{path: dev for dev, path in devices.values()}}
+
+    kernel_clock = all([set_monotonic_clock(dev) for dev, _ in devices.values()])
+    state.kernel_clock = kernel_clock and (not attach or state.kernel_clock)
 
     try:
-        for event in dev.read_loop():
-            if stop_event.is_set():
-                break
-
-            if event.type == ecodes.EV_ABS:
-                prev = abs_state.get(event.code, event.value)
-                delta = abs(event.value - prev)
-                abs_state[event.code] = event.value
-
-                if event.code in (ecodes.ABS_HAT0X, ecodes.ABS_HAT0Y) and event.value != 0:
-                    last_input = time.time()
-                    last_input_times[dev_path] = last_input
-                    disconnected = False
-
-                if delta > STICK_DRIFT_THRESHOLD:
-                    last_input = time.time()
-                    last_input_times[dev_path] = last_input
-                    disconnected = False
-
-            elif event.type == ecodes.EV_KEY:
-                last_input = time.time()
-                last_input_times[dev_path] = last_input
-                disconnected = False
-
-            if not disconnected and time.time() - last_input > get_idle_timeout():
-                if mac:
-                    battery, charging = get_cached_battery_info(mac)
-                    prev_charging = last_charging_log.get(dev_path)
-
-                    if prev_charging is not None and charging != prev_charging:
-                        if charging:
-                            log(f"⚡ {name} is now charging — skipping idle disconnect")
-                        else:
-                            log(f"🔋 {name} is no longer charging — resetting idle timer")
-                            last_input = time.time()
-                            last_input_times[dev_path] = last_input
-
-                    last_charging_log[dev_path] = charging
-
-                    if charging and _config["monitor"].getboolean("ignore_idle_when_charging"):
-                        continue
-
-                    log(f"⚠️ {name} is idle, disconnecting {mac}")
-                    result = subprocess.run(
-                        ["bluetoothctl", "disconnect", mac],
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL
-                    )
-
-                    if result.returncode == 0:
-                        log(f"🔌 Disconnected {name} ({mac})", notify=True, summary="Disconnected")
-                    else:
-                        log(f"⚠️ Failed to disconnect {name} ({mac}) (exit code {result.returncode})", notify=True, summary="Disconnect Failed")
-
-                    disconnected = True
-                    return
-                else:
-                    log(f"⚠️ {name} idle but no MAC found — can't disconnect")
+        if get_config().input_mode == "sampling":
+            sample_controller(state, stop_event, devices)
+        while not stop_event.is_set():
+            readable, _, _ = select.select(list(devices), [], [])
+            for fd in readable:
+                dev, path = devices[fd]
+                state.handle_events(read_pending(dev), path)
 
     except OSError:
-        if not disconnected:
-            log(f"🔌 Device {name} disconnected unexpectedly")
-
-    log(f"🚑 Finished monitoring {name}", notify=True, summary="Disconnected")
-
-def scan_loop():
+        if attach:
+            log(f"⚠️ Lost {opened} of {state.name}")
+        elif not state.disconnected:
+            log(f"🔌 Device {state.name} disconnected unexpectedly")
+            record_event("lost", state, reason="input device went away")
+    finally:
+        if attach:
+            # The entry belongs to the controller's own thread; just give the
+            # nodes back so a later rescan can attach them again
+            _detach_nodes(state, nodes)
+        else:
+            # With hotplug discovery there may be no rescan for a long time, so
+            # drop our own entry instead of waiting for scan_loop to prune it.
+            if registry.remove(state.path, state) is not None:
+                scheduler.remove(state.path)
+            publish_status()
+        for dev, _ in devices.values():
+            try:
+                dev.close()
+            except OSError:
+                pass
+
+    if not state.disconnected and not attach:
+        log(f"🚑 Finished monitoring {state.name}", notify=True, summary="Disconnected")
+
+def _detach_nodes(state, nodes):
+    entry = registry.get(state.path)
+    if entry is None or entry.state is not state:
+        return
+    entry.nodes = [node for node in entry.nodes if node not in nodes]
+    if entry.devices:
+        entry.devices = {node: dev for node, dev in entry.devices.items() if node not in nodes}
+
+def sample_controller(state, stop_event, devices):
+    # Wake once per sample_interval, compare button/axis state with the last
+    # snapshot and drop the queued events unread. Raises OSError once the
+    # controller is gone, like the event loop does.
+    axes = {fd: abs_axes(dev) for fd, (dev, _) in devices.items()}
+    while not stop_event.wait(get_config().sample_interval):
+        for fd, (dev, path) in devices.items():
+            flush_pending(dev)
+            keys, values = sample_device(dev, axes[fd])
+            state.handle_sample(keys, values, path)
+
+def _expire(path, state):
+    # Called from the scheduler thread; the disconnect itself blocks, so it
+    # gets its own short-lived thread and the sleeper goes straight back to sleep.
+    def run():
+        if handle_idle(state):
+            scheduler.remove(path)
+            entry = registry.get(path)
+            if entry:
+                entry.stop.set()
+        else:
+            scheduler.reschedule(path)
+        publish_status()
+
+    threading.Thread(target=run, daemon=True).start()
+
+def announce_controller(name, mac, player_number):
+    entry = registry.by_player(player_number)
+    if entry is not None and entry.restored:
+        # Carried over from before a restart: already trusted and announced
+        log(f"♻️ Player {player_number}: Resumed {name} ({mac}), idle for {entry.state.idle_for():.0f}s")
+        record("resumed", mac=mac, player=player_number, battery=peek_battery_info(mac)[0], name=name)
+        publish_status()
+        return
+    if mac:
+        trust_device(mac)
+    battery, _ = get_cached_battery_info(mac) if mac else ("Unknown", False)
+    log(f"✅ Player {player_number}: Monitoring {name} ({mac}) — Battery: {battery}",
+        notify=True, summary="Controller Connected", details={"battery": battery})
+    record("connected", mac=mac, player=player_number, battery=battery, name=name)
+    publish_status()  # battery is cached now
+
+def _connected_toast(items):
+    # "3 controllers connected, batteries 80/55/20%"
+    batteries = (str((details or {}).get("battery", "")) for _, details in items)
+    levels = [b.rstrip("%") if b.endswith("%") else "?" for b in batteries]
+    summary = f"{len(items)} controllers connected, batteries {'/'.join(levels)}%"
+    return summary, "\n".join(body for body, _ in items)
+
+set_coalescer("Controller Connected", _connected_toast)
+
+def wait_for_hotplug(hotplug):
+    """Block until input event nodes are added or removed; returns the uevents."""
+    while True:
+        select.select([hotplug], [], [])
+        events = hotplug.read_events()
+        if events:
+            # Let the rest of the burst arrive, then rescan once
+            time.sleep(HOTPLUG_SETTLE)
+            return events + hotplug.read_events()
+
+def rescan(changed=(), open_device=InputDevice):
+    with metrics.timed("dualsense_scan_seconds", engine="threaded"):
+        _rescan(changed, open_device)
+
+def _rescan(changed, open_device):
+    new, late = match_controllers(find_dualsense_controllers(changed, get_config().activity_nodes))
+    for entry, node_paths in late:
+        attach_nodes(entry, node_paths, open_device)
+    started = []
+    for path, name, mac, node_paths in new:
+        entry = start_controller(path, name, mac, node_paths, open_device)
+        if entry is not None:
+            started.append((name, mac, entry.player))
+
+    # Threads normally remove themselves; this catches one that died early
+    for entry in registry.entries():
+        if entry.thread is not None and not entry.thread.is_alive():
+            if registry.remove(entry.path, entry.state) is not None:
+                scheduler.remove(entry.path)
+
+    publish_status()
+    for name, mac, player_number in started:
+        announce_controller(name, mac, player_number)
+
+def register_controller(path, name, mac, node_paths, state):
+    """registry.add(), picking up the timers and player number a controller
+    had before a restart (see monitor/checkpoint.py)."""
+    saved = checkpoint.claim(path, mac)
+    entry = registry.add(path, name, mac, node_paths, state, player=saved["player"] if saved else None)
+    if entry is not None and saved:
+        checkpoint.restore(entry, saved)
+    return entry
+
+def start_controller(path, name, mac, node_paths, open_device=InputDevice):
+    """Register a controller and start its monitor thread; returns the
+    registry entry, or None if it is already being monitored."""
+    state = ControllerState(path, name, mac, get_config().stick_drift_threshold)
+    entry = register_controller(path, name, mac, node_paths, state)
+    if entry is None:
+        return None
+    entry.thread = threading.Thread(target=monitor_controller, args=(state, entry.stop, open_device, node_paths), daemon=True)
+    scheduler.add(path, state)
+    entry.thread.start()
+    return entry
+
+def known_entry(path, mac):
+    """The entry a scanned controller belongs to, if it is already monitored.
+
+    A controller is found under the path of its first node, so if the
+    touchpad got indexed before the gamepad the same pad turns up again
+    under a new path once the gamepad appears; its MAC gives it away.
+    """
+    return registry.get(path) or registry.by_mac(mac)
+
+def match_controllers(controllers):
+    """Split a scan into controllers to start, as (path, name, mac, node
+    paths), and late nodes of ones already watched, as (entry, node paths)."""
+    new, late = [], []
+    for path, name, mac, nodes in controllers:
+        node_paths = [node.path for node in nodes]
+        entry = known_entry(path, mac)
+        if entry is None:
+            new.append((path, name, mac, node_paths))
+        else:
+            extra = [node for node in node_paths if node not in entry.nodes]
+            if extra:
+                late.append((entry, extra))
+    return new, late
+
+def attach_nodes(entry, node_paths, open_device=InputDevice):
+    """Watch nodes of an already monitored controller that showed up late,
+    on a thread of their own that feeds the same state."""
+    if not node_paths or entry.stop.is_set():
+        return
+    entry.nodes = entry.nodes + node_paths
+    threading.Thread(target=monitor_controller, args=(entry.state, entry.stop, open_device, node_paths, True),
+                     daemon=True).start()
+
+def start_metrics_export():
+    path = get_config().metrics_textfile
+    if path:
+        metrics.start_textfile_exporter(os.path.expanduser(path))
+
+def start_services(open_device=InputDevice):
+    """Start what both engines share: checkpoint takeover, the config
+    watcher, metrics, the UPower and BlueZ clients, the socket and D-Bus.
+    Returns the open_device to use from now on."""
+    open_device = checkpoint.resume(open_device)  # before D-Bus and the socket
+    watch_config()
+    start_metrics_export()
+    start_upower_client()
+    start_bluez_client()
+    start_socket_server()
     threading.Thread(target=run_dbus_loop, args=(collect_status,), daemon=True).start()
+    return open_device
+
+def scan_loop(open_device=InputDevice):
+    open_device = start_services(open_device)
+    sleeper = threading.Thread(target=scheduler.run, args=(_expire,), daemon=True)
+    sleeper.start()
+
+    hotplug = open_hotplug() if get_config().discovery == "hotplug" else None
+    rescan((), open_device)
+    checkpoint.finish()  # controllers the first scan didn't find are gone
+    # The main thread may sit in select() for days, so health is the idle
+    # sleeper plus the loop the D-Bus clients and the socket run on
+    activation.ready(lambda timeout: sleeper.is_alive() and activation.loop_responds(get_loop(), timeout))
     while True:
-        macs = get_dualsense_macs()
-        devices = find_dualsense_event_devices()
-
-        with lock:
-            for path, name, mac in devices:
-                if path not in controller_threads:
-                    existing_players = {info["player"] for info in controller_threads.values()}
-                    player_number = 1
-                    while player_number in existing_players:
-                        player_number += 1
-
-                    stop_event = threading.Event()
-                    t = threading.Thread(target=monitor_controller, args=(path, name, mac, stop_event), daemon=True)
-                    controller_threads[path] = {
-                        "thread": t,
-                        "stop": stop_event,
-                        "mac": mac,
-                        "name": name,
-                        "player": player_number
-                    }
-                    t.start()
-                    if mac:
-                        subprocess.run(["bluetoothctl", "trust", mac], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    battery, _ = get_cached_battery_info(mac) if mac else ("Unknown", False)
-                    log(f"✅ Player {player_number}: Monitoring {name} ({mac}) — Battery: {battery}", notify=True, summary="Controller Connected")
-
-            to_remove = []
-            for path, info in controller_threads.items():
-                if not info["thread"].is_alive():
-                    to_remove.append(path)
-
-            for path in to_remove:
-                del controller_threads[path]
-
-            for i, (path, info) in enumerate(sorted(controller_threads.items()), start=1):
-                info["player"] = i
-
-        time.sleep(RESCAN_INTERVAL)
+        if hotplug is not None:
+            changed = wait_for_hotplug(hotplug)
+        else:
+            changed = []
+            time.sleep(get_config().rescan_interval)
+        rescan(changed, open_device)
 
 def collect_status():
-    now = time.time()
-    status = {}
-    timeout = get_idle_timeout()
-    for path, info in controller_threads.items():
-        mac = info.get("mac", "unknown")
-        name = info.get("name", "Unknown Controller")
-        battery, charging = get_cached_battery_info(mac) if mac else ("Unknown", False)
-        last = last_input_times.get(path, now)
-        idle = max(0, timeout - (now - last))
-        idle = min(timeout, idle)  # Clamp to valid range
-        status[path] = {
-            "mac": mac,
-            "name": name,
-            "player": info.get("player", "?"),
-            "battery": battery,
-            "charging": charging,
-            "idle_remaining": round(idle, 1)
-        }
-    return status
+    # Served from the published snapshot: no lock, no battery queries
+    return status.status_dict()
+
+# Commands shared by the D-Bus and socket APIs. Each returns the message
+# shown to the caller.
+
+def send_status_toast():
+    lines = []
+    for info in collect_status().values():
+        if info["charging"]:
+            state = "⚡ Charging"
+        else:
+            state = f"Idle in {info['idle_remaining']:.0f}s"
+        lines.append(f"{info['name'] or 'Controller'} ({info['mac'] or '??'}) — {info['battery']} — {state}")
+    send_dbus_notification("🎮 DualSense Status", "\n".join(lines))  # queued, returns at once
+    return "ok"
+
+def set_idle_timeout(seconds):
+    if not isinstance(seconds, int) or isinstance(seconds, bool) or seconds < MIN_IDLE_TIMEOUT:
+        return "Invalid timeout value"
+    # Swap the snapshot right away rather than waiting for the watcher
+    save_setting("monitor", "idle_timeout", seconds)
+    reload_config()
+    log(f"⏱️ Idle timeout updated to {seconds}s", notify=True, summary="Idle Timeout Changed")
+    return f"Idle timeout set to {seconds}s"
+
+def set_controller_timeout(index, seconds):
+    """Idle timeout for one controller until it disconnects; 0 goes back
+    to the configured one."""
+    entry = registry.by_player(index)
+    if entry is None:
+        return f"No controller found at index {index}"
+    if not isinstance(seconds, int) or isinstance(seconds, bool) or (seconds and seconds < MIN_IDLE_TIMEOUT):
+        return "Invalid timeout value"
+    name = entry.name or "Unknown"
+    entry.state.idle_timeout = seconds or None
+    for fn in _timeout_listeners:
+        fn()
+    publish_status()
+    if not seconds:
+        log(f"⏱️ Player {index} ({name}) uses the configured idle timeout again")
+        return f"Player {index} uses the configured idle timeout ({get_idle_timeout()}s)"
+    log(f"⏱️ Idle timeout for Player {index} ({name}) set to {seconds}s")
+    return f"Idle timeout for Player {index} set to {seconds}s"
+
+def _disconnect_entry(entry, reason, notify=True):
+    """Disconnect one registered controller and record it; returns the
+    result as {"player", "mac", "name", "ok", "error"}. Blocks for the
+    BlueZ call (at most its timeout)."""
+    name = entry.name or "Unknown"
+    result = {"player": entry.player, "mac": entry.mac, "name": name, "ok": False, "error": None}
+    if not entry.mac:
+        result["error"] = "no MAC"
+        return result
+
+    ok, error = disconnect_device(entry.mac)
+    if ok:
+        entry.state.disconnected = True  # not "lost" when its device goes away
+        record_event("disconnected", entry.state, reason=reason)
+        log(f"🔌 Disconnected {name} (Player {entry.player})", notify=notify, summary="Disconnected")
+    else:
+        record_event("disconnect_failed", entry.state, reason=reason, error=error)
+    result.update(ok=ok, error=error)
+    return result
+
+def disconnect_player(index):
+    """Disconnect the controller with this player number. Blocks for the
+    BlueZ call, so don't run it on an event loop."""
+    entry = registry.by_player(index)
+    if entry is None:
+        return f"No controller found at index {index}"
+    result = _disconnect_entry(entry, "manual")
+    if result["ok"]:
+        return f"Disconnected {result['name']} (Player {index})"
+    if result["error"] == "no MAC":
+        return f"{result['name']} has no MAC — cannot disconnect"
+    return f"Failed to disconnect Player {index}: {result['error']}"
+
+def disconnect_many(entries, reason):
+    """Disconnect a snapshot of registry entries concurrently; returns one
+    result per entry, in player order. The whole batch takes about as
+    long as the slowest disconnect, not the sum."""
+    entries = sorted(entries, key=lambda entry: entry.player)
+    if not entries:
+        return []
+    with ThreadPoolExecutor(min(BULK_WORKERS, len(entries))) as pool:
+        results = list(pool.map(lambda entry: _disconnect_entry(entry, reason, notify=False), entries))
+    done = sum(result["ok"] for result in results)
+    failed = len(results) - done
+    log(f"🔌 Disconnected {done} of {len(results)} controller(s)" + (f", {failed} failed" if failed else ""),
+        notify=True, summary="Disconnected")
+    return results
+
+def disconnect_all():
+    return disconnect_many(registry.entries(), "manual (all)")
+
+def disconnect_idle(min_idle):
+    """Every controller without input for at least `min_idle` seconds."""
+    if isinstance(min_idle, bool) or not isinstance(min_idle, (int, float)) or min_idle < 0:
+        raise ValueError("min_idle must be a number of seconds")
+    return disconnect_many([entry for entry in registry.entries() if entry.state.idle_for() >= min_idle],
+                           f"manual (idle {min_idle:g}s)")
+
+def disconnect_macs(macs):
+    """The controllers with these MACs; unknown ones come back as failed."""
+    wanted = [normalize_mac(mac) for mac in macs]
+    by_mac = {normalize_mac(entry.mac): entry for entry in registry.entries() if entry.mac}
+    results = disconnect_many([by_mac[mac] for mac in dict.fromkeys(wanted) if mac in by_mac], "manual")
+    results += [{"player": None, "mac": mac, "name": None, "ok": False, "error": "not connected"}
+                for mac in dict.fromkeys(wanted) if mac not in by_mac]
+    return results
 
 def shutdown_all_threads():
-    with lock:
-        for info in controller_threads.values():
-            info["stop"].set()
+    for entry in registry.entries():
+        entry.stop.set()
@@ -1,35 +1,118 @@
-import dbus
-import os 
+import os
 import time
-import subprocess
-import hashlib
+import queue
+import atexit
+import threading
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ICON_PATH = os.path.join(SCRIPT_DIR, "dualsensewhite.svg")
 
-_last_notify_time = 0
-_last_notify_id = 0
-_last_notify_hash = None
-_NOTIFY_COOLDOWN = 3  # seconds
+_NOTIFY_COOLDOWN = 3  # seconds; identical toasts within this are dropped
+COALESCE_WINDOW = 0.75  # seconds; a burst within this becomes one toast per category
+QUEUE_SIZE = 64
+FLUSH_TIMEOUT = 2  # seconds a CLI process waits for its toasts at exit
 
-def send_dbus_notification(summary, body="", icon=ICON_PATH):
-    global _last_notify_time, _last_notify_id, _last_notify_hash
+_coalescers = {}
 
-    now = time.time()
-    full_body = f"<b>{summary}</b>\n{body}" if body else f"<b>{summary}</b>"
-    body_hash = hashlib.sha256(full_body.encode()).hexdigest()
+def set_coalescer(category, fn):
+    """Merge a burst of toasts in `category` with fn(items) -> (summary, body).
 
-    # Throttle if message is too soon or identical
-    if now - _last_notify_time < _NOTIFY_COOLDOWN and body_hash == _last_notify_hash:
-        return
+    Each item is a (body, details) pair, details being whatever the caller
+    passed to notify(). Categories without one get their bodies stacked.
+    """
+    _coalescers[category] = fn
 
-    try:
-        session_bus = dbus.SessionBus()
-        notify_obj = session_bus.get_object("org.freedesktop.Notifications", "/org/freedesktop/Notifications")
-        notify = dbus.Interface(notify_obj, "org.freedesktop.Notifications")
 
-        if not os.path.exists(icon):
-            icon = ""
+class Notifier:
+    """Background sender for desktop notifications.
+
+    notify() only enqueues, so no caller waits on the notification daemon.
+    The worker keeps one proxy to org.freedesktop.Notifications, merges
+    what arrives within COALESCE_WINDOW into one toast per category, and
+    remembers a replace ID per category so e.g. a new "Disconnected" toast
+    replaces the last one instead of piling up.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.replace_ids = {}  # category -> notification id
+        self.last_sent = {}    # category -> (time, body)
+        self._proxy = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def notify(self, category, body, details=None):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        try:
+            self.queue.put_nowait((category, body, details))
+        except queue.Full:
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Notification queue full, dropping: {category}")
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Wait until everything queued so far has been sent (or given up on)."""
+        with self.queue.all_tasks_done:
+            self.queue.all_tasks_done.wait_for(lambda: not self.queue.unfinished_tasks, timeout)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + COALESCE_WINDOW
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            groups = {}
+            for category, body, details in batch:
+                groups.setdefault(category, []).append((body, details))
+            for category, items in groups.items():
+                try:
+                    self._send_group(category, items)
+                except Exception as e:
+                    # One bad toast must not take the only worker down with it
+                    print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Notification failed: {category}: {e}")
+            for _ in batch:
+                self.queue.task_done()
+
+    def _send_group(self, category, items):
+        summary = None
+        if len(items) == 1:
+            summary, body = category, items[0][0]
+        elif category in _coalescers:
+            try:
+                summary, body = _coalescers[category](items)
+            except Exception as e:
+                print(f"[{time.strftime('%H:%M:%S')}] ⚠️ Merging {category} toasts failed: {e}")
+        if summary is None:
+            summary, body = f"{category} ({len(items)})", "\n".join(body for body, _ in items)
+
+        full_body = f"<b>{summary}</b>\n{body}" if body else f"<b>{summary}</b>"
+        now = time.monotonic()
+        last = self.last_sent.get(category)
+        if last and now - last[0] < _NOTIFY_COOLDOWN and last[1] == full_body:
+            return
+
+        try:
+            self.replace_ids[category] = self._call_notify(category, full_body)
+            self.last_sent[category] = (now, full_body)
+        except Exception as e:
+            self._proxy = None  # reconnect next time (e.g. notification daemon restarted)
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️ D-Bus notification failed: {e}")
+
+    def _call_notify(self, category, full_body):
+        import dbus  # only needed once something is actually sent
+        if self._proxy is None:
+            session_bus = dbus.SessionBus()
+            notify_obj = session_bus.get_object("org.freedesktop.Notifications", "/org/freedesktop/Notifications")
+            self._proxy = dbus.Interface(notify_obj, "org.freedesktop.Notifications")
 
         hints = dbus.Dictionary({
             "urgency": dbus.Byte(1),
@@ -37,24 +120,26 @@ def send_dbus_notification(summary, body="", icon=ICON_PATH):
             "desktop-entry": "dualsense-idle-monitor"
         }, signature="sv")
 
-        _last_notify_id = notify.Notify(
+        return self._proxy.Notify(
             "DualSense Idle Monitor",
-            _last_notify_id,
-            icon,
+            self.replace_ids.get(category, 0),
+            ICON_PATH if os.path.exists(ICON_PATH) else "",
             "",  # Empty summary for KDE/Plasma workaround
             full_body,
             [],
             hints,
             -1
         )
-        _last_notify_time = now
-        _last_notify_hash = body_hash
 
-    except Exception as e:
-        print(f"[{time.strftime('%H:%M:%S')}] ⚠️ D-Bus notification failed: {e}")
 
-def log(msg, notify=False, summary=""):
+notifier = Notifier()
+
+def send_dbus_notification(summary, body="", details=None):
+    """Queue a toast; returns immediately."""
+    notifier.notify(summary, body, details)
+
+def log(msg, notify=False, summary="", details=None):
     timestamp = f"[{time.strftime('%H:%M:%S')}]"
     print(f"{timestamp} {msg}")
     if notify:
-        send_dbus_notification(summary, msg)
+        send_dbus_notification(summary, msg, details)
@@ -0,0 +1,183 @@
+# monitor/recording.py
+#
+# Raw controller traffic on disk, and a replay driver that feeds it back
+# through the activity filter and idle scheduler on a simulated clock, for
+# tuning stick_drift_threshold and timing filter changes.
+#
+# File layout: MAGIC, a little-endian u32 length, a JSON header of that
+# length (name, mac, nodes, clock), then fixed-width RECORD entries to the
+# end of the file. A recording cut short by a crash just loses its torn
+# last record.
+
+import os
+import json
+import time
+import mmap
+import select
+import struct
+from collections import namedtuple
+
+from monitor.controller import ControllerState, EV_SYN, SYN_REPORT, SYN_DROPPED, read_pending, set_monotonic_clock
+from monitor.deadlines import DeadlineScheduler
+
+MAGIC = b"DSREC\x00\x00\x01"
+HEADER_LEN = struct.Struct("<I")
+# sec, usec, type, code, value, node index (into the header's node list)
+RECORD = struct.Struct("<qIHHiB3x")
+FLUSH_BYTES = 64 * 1024
+
+Event = namedtuple("Event", "sec usec type code value")
+
+
+def record_controller(out_path, controller, open_device=None, stop=None):
+    """Write every event from the controller's nodes to out_path until
+    interrupted, `stop` is set or the controller goes away. Returns the
+    number of events written."""
+    if open_device is None:
+        from evdev import InputDevice as open_device
+
+    devices = [open_device(node.path) for node in controller.nodes]
+    kernel_clock = all([set_monotonic_clock(dev) for dev in devices])
+    header = json.dumps({
+        "name": controller.name,
+        "mac": controller.mac,
+        "nodes": [{"path": node.path, "role": node.role} for node in controller.nodes],
+        "clock": "monotonic" if kernel_clock else "realtime",
+        "started": round(time.time(), 3),
+    }).encode()
+    index = {dev.fd: i for i, dev in enumerate(devices)}
+    count = 0
+
+    with open(out_path, "wb") as f:
+        f.write(MAGIC + HEADER_LEN.pack(len(header)) + header)
+        buf = bytearray()
+        try:
+            while stop is None or not stop.is_set():
+                readable, _, _ = select.select(devices, [], [], 0.5)
+                for dev in readable:
+                    node = index[dev.fd]
+                    for e in read_pending(dev):
+                        buf += RECORD.pack(e.sec, e.usec, e.type, e.code, e.value, node)
+                        count += 1
+                if len(buf) >= FLUSH_BYTES:
+                    f.write(buf)
+                    buf.clear()
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print(f"⚠️ Recording stopped, {controller.name} went away: {e}")
+        finally:
+            f.write(buf)
+            for dev in devices:
+                try:
+                    dev.close()
+                except OSError:
+                    pass
+    return count
+
+
+def load_recording(path):
+    """(header dict, memoryview of the whole records) of a recording; the
+    view is backed by a read-only mmap of the file."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a controller recording")
+        (length,) = HEADER_LEN.unpack(f.read(HEADER_LEN.size))
+        header = json.loads(f.read(length))
+        start = len(MAGIC) + HEADER_LEN.size + length
+        size = os.fstat(f.fileno()).st_size
+        if size == start:
+            return header, memoryview(b"")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    end = start + (size - start) // RECORD.size * RECORD.size
+    return header, memoryview(mm)[start:end]
+
+def iter_frames(records):
+    """(node index, closing timestamp, events) per SYN_REPORT frame.
+    Events after the last SYN_REPORT of a node are left out."""
+    pending = {}
+    for sec, usec, etype, code, value, node in RECORD.iter_unpack(records):
+        events = pending.get(node)
+        if events is None:
+            events = pending[node] = []
+        events.append(Event(sec, usec, etype, code, value))
+        if etype == EV_SYN and (code == SYN_REPORT or code == SYN_DROPPED):
+            yield node, sec + usec / 1_000_000, events
+            pending[node] = []
+
+
+def replay(path, drift_threshold, idle_timeout, speed=0):
+    """Run a recording through ControllerState and DeadlineScheduler.
+
+    Time comes from the recorded timestamps, so idle decisions don't depend
+    on how fast the replay runs. speed=0 replays as fast as possible,
+    speed=1 at the recorded pace, 2 twice as fast, and so on.
+    """
+    header, records = load_recording(path)
+    nodes = [node["path"] for node in header["nodes"]]
+    state = ControllerState(nodes[0] if nodes else path, header.get("name"), header.get("mac"), drift_threshold)
+    state.kernel_clock = True  # last_input follows the recorded timestamps
+    scheduler = DeadlineScheduler(lambda state: idle_timeout)
+
+    decisions = []
+    idle_since = None
+    start = end = None
+    filter_time = 0.0
+    wall_start = time.perf_counter()
+
+    for node, now, events in iter_frames(records):
+        if start is None:
+            start = state.last_input = now
+            scheduler.add(path, state)
+        elif speed:
+            delay = (now - start) / speed - (time.perf_counter() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+        end = now
+
+        for _key, expired in scheduler.pop_expired(now):
+            idle_since = expired.last_input + idle_timeout
+            decisions.append({"event": "idle", "at": round(idle_since - start, 3)})
+
+        t = time.perf_counter()
+        active = state.handle_events(events, nodes[node] if node < len(nodes) else node)
+        filter_time += time.perf_counter() - t
+
+        if active and idle_since is not None:
+            decisions.append({"event": "resumed", "at": round(now - start, 3),
+                              "idle_for": round(now - idle_since, 3)})
+            idle_since = None
+            scheduler.reschedule(path)
+
+    if start is not None and idle_since is None:
+        # Still connected at the end: would it have gone idle by then?
+        for _key, expired in scheduler.pop_expired(end):
+            decisions.append({"event": "idle", "at": round(expired.last_input + idle_timeout - start, 3)})
+
+    wall = time.perf_counter() - wall_start
+    events = state.stats["events"]
+    return {
+        "file": path,
+        "name": header.get("name"),
+        "clock": header.get("clock"),
+        "drift_threshold": drift_threshold,
+        "idle_timeout": idle_timeout,
+        "duration": round(end - start, 3) if start is not None else 0.0,
+        "stats": dict(state.stats),
+        "decisions": decisions,
+        "events_per_s": round(events / wall) if wall else 0,
+        "filter_ns_per_event": round(filter_time / events * 1e9, 1) if events else 0.0,
+    }
+
+def print_replay(report):
+    s = report["stats"]
+    idle = [d for d in report["decisions"] if d["event"] == "idle"]
+    print(f"• drift_threshold {report['drift_threshold']}: {s['frames']} frames — "
+          f"{s['key']} key, {s['hat']} hat, {s['axis']} axis, {s['drift_filtered']} drift filtered — "
+          f"{len(idle)} idle disconnect(s) — {report['events_per_s']:,} events/s, "
+          f"filter {report['filter_ns_per_event']} ns/event")
+    for d in report["decisions"]:
+        if d["event"] == "idle":
+            print(f"    {d['at']:>10.1f}s  idle → would disconnect")
+        else:
+            print(f"    {d['at']:>10.1f}s  input again after {d['idle_for']:.1f}s idle")
@@ -0,0 +1,120 @@
+# monitor/registry.py
+#
+# The one place that knows which controllers are connected. Both engines
+# add an entry when they start watching a controller and remove it when
+# they stop, and everything the daemon keeps per controller (activity
+# state, cached battery, player number) hangs off that entry, so it all
+# goes away together.
+
+import heapq
+import threading
+
+from .battery_model import BatteryModel
+
+
+class ControllerEntry:
+    __slots__ = ("path", "name", "mac", "player", "nodes", "state", "stop", "thread", "battery", "devices",
+                 "restored")
+
+    def __init__(self, path, name, mac, player, nodes, state, thread=None):
+        self.path = path
+        self.name = name
+        self.mac = mac
+        self.player = player
+        self.nodes = nodes
+        self.state = state  # ControllerState
+        self.stop = threading.Event()
+        self.thread = thread  # threaded engine only
+        self.battery = BatteryModel()  # readings so far and the estimate built from them
+        self.devices = None  # node path -> open InputDevice, set by the engine
+        self.restored = False  # picked up from a checkpoint rather than newly connected
+
+
+class Registry:
+    """Connected controllers by main node path, MAC and player number.
+
+    Player numbers are stable while a controller stays connected; a new
+    controller gets the lowest number not in use (freed numbers sit in a
+    heap, so nothing is rescanned or renumbered).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_path = {}
+        self._by_mac = {}
+        self._by_player = {}
+        self._free = []   # released player numbers (heap)
+        self._next = 1    # lowest number never handed out
+
+    def add(self, path, name, mac, nodes, state, thread=None, player=None):
+        """Register a controller; returns its entry, or None if `path` is taken.
+
+        `player` asks for a specific number (a controller resumed after a
+        restart); it's honoured if nobody else has it.
+        """
+        with self._lock:
+            if path in self._by_path:
+                return None
+            if player is not None and player >= 1 and player not in self._by_player:
+                self._take(player)
+            elif self._free:
+                player = heapq.heappop(self._free)
+            else:
+                player = self._next
+                self._next += 1
+            entry = ControllerEntry(path, name, mac, player, nodes, state, thread)
+            self._by_path[path] = entry
+            self._by_player[player] = entry
+            if mac:
+                self._by_mac[mac] = entry
+            return entry
+
+    def _take(self, player):
+        if player >= self._next:
+            for skipped in range(self._next, player):
+                heapq.heappush(self._free, skipped)
+            self._next = player + 1
+        else:
+            self._free.remove(player)
+            heapq.heapify(self._free)
+
+    def remove(self, path, state=None):
+        """Drop the entry for `path` (only if it still belongs to `state`,
+        when given). Returns the removed entry or None."""
+        with self._lock:
+            entry = self._by_path.get(path)
+            if entry is None or (state is not None and entry.state is not state):
+                return None
+            del self._by_path[path]
+            del self._by_player[entry.player]
+            if entry.mac and self._by_mac.get(entry.mac) is entry:
+                del self._by_mac[entry.mac]
+            if self._by_path:
+                heapq.heappush(self._free, entry.player)
+            else:
+                self._free.clear()
+                self._next = 1
+            return entry
+
+    def get(self, path):
+        return self._by_path.get(path)
+
+    def by_mac(self, mac):
+        return self._by_mac.get(mac) if mac else None
+
+    def by_player(self, player):
+        return self._by_player.get(player)
+
+    def entries(self):
+        """Snapshot list, safe to iterate while controllers come and go."""
+        with self._lock:
+            return list(self._by_path.values())
+
+    def __contains__(self, path):
+        return path in self._by_path
+
+    def __len__(self):
+        return len(self._by_path)
+
+
+registry = Registry()
@@ -0,0 +1,154 @@
+# monitor/sockapi.py
+#
+# Wire format and blocking client for the daemon's Unix socket (the server
+# is monitor/socket_server.py). Kept to the standard library so `--status`
+# stays cheap to start.
+#
+# Each frame is a 4-byte big-endian length, then one codec byte (b"m" for
+# msgpack, b"j" for JSON), then the payload. A request is a map with "id",
+# "op" and optional "args"; the reply carries the same "id" plus "ok" and
+# "result" or "error". After {"op": "subscribe"} the server also pushes
+# {"push": "status", "result": ...} whenever the controller status changes.
+# The server answers in whichever codec the request used.
+
+import os
+import json
+import struct
+import _socket  # `socket` proper costs ~3 ms of enum setup at import
+
+SOCKET_NAME = "ps5-idle.sock"
+HEADER = struct.Struct(">IB")  # length of codec byte + payload, codec
+MAX_FRAME = 1024 * 1024
+CONNECT_TIMEOUT = 2.0
+
+MSGPACK = ord("m")
+JSON = ord("j")
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class SocketError(Exception):
+    pass
+
+
+def runtime_dir():
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    if not os.path.isdir(runtime):
+        runtime = os.path.expanduser("~/.cache")
+    return runtime
+
+def socket_path():
+    return os.path.join(runtime_dir(), SOCKET_NAME)
+
+def default_codec():
+    return MSGPACK if msgpack is not None else JSON
+
+def encode(message, codec=None):
+    codec = default_codec() if codec is None else codec
+    if codec == MSGPACK:
+        payload = msgpack.packb(message, use_bin_type=True)
+    else:
+        payload = json.dumps(message, separators=(",", ":")).encode()
+    return HEADER.pack(len(payload) + 1, codec) + payload
+
+def decode(codec, payload):
+    if codec == MSGPACK:
+        if msgpack is None:
+            raise SocketError("msgpack frame but msgpack is not installed")
+        return msgpack.unpackb(payload, raw=False)
+    if codec == JSON:
+        return json.loads(payload)
+    raise SocketError(f"unknown codec byte {codec!r}")
+
+def parse_header(data):
+    """(payload length, codec) from HEADER.size bytes; checks the limit."""
+    length, codec = HEADER.unpack(data)
+    if not 1 <= length <= MAX_FRAME:
+        raise SocketError(f"bad frame length {length}")
+    return length - 1, codec
+
+
+class Client:
+    """Blocking client; one request in flight at a time."""
+
+    def __init__(self, path=None, timeout=CONNECT_TIMEOUT):
+        self.sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(path or socket_path())
+        except OSError:
+            self.sock.close()
+            raise
+        self._next_id = 0
+
+    def _recv_exact(self, n):
+        buf = bytearray()
+        while len(buf) < n:
+            chunk = self.sock.recv(n - len(buf))
+            if not chunk:
+                raise SocketError("daemon closed the connection")
+            buf += chunk
+        return bytes(buf)
+
+    def _read(self):
+        length, codec = parse_header(self._recv_exact(HEADER.size))
+        return decode(codec, self._recv_exact(length))
+
+    def _send(self, op, args):
+        self._next_id += 1
+        self.sock.sendall(encode({"id": self._next_id, "op": op, "args": args}))
+        return self._next_id
+
+    def call(self, op, **args):
+        request_id = self._send(op, args)
+        while True:
+            reply = self._read()
+            if reply.get("id") == request_id:
+                break  # pushes from a subscription may arrive first
+        if not reply.get("ok"):
+            raise SocketError(reply.get("error", "request failed"))
+        return reply.get("result")
+
+    def call_fds(self, op, max_fds=253, **args):
+        """call() for a reply that carries file descriptors (SCM_RIGHTS);
+        returns (result, fds). Don't use on a subscribed connection."""
+        import socket
+        self._send(op, args)
+        # The fds ride on the reply's first bytes
+        head, fds, _flags, _addr = socket.recv_fds(self.sock, HEADER.size, max_fds)
+        if not head:
+            raise SocketError("daemon closed the connection")
+        length, codec = parse_header(head + self._recv_exact(HEADER.size - len(head)))
+        reply = decode(codec, self._recv_exact(length))
+        if not reply.get("ok"):
+            for fd in fds:
+                os.close(fd)
+            raise SocketError(reply.get("error", "request failed"))
+        return reply.get("result"), fds
+
+    def subscribe(self):
+        """Yield each pushed status map, starting with the current one."""
+        yield self.call("subscribe")
+        self.sock.settimeout(None)
+        while True:
+            message = self._read()
+            if message.get("push") == "status":
+                yield message["result"]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def request(op, timeout=CONNECT_TIMEOUT, **args):
+    """One-shot call; raises OSError if the daemon isn't listening."""
+    with Client(timeout=timeout) as client:
+        return client.call(op, **args)
@@ -0,0 +1,208 @@
+# monitor/socket_server.py
+#
+# Unix-socket API next to D-Bus (wire format in monitor/sockapi.py). Served
+# from the shared asyncio loop in monitor/aioloop.py, so it runs the same
+# under both engines and takes any number of clients. Anything that blocks
+# (BlueZ calls, config writes) goes to the loop's executor.
+
+import os
+import atexit
+import signal
+import socket
+import asyncio
+
+from monitor import status, metrics
+from monitor.aioloop import submit
+from monitor.notif import log
+from monitor.sockapi import HEADER, SocketError, encode, decode, parse_header, socket_path
+
+SUBSCRIBER_BUFFER = 256 * 1024  # bytes queued for a subscriber before it's dropped
+
+
+def _status(args):
+    return status.status_dict()
+
+def _events(args):
+    from monitor.events import event_log
+    return event_log.recent(int(args.get("n", 20)))
+
+def _metrics(args):
+    return metrics.snapshot()
+
+def _notify(args):
+    from monitor.monitor import send_status_toast
+    return send_status_toast()
+
+def _set_timeout(args):
+    from monitor.monitor import set_idle_timeout
+    return set_idle_timeout(args.get("seconds"))
+
+def _disconnect(args):
+    from monitor.monitor import disconnect_player
+    return disconnect_player(int(args["player"]))
+
+def _disconnect_all(args):
+    from monitor.monitor import disconnect_all
+    return disconnect_all()
+
+def _disconnect_idle(args):
+    from monitor.monitor import disconnect_idle
+    return disconnect_idle(args.get("min_idle", 0))
+
+def _disconnect_macs(args):
+    from monitor.monitor import disconnect_macs
+    return disconnect_macs(list(args["macs"]))
+
+def _set_controller_timeout(args):
+    from monitor.monitor import set_controller_timeout
+    return set_controller_timeout(int(args["player"]), args.get("seconds"))
+
+# op -> (handler(args), runs in the executor)
+OPS = {
+    "status": (_status, False),
+    "events": (_events, False),
+    "metrics": (_metrics, False),
+    "notify": (_notify, False),
+    "set_timeout": (_set_timeout, True),
+    "disconnect": (_disconnect, True),
+    "disconnect_all": (_disconnect_all, True),
+    "disconnect_idle": (_disconnect_idle, True),
+    "disconnect_macs": (_disconnect_macs, True),
+    "set_controller_timeout": (_set_controller_timeout, False),
+}
+
+
+class SocketServer:
+    def __init__(self, path=None):
+        self.path = path or socket_path()
+        self.loop = None
+        self.server = None
+        self.subscribers = {}  # writer -> codec
+        self._push_pending = False
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        if os.path.exists(self.path):
+            if await self._in_use():
+                raise OSError(f"another daemon is listening on {self.path}")
+            os.unlink(self.path)  # stale, from a daemon that didn't clean up
+        old_umask = os.umask(0o177)  # owner only
+        try:
+            self.server = await asyncio.start_unix_server(self._serve, self.path)
+        finally:
+            os.umask(old_umask)
+        atexit.register(self._unlink)
+        status.add_listener(self._on_status_change)
+
+    async def _in_use(self):
+        try:
+            _reader, writer = await asyncio.open_unix_connection(self.path)
+        except OSError:
+            return False
+        writer.close()
+        return True
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self._unlink()
+        atexit.unregister(self._unlink)  # the path may be someone else's by then
+
+    def _unlink(self):
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(HEADER.size)
+                except asyncio.IncompleteReadError:
+                    break  # client hung up
+                length, codec = parse_header(header)
+                message = decode(codec, await reader.readexactly(length))
+                if isinstance(message, dict) and message.get("op") == "handoff":
+                    self._handoff(message.get("id"), writer, codec)
+                    continue
+                writer.write(encode(await self._handle(message, writer, codec), codec))
+                await writer.drain()
+        except (SocketError, ValueError, ConnectionError, asyncio.IncompleteReadError) as e:
+            log(f"⚠️ Dropping socket client: {e}")
+        finally:
+            self.subscribers.pop(writer, None)
+            writer.close()
+
+    async def _handle(self, message, writer, codec):
+        if not isinstance(message, dict):
+            return {"id": None, "ok": False, "error": "request must be a map"}
+        request_id = message.get("id")
+        op = message.get("op")
+        args = message.get("args") or {}
+        with metrics.timed("dualsense_socket_request_seconds", op=str(op)):
+            try:
+                if op == "subscribe":
+                    self.subscribers[writer] = codec
+                    result = status.status_dict()
+                elif op in OPS:
+                    handler, blocking = OPS[op]
+                    if blocking:
+                        result = await self.loop.run_in_executor(None, handler, args)
+                    else:
+                        result = handler(args)
+                else:
+                    return {"id": request_id, "ok": False, "error": f"unknown op {op!r}"}
+            except Exception as e:
+                return {"id": request_id, "ok": False, "error": str(e) or type(e).__name__}
+        return {"id": request_id, "ok": True, "result": result}
+
+    def _handoff(self, request_id, writer, codec):
+        # A new daemon (`--takeover`) wants our controllers: send it the
+        # checkpoint with the evdev fds attached, then exit without writing
+        # a checkpoint file. The new daemon waits for this connection to
+        # close, i.e. for us to be gone, before it claims D-Bus and the socket.
+        from monitor import checkpoint
+        data, fds = checkpoint.build()
+        checkpoint.handed_off = True
+        frame = encode({"id": request_id, "ok": True, "result": data}, codec)
+        with socket.socket(fileno=os.dup(writer.get_extra_info("socket").fileno())) as sock:
+            sent = socket.send_fds(sock, [frame], fds)
+        writer.write(frame[sent:])
+        log(f"🤝 Handing {len(data['controllers'])} controller(s) over to a new daemon")
+        self.close()
+        self.loop.call_soon(os.kill, os.getpid(), signal.SIGTERM)
+
+    def _on_status_change(self, old, new):
+        # Runs on whichever thread published; one push per loop pass
+        if self.subscribers and not self._push_pending:
+            self._push_pending = True
+            self.loop.call_soon_threadsafe(self._push)
+
+    def _push(self):
+        self._push_pending = False
+        frames = {}
+        data = status.status_dict()
+        for writer, codec in list(self.subscribers.items()):
+            if writer.transport.get_write_buffer_size() > SUBSCRIBER_BUFFER:
+                log("⚠️ Socket subscriber isn't reading, dropping it")
+                del self.subscribers[writer]
+                writer.close()
+                continue
+            if codec not in frames:
+                frames[codec] = encode({"push": "status", "result": data}, codec)
+            writer.write(frames[codec])
+
+
+server = SocketServer()
+
+def start_socket_server():
+    """Start listening in the background; the D-Bus API works without it."""
+    async def start():
+        try:
+            await server.start()
+            log(f"🔌 Socket API listening at {server.path}")
+        except OSError as e:
+            log(f"⚠️ Socket API unavailable: {e}")
+
+    submit(start())
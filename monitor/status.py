@@ -0,0 +1,81 @@
+# monitor/status.py
+
+import time
+import threading
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ControllerStatus:
+    """One controller's entry in the published status.
+
+    Everything but the idle countdown and the battery prediction is fixed
+    when the snapshot is built; those two are worked out when the status is
+    read, so input doesn't have to republish anything.
+    """
+    path: str
+    player: int
+    name: str
+    mac: str
+    battery: str
+    charging: bool
+    idle_timeout: int
+    state: object  # ControllerState
+    battery_model: object = None  # BatteryModel
+
+    def idle_remaining(self, now):
+        idle = self.idle_timeout - (now - self.state.last_input)
+        return round(min(self.idle_timeout, max(0, idle)), 1)
+
+    def as_dict(self, now):
+        model = self.battery_model
+        predicted = model.predict(now) if model else None
+        left = model.time_left(now) if model else None
+        return {
+            "mac": self.mac,
+            "name": self.name,
+            "player": self.player,
+            "battery": self.battery,
+            "charging": self.charging,
+            "idle_remaining": self.idle_remaining(now),
+            "idle_timeout": self.idle_timeout,
+            "battery_predicted": None if predicted is None else round(predicted),
+            "time_to_empty": None if left is None or self.charging else round(left),
+            "time_to_full": None if left is None or not self.charging else round(left),
+        }
+
+
+_snapshot = ()
+_publish_lock = threading.Lock()  # keeps (old, new) pairs in order for listeners
+_listeners = []
+
+def add_listener(fn):
+    """Call fn(old, new) after every publish that changed the snapshot."""
+    _listeners.append(fn)
+
+def publish(entries):
+    """Swap in a new snapshot; readers holding the old tuple are unaffected.
+
+    `entries` may be a function returning the entries: it is called under
+    the lock, so of two racing publishers the one that looked last at the
+    controllers is also the one published last.
+    """
+    global _snapshot
+    with _publish_lock:
+        new = tuple(entries() if callable(entries) else entries)
+        old, _snapshot = _snapshot, new
+        if new == old:
+            return
+        for fn in _listeners:
+            try:
+                fn(old, new)
+            except Exception as e:
+                print(f"⚠️ Status listener failed: {e}")
+
+def current():
+    return _snapshot
+
+def status_dict(snapshot=None):
+    """path -> status dict, the shape GetStatus has always returned."""
+    now = time.monotonic()
+    return {entry.path: entry.as_dict(now) for entry in (current() if snapshot is None else snapshot)}
@@ -1,18 +1,16 @@
 #!/usr/bin/env python3
 
 import os
-import sys
-import time
-import argparse
-import subprocess
+import signal
 
-from monitor.battery import get_battery_level
+# Only what the CLI needs; the daemon's modules (evdev, D-Bus clients,
+# GLib) are imported below once we know we're running the monitor.
 from monitor.notif import log
-from monitor.monitor import scan_loop, shutdown_all_threads
-from monitor.macs import find_dualsense_event_devices
-from monitor.config import load_config
 from monitor.cli import handle_cli_args
 
+def _terminate(signum, frame):
+    raise SystemExit(0)
+
 def main():
     script_path = os.path.abspath(__file__)
 
@@ -20,13 +18,27 @@ def main():
     if handle_cli_args(script_path):
         return  # Exit if a flag handled the request
 
-    log("🔍 Starting DualSense idle monitor...", notify=True, summary="Starting")
+    from monitor.dbus_api import install_main_loop
+    from monitor.config import get_config
+    from monitor.monitor import scan_loop, shutdown_all_threads
+    from monitor import checkpoint, activation
+
+    signal.signal(signal.SIGTERM, _terminate)  # --stop, systemd: shut down like Ctrl+C
+    install_main_loop()  # before the first notification opens the session bus
+    # Started with every controller when on demand: no toast each time
+    log("🔍 Starting DualSense idle monitor...", notify=not activation.on_demand, summary="Starting")
     try:
-        scan_loop()
-    except KeyboardInterrupt:
+        if get_config().engine == "threaded":
+            scan_loop()
+        else:
+            from monitor.engine import run_engine
+            run_engine()
+    except (KeyboardInterrupt, SystemExit):
         log("🧹 Shutting down...")
+        activation.stopping()
+        checkpoint.save()  # idle timers survive a quick restart
         shutdown_all_threads()
-    log("👋 Done.", notify=True, summary="Closing process")
+    log("👋 Done.", notify=not activation.on_demand, summary="Closing process")
 
 if __name__ == "__main__":
     main()
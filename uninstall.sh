@@ -8,6 +8,9 @@ CONFIG_DIR="$HOME/.config/$SCRIPT_NAME"
 CONFIG_PATH="$CONFIG_DIR/config.ini"
 SERVICE_NAME="$SCRIPT_NAME.service"
 SERVICE_PATH="$HOME/.config/systemd/user/$SERVICE_NAME"
+ONDEMAND_NAME="$SCRIPT_NAME-ondemand.service"
+ONDEMAND_PATH="$HOME/.config/systemd/user/$ONDEMAND_NAME"
+RULES_PATH="/etc/udev/rules.d/70-$SCRIPT_NAME.rules"
 
 echo " Uninstalling $SCRIPT_NAME..."
 
@@ -21,6 +24,19 @@ if [ -f "$SERVICE_PATH" ]; then
   echo " Systemd service removed."
 fi
 
+# Remove on-demand activation if it was installed
+if [ -f "$RULES_PATH" ] || [ -f "$ONDEMAND_PATH" ]; then
+  echo " Removing on-demand activation..."
+  if [ -f "$RULES_PATH" ]; then
+    sudo rm -f "$RULES_PATH"
+    sudo udevadm control --reload-rules
+  fi
+  systemctl --user stop "$ONDEMAND_NAME" || true
+  rm -f "$ONDEMAND_PATH"
+  systemctl --user daemon-reload
+  echo " On-demand activation removed."
+fi
+
 # Remove installed script
 if [ -f "$BIN_PATH" ]; then
   echo "  Removing CLI tool from ~/.local/bin..."